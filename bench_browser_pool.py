@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: browser startup cost and pages per minute, fresh browser per check
+versus a warm DriverPool shared by concurrent checks.
+
+Pages come from fixtures/pages, served either from a local HTTP server
+(default) or straight from disk with --file-urls. Needs selenium, Chrome and
+ChromeDriver.
+
+Usage: python bench_browser_pool.py [--pages 20] [--pool-size 2] [--file-urls]
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from stub_servers import FIXTURE_PAGES_DIR, FixtureHandler, start_server
+
+PINCODE = "400049"
+
+
+def fixture_urls(base_url, count):
+    names = sorted(f for f in os.listdir(FIXTURE_PAGES_DIR) if f.endswith(".html"))
+    if base_url is None:
+        urls = [Path(FIXTURE_PAGES_DIR, name).as_uri() for name in names]
+    else:
+        urls = [f"{base_url}/{name}" for name in names]
+    return [urls[i % len(urls)] for i in range(count)]
+
+
+def run_fresh_browsers(urls):
+    """One CromaProductChecker (and so one browser start) per page, as before the pool existed"""
+    from product_checker import CromaProductChecker
+
+    start = time.perf_counter()
+    for url in urls:
+        checker = CromaProductChecker(use_api=False)
+        checker.check_availability(url, PINCODE)
+        checker.close()
+    return time.perf_counter() - start
+
+
+def run_pool(urls, pool_size):
+    from browser_pool import DriverPool
+    from product_checker import CromaProductChecker
+
+    pool = DriverPool(size=pool_size)
+    warm_start = time.perf_counter()
+    pool.warm_up()
+    warm_up_seconds = time.perf_counter() - warm_start
+
+    checker = CromaProductChecker(pool=pool, use_api=False)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=pool_size) as executor:
+        list(executor.map(lambda url: checker.check_availability(url, PINCODE), urls))
+    elapsed = time.perf_counter() - start
+    metrics = pool.metrics()
+    pool.close()
+    return elapsed, warm_up_seconds, metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--file-urls", action="store_true", help="load fixtures via file:// instead of HTTP")
+    parser.add_argument("--skip-fresh", action="store_true", help="only benchmark the pool")
+    args = parser.parse_args()
+
+    server = None
+    base_url = None
+    if not args.file_urls:
+        server, base_url = start_server(FixtureHandler)
+    urls = fixture_urls(base_url, args.pages)
+
+    try:
+        if not args.skip_fresh:
+            fresh = run_fresh_browsers(urls)
+            print(f"fresh browser per page: {fresh:.1f}s for {len(urls)} pages "
+                  f"({len(urls) / fresh * 60:.1f} pages/min)")
+
+        elapsed, warm_up_seconds, metrics = run_pool(urls, args.pool_size)
+        print(f"warm pool of {args.pool_size}:      {elapsed:.1f}s for {len(urls)} pages "
+              f"({len(urls) / elapsed * 60:.1f} pages/min), warm-up {warm_up_seconds:.1f}s")
+        print(f"avg browser startup: {metrics['avg_startup_seconds']:.2f}s over {metrics['drivers_started']} starts, "
+              f"{metrics['recycled']} recycled, {metrics['health_failures']} health check failures")
+    finally:
+        if server is not None:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
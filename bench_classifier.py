@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Check that the tiered classifier agrees with the full detect_stock logic on the
+saved page corpus, and compare how long each takes per page.
+
+Usage: python bench_classifier.py [--corpus fixtures/pages] [--repeat 200]
+Exits with status 1 if any page gets a different verdict.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+from stock_classifier import classify_stock_with_tier, detect_stock
+
+
+def time_per_page(func, html, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(html, "bench")
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pages"))
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    logging.getLogger("CromaStockAlert").setLevel(logging.WARNING)
+
+    mismatches = 0
+    total_full = total_tiered = 0.0
+    print(f"{'page':<32} {'full':>5} {'tiered':>6} {'tier':>4} {'full (us)':>10} {'tiered (us)':>11}")
+    for filename in sorted(os.listdir(args.corpus)):
+        if not filename.endswith(".html"):
+            continue
+        with open(os.path.join(args.corpus, filename), encoding="utf-8") as f:
+            html = f.read()
+
+        expected = detect_stock(html, filename)
+        verdict, tier = classify_stock_with_tier(html, filename)
+        full = time_per_page(detect_stock, html, args.repeat)
+        tiered = time_per_page(lambda h, n: classify_stock_with_tier(h, n), html, args.repeat)
+        total_full += full
+        total_tiered += tiered
+
+        flag = "" if verdict == expected else "  MISMATCH"
+        mismatches += verdict != expected
+        print(f"{filename:<32} {str(expected):>5} {str(verdict):>6} {tier:>4} {full * 1e6:>10.0f} {tiered * 1e6:>11.0f}{flag}")
+
+    print(f"\nTotal per sweep of corpus: full {total_full * 1e3:.2f} ms, tiered {total_tiered * 1e3:.2f} ms "
+          f"({total_full / total_tiered:.1f}x)")
+    if mismatches:
+        print(f"{mismatches} page(s) classified differently")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Offline replay benchmark and regression check for the stock detectors.
+
+Every detector is run over the labelled page corpus (fixtures/pages and its
+labels.json) and reported on pages/sec, p50/p99 latency per page, peak Python
+memory (tracemalloc) and verdict accuracy, overall and per category.
+
+Detectors:
+  requests   classify_stock, the verdict check_stock_with_requests returns for a fetched page
+  manual     manual_check.analyze_page
+  selenium   CromaProductChecker._check_initial_availability on the page loaded in Chrome
+             (only when selenium is installed and Chrome starts; the page is loaded
+             once and only the detection is timed)
+
+Usage: python bench_detectors.py [--repeat 50] [--json results.json] [--baseline old.json]
+Exits with status 1 if a detector is less accurate than in the baseline, or
+slower by more than --max-slowdown.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pages")
+
+
+def load_corpus(corpus):
+    with open(os.path.join(corpus, "labels.json"), encoding="utf-8") as f:
+        labels = json.load(f)
+    pages = []
+    for filename, label in sorted(labels.items()):
+        with open(os.path.join(corpus, filename), encoding="utf-8") as f:
+            pages.append((filename, label, f.read()))
+    return pages
+
+
+def requests_detector():
+    from stock_classifier import classify_stock
+    return lambda filename, html: classify_stock(html, filename)
+
+
+def manual_detector():
+    from manual_check import analyze_page
+    return lambda filename, html: analyze_page(html)['in_stock']
+
+
+def selenium_detector():
+    """Return (detector, cleanup), or None if selenium or Chrome isn't available"""
+    try:
+        from browser_pool import DriverPool
+        from product_checker import CromaProductChecker
+    except ImportError as e:
+        print(f"Skipping selenium detector: {str(e)}")
+        return None
+
+    from stub_servers import FixtureHandler, start_server
+
+    pool = DriverPool(size=1, lightweight=False)
+    try:
+        pool.warm_up()
+    except Exception as e:
+        print(f"Skipping selenium detector: {str(e)}")
+        pool.close()
+        return None
+    checker = CromaProductChecker(pool=pool, use_api=False)
+    server, base_url = start_server(FixtureHandler)
+    loaded = {'filename': None}
+
+    def detect(filename, html):
+        with pool.lease() as driver:
+            if loaded['filename'] != filename:
+                # Page loads aren't part of the detector; only the first call for a page pays for one
+                driver.get(f"{base_url}/{filename}")
+                loaded['filename'] = filename
+            return checker._check_initial_availability(driver)['is_available']
+
+    def cleanup():
+        checker.close()
+        pool.close()
+        server.shutdown()
+
+    return detect, cleanup
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run_detector(name, detect, pages, repeat):
+    # One untimed pass for the verdicts, and so that lazy imports and page loads aren't timed
+    misclassified = []
+    by_category = {}
+    for filename, label, html in pages:
+        verdict = detect(filename, html)
+        correct = verdict == label['in_stock']
+        counts = by_category.setdefault(label['category'], [0, 0])
+        counts[0] += correct
+        counts[1] += 1
+        if not correct:
+            misclassified.append({'page': filename, 'category': label['category'],
+                                  'expected': label['in_stock'], 'verdict': verdict})
+
+    latencies = []
+    for filename, label, html in pages:
+        detect(filename, html)  # load the page once for detectors that need it
+        for _ in range(repeat):
+            start = time.perf_counter()
+            detect(filename, html)
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    tracemalloc.start()
+    for filename, label, html in pages:
+        detect(filename, html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    correct = sum(counts[0] for counts in by_category.values())
+    return {
+        'detector': name,
+        'pages': len(pages),
+        'pages_per_sec': len(latencies) / sum(latencies),
+        'p50_ms': percentile(latencies, 0.50) * 1e3,
+        'p99_ms': percentile(latencies, 0.99) * 1e3,
+        'peak_memory_kb': peak / 1024,
+        'accuracy': correct / len(pages),
+        'accuracy_by_category': {category: counts[0] / counts[1] for category, counts in sorted(by_category.items())},
+        'misclassified': misclassified,
+    }
+
+
+def compare(results, baseline, max_slowdown):
+    """Return a list of regressions against a previous run"""
+    previous = {result['detector']: result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        old = previous.get(result['detector'])
+        if old is None:
+            continue
+        if result['accuracy'] < old['accuracy']:
+            regressions.append(f"{result['detector']}: accuracy {old['accuracy']:.0%} -> {result['accuracy']:.0%}")
+        if result['pages_per_sec'] * max_slowdown < old['pages_per_sec']:
+            regressions.append(f"{result['detector']}: {old['pages_per_sec']:.0f} -> "
+                               f"{result['pages_per_sec']:.0f} pages/sec")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--repeat", type=int, default=50, help="timed runs per page")
+    parser.add_argument("--detectors", default="requests,manual,selenium", help="comma separated detectors to run")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="results file of an earlier run to check for regressions")
+    parser.add_argument("--max-slowdown", type=float, default=1.5,
+                        help="allowed pages/sec drop against the baseline, as a factor")
+    args = parser.parse_args()
+
+    logging.getLogger("CromaStockAlert").setLevel(logging.WARNING)
+    pages = load_corpus(args.corpus)
+
+    results = []
+    for name in args.detectors.split(","):
+        cleanup = None
+        if name == "requests":
+            detect = requests_detector()
+        elif name == "manual":
+            detect = manual_detector()
+        elif name == "selenium":
+            loaded = selenium_detector()
+            if loaded is None:
+                continue
+            detect, cleanup = loaded
+        else:
+            parser.error(f"unknown detector {name}")
+        try:
+            results.append(run_detector(name, detect, pages, args.repeat))
+        finally:
+            if cleanup is not None:
+                cleanup()
+
+    print(f"{'detector':<10} {'pages/s':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} {'peak KB':>8} {'accuracy':>9}")
+    for result in results:
+        print(f"{result['detector']:<10} {result['pages_per_sec']:>9.0f} {result['p50_ms']:>9.2f} "
+              f"{result['p99_ms']:>9.2f} {result['peak_memory_kb']:>8.0f} {result['accuracy']:>9.0%}")
+        for miss in result['misclassified']:
+            print(f"  {miss['page']} ({miss['category']}): expected {miss['expected']}, got {miss['verdict']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({'created_at': time.time(), 'corpus': args.corpus, 'repeat': args.repeat,
+                       'results': results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.max_slowdown)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark: writing check events to the JSONL event log and aggregating them
+
+Writes --events synthetic check results for --products products (each
+flipping between in and out of stock now and then, with some unknown
+verdicts) through EventLog, once with the default buffering and once
+flushing every event. Then streams the rotated log back through
+AvailabilityAggregator, reporting events/sec and the peak Python memory of
+the read, which should stay flat however many events there are.
+
+Usage: python bench_event_log.py [--events 200000] [--products 500]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from event_log import CHECKER_STOCK, CheckEvent, EventLog, aggregate, log_files
+
+
+def synthetic_events(count, products, seed=1):
+    rng = random.Random(seed)
+    state = [False] * products
+    ts = 1_700_000_000.0
+    for i in range(count):
+        product = i % products
+        if product == 0:
+            ts += 60.0
+        if rng.random() < 0.02:
+            state[product] = not state[product]
+        in_stock = None if rng.random() < 0.01 else state[product]
+        yield CheckEvent(ts, CHECKER_STOCK, f"{300000 + product}", f"https://www.croma.com/p/{300000 + product}",
+                         in_stock=in_stock, price=24999.0, latency=0.12)
+
+
+def write(path, events, flush_batch, max_bytes):
+    log = EventLog(path, max_bytes=max_bytes, backups=20, flush_interval=3600, flush_batch=flush_batch)
+    start = time.perf_counter()
+    for event in events:
+        log.append(event)
+    log.close()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--max-bytes", type=int, default=8 * 1024 * 1024, help="rotation size")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        unbuffered = write(os.path.join(scratch, "unbuffered.jsonl"),
+                           synthetic_events(args.events, args.products), 1, args.max_bytes)
+        path = os.path.join(scratch, "check_events.jsonl")
+        buffered = write(path, synthetic_events(args.events, args.products), 500, args.max_bytes)
+        files = log_files(path)
+        size = sum(os.path.getsize(f) for f in files)
+        print(f"write, flush per event: {args.events / unbuffered:>9.0f} events/s")
+        print(f"write, buffered:        {args.events / buffered:>9.0f} events/s ({unbuffered / buffered:.1f}x), "
+              f"{size / 1024 / 1024:.1f} MiB in {len(files)} files")
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        results = aggregate(path, max_gap=3600)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        checks = sum(stats['checks'] for stats in results.values())
+        restocks = sum(stats['restocks'] for stats in results.values())
+        uptimes = [stats['uptime'] for stats in results.values() if stats['uptime'] is not None]
+        print(f"aggregate:              {checks / elapsed:>9.0f} events/s, peak {peak / 1024:.0f} KiB, "
+              f"{len(results)} products, {restocks} restocks, mean uptime {sum(uptimes) / len(uptimes):.1%}")
+        if checks != args.events:
+            print(f"Read back {checks} events, expected {args.events}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark: CPU per check for a page whose availability region is unchanged,
+classifying it again versus reusing the verdict behind its fingerprint.
+
+Each fixture page is padded with --filler-rows of unrelated markup (think
+recommendation carousels and footers) to bring it closer to the size of a
+real product page. Also checks that the fingerprint ignores a change to that
+filler and notices a price change.
+
+Usage: python bench_fingerprint.py [--filler-rows 2000] [--repeat 50]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+from croma_api import format_inr
+from page_fingerprint import availability_fingerprint, extract_price
+from stock_classifier import classify_stock
+from stub_servers import FIXTURE_PAGES_DIR
+
+FILLER = ('<div class="reco-card"><a href="/p/{i}"><img src="/media/{i}.jpg" alt="Related {i}">'
+          '<span class="reco-title">Related product {i}</span></a></div>\n')
+
+
+def time_per_call(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filler-rows", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    logging.getLogger("CromaStockAlert").setLevel(logging.WARNING)
+    filler = "".join(FILLER.format(i=i) for i in range(args.filler_rows))
+
+    failures = 0
+    total_classify = total_fingerprint = 0.0
+    print(f"{'page':<30} {'KiB':>5} {'classify (us)':>13} {'fingerprint (us)':>16}")
+    for filename in sorted(os.listdir(FIXTURE_PAGES_DIR)):
+        if not filename.endswith(".html"):
+            continue
+        with open(os.path.join(FIXTURE_PAGES_DIR, filename), encoding="utf-8") as f:
+            html = f.read().replace("</body>", filler + "</body>")
+
+        classify = time_per_call(lambda: (classify_stock(html, filename), extract_price(html)), args.repeat)
+        fingerprint = time_per_call(lambda: availability_fingerprint(html), args.repeat)
+        total_classify += classify
+        total_fingerprint += fingerprint
+        print(f"{filename:<30} {len(html) / 1024:>5.0f} {classify * 1e6:>13.0f} {fingerprint * 1e6:>16.0f}")
+
+        original = availability_fingerprint(html)
+        if availability_fingerprint(html.replace("Related product 1<", "Related product one<")) != original:
+            print(f"  {filename}: fingerprint changed with unrelated markup")
+            failures += 1
+        price = extract_price(html)
+        if price is not None:
+            grouped, regrouped = format_inr(price)[1:], format_inr(price - 1)[1:]
+            repriced = html.replace(grouped, regrouped).replace(str(int(price)), str(int(price) - 1))
+            if repriced != html and availability_fingerprint(repriced) == original:
+                print(f"  {filename}: fingerprint missed a price change")
+                failures += 1
+
+    print(f"\nUnchanged sweep of the corpus: classify {total_classify * 1e3:.2f} ms, "
+          f"fingerprint {total_fingerprint * 1e3:.2f} ms ({total_classify / total_fingerprint:.1f}x)")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
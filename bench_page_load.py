@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-page wall time and browser RSS for full versus lightweight
+Selenium page loads, using the fixture pages from fixtures/pages.
+
+Each mode gets its own single-browser pool and runs the same
+check_availability calls. Needs selenium, Chrome and ChromeDriver; RSS is
+only reported when psutil is installed.
+
+Usage: python bench_page_load.py [--rounds 3]
+"""
+import argparse
+import os
+import statistics
+import time
+
+from stub_servers import FIXTURE_PAGES_DIR, FixtureHandler, start_server
+
+PINCODE = "400049"
+
+
+def run_mode(urls, lightweight, rounds):
+    from browser_pool import DriverPool, browser_memory_mb
+    from product_checker import CromaProductChecker
+
+    pool = DriverPool(size=1, lightweight=lightweight)
+    pool.warm_up()
+    checker = CromaProductChecker(pool=pool, use_api=False)
+
+    timings = []
+    peak_rss = 0.0
+    for _ in range(rounds):
+        for url in urls:
+            start = time.perf_counter()
+            checker.check_availability(url, PINCODE)
+            timings.append(time.perf_counter() - start)
+            with pool.lease() as driver:
+                peak_rss = max(peak_rss, browser_memory_mb(driver))
+    pool.close()
+    return timings, peak_rss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=3, help="passes over the fixture pages per mode")
+    args = parser.parse_args()
+
+    server, base_url = start_server(FixtureHandler)
+    urls = [f"{base_url}/{name}" for name in sorted(os.listdir(FIXTURE_PAGES_DIR)) if name.endswith(".html")]
+    try:
+        results = {}
+        for label, lightweight in (("full", False), ("lightweight", True)):
+            results[label] = run_mode(urls, lightweight, args.rounds)
+
+        print(f"{'mode':<12} {'mean (s)':>9} {'median (s)':>10} {'max (s)':>8} {'peak RSS (MB)':>14}")
+        for label, (timings, peak_rss) in results.items():
+            print(f"{label:<12} {statistics.mean(timings):>9.3f} {statistics.median(timings):>10.3f} "
+                  f"{max(timings):>8.3f} {peak_rss:>14.0f}")
+        full_mean = statistics.mean(results["full"][0])
+        light_mean = statistics.mean(results["lightweight"][0])
+        print(f"\nlightweight mode cuts mean per-page time by {(1 - light_mean / full_mean) * 100:.0f}%")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
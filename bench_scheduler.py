@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Simulation: stock-change detection latency versus request count, fixed
+CHECK_INTERVAL polling versus the adaptive PollScheduler.
+
+A catalogue of simulated products is run for a day of virtual time. A few
+products are "hot" (stock flips every few minutes), some are "warm" (a few
+flips a day) and the rest are dead. Each policy is given the same request
+budget and we measure how long it takes to notice each stock flip.
+
+Usage: python bench_scheduler.py [--products 500] [--hours 24] [--seed 1]
+"""
+import argparse
+import bisect
+import random
+import statistics
+
+from scheduler import PollScheduler
+
+
+def make_catalogue(count, hours, rng):
+    """Return a list of (kind, sorted flip times in seconds)"""
+    horizon = hours * 3600
+    catalogue = []
+    for i in range(count):
+        roll = rng.random()
+        if roll < 0.05:
+            kind, mean_gap = "hot", 10 * 60
+        elif roll < 0.25:
+            kind, mean_gap = "warm", 4 * 3600
+        else:
+            kind, mean_gap = "dead", None
+        flips = []
+        if mean_gap:
+            t = rng.expovariate(1 / mean_gap)
+            while t < horizon:
+                flips.append(t)
+                t += rng.expovariate(1 / mean_gap)
+        catalogue.append((kind, flips))
+    return catalogue
+
+
+def state_at(flips, t):
+    return bisect.bisect_right(flips, t) % 2 == 1
+
+
+class Observer:
+    """Tracks what each policy has seen and how late it noticed each flip"""
+
+    def __init__(self, catalogue):
+        self.catalogue = catalogue
+        self.seen = [False] * len(catalogue)
+        self.seen_flips = [0] * len(catalogue)
+        self.latencies = {"hot": [], "warm": []}
+        self.requests = 0
+
+    def check(self, index, now):
+        """Check a product at time `now`; return True if its state changed since the last check"""
+        self.requests += 1
+        kind, flips = self.catalogue[index]
+        flips_so_far = bisect.bisect_right(flips, now)
+        changed = state_at(flips, now) != self.seen[index]
+        if changed:
+            # Latency is measured from the first flip we had not yet seen
+            self.latencies[kind].append(now - flips[self.seen_flips[index]])
+            self.seen[index] = not self.seen[index]
+        self.seen_flips[index] = flips_so_far
+        return changed
+
+
+def run_fixed(catalogue, horizon, interval):
+    observer = Observer(catalogue)
+    count = len(catalogue)
+    # Spread the sweep evenly over the interval, like a serial loop would
+    offsets = [interval * i / count for i in range(count)]
+    for index, offset in enumerate(offsets):
+        t = offset
+        while t < horizon:
+            observer.check(index, t)
+            t += interval
+    return observer
+
+
+def run_adaptive(catalogue, horizon, rps, seed):
+    now = [0.0]
+    scheduler = PollScheduler(base_interval=len(catalogue) / rps, min_interval=30, max_interval=3600,
+                              max_rps=rps, jitter=0.1, clock=lambda: now[0], rng=random.Random(seed))
+    for index in range(len(catalogue)):
+        scheduler.add({'id': index})
+
+    observer = Observer(catalogue)
+    tick = 1.0
+    while now[0] < horizon:
+        for product in scheduler.pop_due():
+            changed = observer.check(product['id'], now[0])
+            scheduler.report(product['id'], changed=changed)
+        now[0] += tick
+    return observer
+
+
+def summarise(label, observer):
+    def stats(values):
+        if not values:
+            return "      -        -"
+        values = sorted(values)
+        p90 = values[int(len(values) * 0.9) - 1] if len(values) >= 10 else values[-1]
+        return f"{statistics.mean(values) / 60:>7.1f} {p90 / 60:>8.1f}"
+
+    print(f"{label:<26} {observer.requests:>9}   {stats(observer.latencies['hot'])}   {stats(observer.latencies['warm'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--rps", default="0.5,1,2", help="comma separated request budgets to compare")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    catalogue = make_catalogue(args.products, args.hours, rng)
+    horizon = args.hours * 3600
+    kinds = [kind for kind, _ in catalogue]
+    print(f"{args.products} products: {kinds.count('hot')} hot, {kinds.count('warm')} warm, {kinds.count('dead')} dead; "
+          f"{args.hours:g}h simulated")
+    print(f"\n{'policy':<26} {'requests':>9}   {'hot mean/p90 (min)':>16}   {'warm mean/p90 (min)':>16}")
+
+    for rps in (float(r) for r in args.rps.split(",")):
+        adaptive = run_adaptive(catalogue, horizon, rps, args.seed)
+        # Give the fixed interval the same number of requests the adaptive run used
+        fixed_interval = args.products * horizon / max(1, adaptive.requests)
+        fixed = run_fixed(catalogue, horizon, fixed_interval)
+        summarise(f"fixed every {fixed_interval:.0f}s", fixed)
+        summarise(f"adaptive, {rps:g} req/s cap", adaptive)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cold start of each cli.py subcommand
+
+Every command runs --repeat times in a fresh interpreter with -X importtime,
+in a scratch directory and against local stand-in servers (product pages and
+the Croma API from stub_servers.py), so nothing touches croma.com. For each
+command it reports the median wall time, the median time spent importing
+modules and which heavy backends (selenium, webdriver_manager, bs4, requests,
+selectolax) got imported at all.
+
+  help         cli.py --help
+  check-once   cli.py check-once --no-api over --products stub product pages
+  manual       cli.py manual on a stub product page
+  pincode      cli.py pincode through the stub API (no browser)
+  run          import of main.py, i.e. everything `run` loads before its first check
+
+Usage: python bench_startup.py [--repeat 5] [--json results.json] [--baseline old.json]
+Exits with status 1 if a command got slower than --max-slowdown times the
+baseline (and by more than 50 ms) or imports a heavy backend it didn't
+import in the baseline.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from stub_servers import CromaApiHandler, ProductPageHandler, start_server
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+CLI = os.path.join(REPO_DIR, "cli.py")
+HEAVY_MODULES = ("selenium", "webdriver_manager", "bs4", "requests", "selectolax")
+
+
+def commands(page_url, api_url, products_path):
+    return {
+        "help": [CLI, "--help"],
+        "check-once": [CLI, "-q", "check-once", "--no-api", "--products", products_path],
+        "manual": [CLI, "manual", page_url, "--name", "Stub Product"],
+        "pincode": [CLI, "pincode", "https://www.croma.com/vivo-x200-fe-5g/p/316890", "400049",
+                    "--api", "--api-base", api_url],
+        "run": ["-c", "import main"],
+    }
+
+
+def parse_importtime(stderr):
+    """Return (total import seconds, set of top-level packages imported) from -X importtime output"""
+    total_us = 0
+    packages = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|", 2)
+        total_us += int(self_us)
+        packages.add(name.strip().split(".")[0])
+    return total_us / 1e6, packages
+
+
+def measure(argv, repeat, cwd, env):
+    walls, imports = [], []
+    loaded = set()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime"] + argv, cwd=cwd, env=env,
+                              capture_output=True, text=True, timeout=120)
+        walls.append(time.perf_counter() - start)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{' '.join(argv)} exited with {proc.returncode}:\n{proc.stderr[-2000:]}")
+        import_seconds, packages = parse_importtime(proc.stderr)
+        imports.append(import_seconds)
+        loaded |= packages
+    return {
+        'wall_ms': statistics.median(walls) * 1000,
+        'import_ms': statistics.median(imports) * 1000,
+        'heavy_modules': sorted(loaded.intersection(HEAVY_MODULES)),
+    }
+
+
+def compare(results, baseline, max_slowdown):
+    """Return a list of regressions against a previous run"""
+    regressions = []
+    for name, result in results.items():
+        old = baseline['results'].get(name)
+        if old is None:
+            continue
+        # The absolute margin keeps timer noise on the ~50 ms commands from failing the check
+        if result['wall_ms'] > old['wall_ms'] * max_slowdown and result['wall_ms'] - old['wall_ms'] > 50:
+            regressions.append(f"{name}: {old['wall_ms']:.0f} -> {result['wall_ms']:.0f} ms")
+        added = set(result['heavy_modules']) - set(old['heavy_modules'])
+        if added:
+            regressions.append(f"{name}: now imports {', '.join(sorted(added))}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="cold starts per command")
+    parser.add_argument("--products", type=int, default=1,
+                        help="stub products for check-once (more adds PER_HOST_RATE spacing, not startup)")
+    parser.add_argument("--commands", default="help,check-once,manual,pincode,run",
+                        help="comma separated commands to run")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="results file of an earlier run to check for regressions")
+    parser.add_argument("--max-slowdown", type=float, default=1.5,
+                        help="allowed wall time increase against the baseline, as a factor")
+    args = parser.parse_args()
+
+    ProductPageHandler.latency = 0.0
+    page_server, page_base = start_server(ProductPageHandler)
+    api_server, api_base = start_server(CromaApiHandler)
+    env = dict(os.environ, PYTHONPATH=REPO_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""))
+
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as scratch:
+            products_path = os.path.join(scratch, "products.json")
+            with open(products_path, "w", encoding="utf-8") as f:
+                json.dump([{"id": str(i), "name": f"Stub Product {i}", "url": f"{page_base}/p/{i}"}
+                           for i in range(args.products)], f)
+
+            available = commands(f"{page_base}/p/1", api_base, products_path)
+            for name in args.commands.split(","):
+                if name not in available:
+                    parser.error(f"unknown command {name}")
+                results[name] = measure(available[name], args.repeat, scratch, env)
+    finally:
+        page_server.shutdown()
+        api_server.shutdown()
+
+    print(f"{'command':<12} {'wall (ms)':>10} {'imports (ms)':>13}  heavy modules imported")
+    for name, result in results.items():
+        print(f"{name:<12} {result['wall_ms']:>10.0f} {result['import_ms']:>13.0f}  "
+              f"{', '.join(result['heavy_modules']) or '-'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({'created_at': time.time(), 'repeat': args.repeat, 'results': results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.max_slowdown)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory and update cost of run_bot's per SKU × pincode state
+
+For each size, fills every layout with one check result per pair and reports
+the Python memory it holds (tracemalloc), then times --updates random check
+results with transition detection.
+
+  dict-of-dicts  {(sku, pincode): {'in_stock', 'price', 'last_changed', 'last_checked'}} with
+                 formatted price and timestamp strings, like the checkers' results
+  tuple dict     the layout StateStore kept before it used StateTable: {(sku, pincode):
+                 (in_stock, price text, last_changed)} plus main's {product_id: in_stock} dict
+  StateStore     the real StateStore run_bot creates (SQLite in a scratch directory), whose
+                 StateTable main's product_status reads through, after record()ing every pair
+  reloaded       the same StateStore opened again on that database, i.e. run_bot right
+                 after a restart
+
+Usage: python bench_state_table.py [--sizes 5000,50000,200000] [--pincodes 20] [--updates 200000]
+"""
+import argparse
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from croma_api import format_inr
+from state_store import EVENT_IN_STOCK, EVENT_OUT_OF_STOCK, StateStore
+
+PRICE = 24999.0
+
+
+class DictState:
+    """The dict-of-dicts baseline"""
+
+    def __init__(self):
+        self.state = {}
+
+    def record(self, sku, pincode, in_stock, price, checked_at):
+        stamp = datetime.fromtimestamp(checked_at).strftime('%Y-%m-%d %H:%M:%S')
+        previous = self.state.get((sku, pincode))
+        entry = {'in_stock': in_stock, 'price': format_inr(price), 'last_checked': stamp,
+                 'last_changed': stamp if previous is None or previous['in_stock'] != in_stock
+                 else previous['last_changed']}
+        self.state[(sku, pincode)] = entry
+        return previous is not None and previous['in_stock'] != in_stock
+
+
+class TupleState:
+    """StateStore's former in-memory copy plus main's separate product_status dict"""
+
+    def __init__(self):
+        self.state = {}
+        self.product_status = {}
+
+    def record(self, sku, pincode, in_stock, price, checked_at):
+        previous = self.state.get((sku, pincode))
+        changed = previous is not None and previous[0] != in_stock
+        last_changed = checked_at if previous is None or changed else previous[2]
+        self.state[(sku, pincode)] = (in_stock, format_inr(price), last_changed)
+        self.product_status[f"{sku}:{pincode}"] = in_stock
+        return changed
+
+
+class StoreState:
+    def __init__(self, path):
+        self.store = StateStore(path)
+        self.product_status = self.store.table.status()
+
+    def record(self, sku, pincode, in_stock, price, checked_at):
+        # Every pair is known once filled, so a stock event is a transition
+        event = self.store.record(sku, in_stock, price=price, pincode=pincode, checked_at=checked_at)
+        return event in (EVENT_IN_STOCK, EVENT_OUT_OF_STOCK)
+
+
+def pairs(size, pincodes):
+    pincode_list = [str(110001 + i * 1111) for i in range(pincodes)]
+    return [(str(300000 + i // pincodes), pincode_list[i % pincodes]) for i in range(size)]
+
+
+def traced(build):
+    """Return (result of build(), Python memory it still holds afterwards)"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, memory
+
+
+def fill(state, keys, rng, now):
+    # Build keys as the checkers would: fresh strings parsed from each result
+    for sku, pincode in keys:
+        state.record(''.join(sku), ''.join(pincode), rng.random() < 0.5, PRICE, now)
+    return state
+
+
+def time_updates(state, keys, updates, rng, now):
+    work = [(keys[rng.randrange(len(keys))], rng.random() < 0.5) for _ in range(updates)]
+    start = time.perf_counter()
+    transitions = 0
+    for (sku, pincode), in_stock in work:
+        transitions += state.record(sku, pincode, in_stock, PRICE, now + 1)
+    return (time.perf_counter() - start) / updates, transitions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="5000,50000,200000", help="comma separated numbers of SKU × pincode pairs")
+    parser.add_argument("--pincodes", type=int, default=20)
+    parser.add_argument("--updates", type=int, default=200000)
+    args = parser.parse_args()
+
+    print(f"{'pairs':>7} {'layout':<14} {'memory (MiB)':>12} {'bytes/pair':>10} {'update (us)':>11} {'transitions':>11}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        keys = pairs(size, args.pincodes)
+        now = time.time()
+        rows = []
+        for name, factory in (("dict-of-dicts", DictState), ("tuple dict", TupleState)):
+            state, memory = traced(lambda: fill(factory(), keys, random.Random(1), now))
+            rows.append((name, memory) + time_updates(state, keys, args.updates, random.Random(2), now))
+
+        with tempfile.TemporaryDirectory() as scratch:
+            path = os.path.join(scratch, "state.db")
+            state, memory = traced(lambda: fill(StoreState(path), keys, random.Random(1), now))
+            state.store.flush()
+            rows.append(("StateStore", memory) + time_updates(state, keys, args.updates, random.Random(2), now))
+            state.store.close()
+            reloaded, memory = traced(lambda: StoreState(path))
+            rows.append(("reloaded", memory, None, None))
+            reloaded.store.close()
+
+        for name, memory, per_update, transitions in rows:
+            timing = f"{per_update * 1e6:>11.2f} {transitions:>11}" if per_update is not None else ""
+            print(f"{size:>7} {name:<14} {memory / 1024 / 1024:>12.2f} {memory / size:>10.0f} {timing}")
+        if len({row[3] for row in rows if row[3] is not None}) > 1:
+            print("  transition counts differ")
+
+
+if __name__ == "__main__":
+    main()
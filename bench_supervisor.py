@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: checks per second versus number of worker processes in supervisor mode
+
+A local fixture server (in its own process) serves a large product page that
+the fast classifier tiers can't decide. Every response carries a new stock
+revision number, so the availability fingerprint never matches the last one
+and every check pays for a full parse.
+Each run keeps all products permanently due and counts how many verdicts
+reach the supervisor per second.
+
+Usage: python bench_supervisor.py [--workers 1,2,4] [--products 200] [--seconds 10]
+"""
+import argparse
+import asyncio
+import itertools
+import multiprocessing
+import os
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler
+
+from stub_servers import FIXTURE_PAGES_DIR, start_server
+
+# Filler repeated into the page so that parsing, not the network, dominates
+FILLER = '<div class="spec-row"><span class="spec-key">Feature {i}</span><span class="spec-value">Value {i}</span></div>\n'
+
+
+def build_page(filler_rows):
+    with open(os.path.join(FIXTURE_PAGES_DIR, "in_stock_price_only.html"), encoding="utf-8") as f:
+        page = f.read()
+    filler = "".join(FILLER.format(i=i) for i in range(filler_rows))
+    # Inside a node whose class mentions stock, so it is part of the availability fingerprint
+    revision = '<div class="stock-revision">{revision}</div>\n'
+    return page.replace("</main>", filler + revision + "</main>").encode("utf-8")
+
+
+def _serve(page, port_queue):
+    revisions = itertools.count()
+
+    class PageHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = page.replace(b"{revision}", str(next(revisions)).encode("ascii"))
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server, base_url = start_server(PageHandler)
+    port_queue.put(base_url)
+    while True:
+        time.sleep(3600)
+
+
+async def measure(workers, products, seconds, warmup):
+    from product_registry import RegistryDiff
+    from supervisor import Supervisor
+
+    counter = {'results': 0}
+
+    def on_result(product_id, in_stock, error, latency, price):
+        counter['results'] += 1
+
+    settings = {'use_api': False, 'max_rps': 1e6 * workers, 'host_rate': 0,
+                'base_interval': 0.01, 'min_interval': 0, 'max_interval': 0.01}
+    supervisor = Supervisor(workers, on_result, settings=settings)
+    supervisor.apply_diff(RegistryDiff(products, [], []))
+    task = asyncio.create_task(supervisor.run())
+    try:
+        await asyncio.sleep(warmup)
+        start_count, start = counter['results'], time.perf_counter()
+        await asyncio.sleep(seconds)
+        return (counter['results'] - start_count) / (time.perf_counter() - start)
+    finally:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="comma separated worker counts")
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=3, help="seconds to let workers start before counting")
+    parser.add_argument("--filler-rows", type=int, default=300, help="extra rows making each page expensive to parse")
+    args = parser.parse_args()
+
+    # Workers write page captures relative to the working directory
+    os.chdir(tempfile.mkdtemp(prefix="bench_supervisor_"))
+
+    context = multiprocessing.get_context("spawn")
+    port_queue = context.Queue()
+    server = context.Process(target=_serve, args=(build_page(args.filler_rows), port_queue), daemon=True)
+    server.start()
+    base_url = port_queue.get(timeout=30)
+
+    print(f"{os.cpu_count()} CPUs available")
+    products = [{'id': f"p{i}", 'name': f"Product {i}", 'url': f"{base_url}/p/{i}"} for i in range(args.products)]
+    try:
+        print(f"{'workers':>7}  {'checks/s':>9}  {'scaling':>7}")
+        baseline = None
+        for workers in (int(w) for w in args.workers.split(",")):
+            rate = asyncio.run(measure(workers, products, args.seconds, args.warmup))
+            baseline = baseline or rate
+            scaling = f"{rate / baseline:>6.2f}x" if baseline else "     -"
+            print(f"{workers:>7}  {rate:>9.1f}  {scaling}")
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Dict, Optional
+
+from config import (BROWSER_POOL_SIZE, BROWSER_MAX_PAGES, BROWSER_MAX_MEMORY_MB, BROWSER_LIGHTWEIGHT,
+                    CHROMEDRIVER_PATH, DRIVER_PATH_CACHE, DRIVER_PATH_CACHE_MAX_AGE)
+
+if TYPE_CHECKING:  # selenium is imported when the first browser starts, not with this module
+    from selenium import webdriver
+
+try:
+    import psutil
+except ImportError:  # psutil is optional, memory based recycling is skipped without it
+    psutil = None
+
+logger = logging.getLogger('CromaAvailabilityBot.pool')
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+
+def get_driver_path() -> str:
+    """
+    Resolve the ChromeDriver path once per process instead of on every browser start
+
+    CHROMEDRIVER_PATH wins if set. Otherwise the path webdriver_manager found
+    last time is reused from DRIVER_PATH_CACHE while the file still exists and
+    the entry is younger than DRIVER_PATH_CACHE_MAX_AGE, because install()
+    may check for a new driver over the network.
+    """
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path is None:
+            _driver_path = CHROMEDRIVER_PATH or _cached_driver_path()
+        if _driver_path is None:
+            from webdriver_manager.chrome import ChromeDriverManager
+            _driver_path = ChromeDriverManager().install()
+            _save_driver_path(_driver_path)
+        return _driver_path
+
+
+def _cached_driver_path() -> Optional[str]:
+    try:
+        with open(DRIVER_PATH_CACHE, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+        path, resolved_at = entry['path'], float(entry['resolved_at'])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    if time.time() - resolved_at > DRIVER_PATH_CACHE_MAX_AGE or not os.path.isfile(path):
+        return None
+    return path
+
+
+def _save_driver_path(path: str) -> None:
+    tmp_path = DRIVER_PATH_CACHE + '.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'path': path, 'resolved_at': time.time()}, f)
+        os.replace(tmp_path, DRIVER_PATH_CACHE)
+    except OSError as e:
+        logger.warning(f"Could not cache the ChromeDriver path in {DRIVER_PATH_CACHE}: {str(e)}")
+
+
+# Requests matching these patterns are dropped in lightweight mode
+BLOCKED_URL_PATTERNS = [
+    # Images and media
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico', '*.mp4', '*.webm',
+    # Fonts
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    # Analytics, ads and other third-party scripts
+    '*googletagmanager.com*', '*google-analytics.com*', '*doubleclick.net*', '*googlesyndication.com*',
+    '*facebook.net*', '*facebook.com/tr*', '*hotjar.com*', '*clarity.ms*', '*criteo.*', '*taboola.com*',
+    '*moengage.com*', '*webengage.com*', '*branch.io*', '*omtrdc.net*', '*adobedtm.com*',
+]
+
+
+def create_driver(lightweight: bool = False) -> 'webdriver.Chrome':
+    """
+    Start a headless Chrome configured for Croma product pages
+
+    In lightweight mode images, fonts and third-party scripts are blocked and
+    driver.get() returns without waiting for the page load event, so callers
+    must wait for the elements they need themselves.
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    options = webdriver.ChromeOptions()
+    options.add_argument('--headless')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    # Add chrome binary location if needed
+    options.binary_location = "/usr/bin/chromium-browser"  # for Ubuntu/Debian
+    options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36')
+    if lightweight:
+        options.page_load_strategy = 'none'
+        options.add_argument('--blink-settings=imagesEnabled=false')
+        options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+            'profile.managed_default_content_settings.media_stream': 2,
+            'profile.default_content_setting_values.notifications': 2,
+        })
+
+    service = Service(get_driver_path())
+    driver = webdriver.Chrome(service=service, options=options)
+    if lightweight:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+    return driver
+
+
+def browser_memory_mb(driver: 'webdriver.Chrome') -> float:
+    """RSS of chromedriver and the browser processes it started, or 0 if unknown (needs psutil)"""
+    if psutil is None:
+        return 0.0
+    try:
+        process = psutil.Process(driver.service.process.pid)
+        processes = [process] + process.children(recursive=True)
+        return sum(p.memory_info().rss for p in processes) / (1024 * 1024)
+    except Exception:
+        return 0.0
+
+
+class _PooledDriver:
+    def __init__(self, driver: 'webdriver.Chrome'):
+        self.driver = driver
+        self.pages = 0
+
+
+class DriverPool:
+    """
+    Bounded pool of long-lived headless browsers shared by concurrent checks
+
+    Drivers are started lazily up to `size`, health-checked when leased, and
+    replaced after `max_pages` page loads or once the browser uses more than
+    `max_memory_mb` of RSS (needs psutil).
+    """
+
+    def __init__(self, size: int = BROWSER_POOL_SIZE, max_pages: int = BROWSER_MAX_PAGES,
+                 max_memory_mb: float = BROWSER_MAX_MEMORY_MB, lightweight: bool = BROWSER_LIGHTWEIGHT,
+                 driver_factory: Optional[Callable[[], 'webdriver.Chrome']] = None):
+        self.size = max(1, size)
+        self.lightweight = lightweight
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.driver_factory = driver_factory or (lambda: create_driver(lightweight=lightweight))
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._live = 0
+        self._closed = False
+
+        self._created_at = time.monotonic()
+        self._startup_times = []
+        self._pages_served = 0
+        self._recycled = 0
+        self._health_failures = 0
+
+    def warm_up(self, count: Optional[int] = None) -> None:
+        """Start drivers ahead of the first lease so checks don't pay the startup cost"""
+        count = self.size if count is None else min(count, self.size)
+        started = []
+        while True:
+            with self._lock:
+                if self._live >= count:
+                    break
+                self._live += 1
+            try:
+                started.append(self._start_driver())
+            except Exception:
+                with self._lock:
+                    self._live -= 1
+                for pooled in started:
+                    self._idle.put(pooled)
+                raise
+        for pooled in started:
+            self._idle.put(pooled)
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None):
+        """
+        Borrow a healthy driver for the duration of a with-block
+
+        Raises:
+            TimeoutError: if no driver becomes free within timeout seconds
+        """
+        pooled = self._acquire(timeout)
+        try:
+            yield pooled.driver
+        except Exception:
+            # The page state is unknown after a failure, let the health check decide
+            self._release(pooled, healthy=self._is_healthy(pooled))
+            raise
+        else:
+            self._release(pooled, healthy=True)
+
+    def _acquire(self, timeout: Optional[float]) -> _PooledDriver:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self._closed:
+                raise RuntimeError("Driver pool is closed")
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                pooled = None
+                with self._lock:
+                    can_start = self._live < self.size
+                    if can_start:
+                        self._live += 1
+                if can_start:
+                    try:
+                        return self._start_driver()
+                    except Exception:
+                        with self._lock:
+                            self._live -= 1
+                        raise
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("No browser became available in the pool")
+                try:
+                    pooled = self._idle.get(timeout=remaining)
+                except queue.Empty:
+                    raise TimeoutError("No browser became available in the pool")
+
+            if self._is_healthy(pooled):
+                return pooled
+            self._health_failures += 1
+            logger.warning("Discarding unresponsive browser from pool")
+            self._discard(pooled)
+
+    def _release(self, pooled: _PooledDriver, healthy: bool) -> None:
+        pooled.pages += 1
+        with self._lock:
+            self._pages_served += 1
+
+        if self._closed or not healthy:
+            self._discard(pooled)
+            return
+        if pooled.pages >= self.max_pages or browser_memory_mb(pooled.driver) > self.max_memory_mb:
+            logger.info(f"Recycling browser after {pooled.pages} pages")
+            with self._lock:
+                self._recycled += 1
+            self._discard(pooled)
+            return
+        self._idle.put(pooled)
+
+    def _start_driver(self) -> _PooledDriver:
+        start = time.monotonic()
+        driver = self.driver_factory()
+        elapsed = time.monotonic() - start
+        with self._lock:
+            self._startup_times.append(elapsed)
+        logger.info(f"Started browser in {elapsed:.2f}s")
+        return _PooledDriver(driver)
+
+    def _discard(self, pooled: _PooledDriver) -> None:
+        with self._lock:
+            self._live -= 1
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            logger.warning(f"Error closing browser: {str(e)}")
+
+    @staticmethod
+    def _is_healthy(pooled: _PooledDriver) -> bool:
+        try:
+            return pooled.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def metrics(self) -> Dict:
+        """Startup time and throughput figures for the pool"""
+        with self._lock:
+            minutes = (time.monotonic() - self._created_at) / 60
+            startups = list(self._startup_times)
+            return {
+                'live_drivers': self._live,
+                'drivers_started': len(startups),
+                'avg_startup_seconds': sum(startups) / len(startups) if startups else 0.0,
+                'pages_served': self._pages_served,
+                'pages_per_minute': self._pages_served / minutes if minutes else 0.0,
+                'recycled': self._recycled,
+                'health_failures': self._health_failures,
+            }
+
+    def close(self) -> None:
+        """Quit every idle driver; leased drivers are quit when they are returned"""
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
@@ -0,0 +1,322 @@
+import atexit
+import gzip
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from config import (CAPTURE_DIR, CAPTURE_SAMPLE_EVERY, CAPTURE_MAX_BYTES, CAPTURE_MAX_AGE_DAYS)
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional, gzip is used without it
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:  # Not on Windows; the index is then only safe with a single writer process
+    fcntl = None
+
+logger = logging.getLogger("CromaStockAlert.capture")
+
+REASON_VERDICT_CHANGED = 'verdict_changed'
+REASON_SAMPLED = 'sampled'
+
+# Evict after this many stored objects or this many seconds, on top of the check at startup
+EVICT_EVERY = 100
+EVICT_INTERVAL = 3600
+
+
+def _compress(data):
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=6).compress(data), '.zst'
+    return gzip.compress(data, compresslevel=6), '.gz'
+
+
+def _decompress(data, path):
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is needed to read {path}")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class CaptureStore:
+    """
+    Compressed, content-addressed store of fetched product pages
+
+    submit() only queues the page; a background thread decides whether to
+    keep it, compresses it and writes it. Pages are kept whenever the verdict
+    for their URL changed, otherwise 1 in `sample_every`. Identical pages are
+    stored once under their SHA-256, with one line per capture in index.jsonl.
+
+    Captures older than `max_age_days` are dropped, then the oldest ones until
+    the objects and the index together fit in `max_bytes`; an object goes once
+    no capture refers to it. Several processes (main.py --workers) can share
+    a directory: index writes and eviction hold an exclusive lock on index.lock.
+    """
+
+    def __init__(self, directory=CAPTURE_DIR, sample_every=CAPTURE_SAMPLE_EVERY,
+                 max_bytes=CAPTURE_MAX_BYTES, max_age_days=CAPTURE_MAX_AGE_DAYS, queue_size=1000):
+        self.directory = directory
+        self.objects_dir = os.path.join(directory, 'objects')
+        self.index_path = os.path.join(directory, 'index.jsonl')
+        self.lock_path = os.path.join(directory, 'index.lock')
+        self.sample_every = max(1, sample_every)
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 86400
+
+        self.submitted = 0
+        self.stored = 0
+        self.deduplicated = 0
+        self.dropped = 0
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._last_verdicts = {}
+        self._seen = 0
+        self._writes_since_evict = 0
+        self._last_evict = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the background writer thread"""
+        with self._lock:
+            if self._thread is None:
+                os.makedirs(self.objects_dir, exist_ok=True)
+                self._thread = threading.Thread(target=self._run, name="capture-writer", daemon=True)
+                self._thread.start()
+        return self
+
+    def submit(self, url, product_name, body, verdict, encoding='utf-8'):
+        """
+        Queue a fetched page for capture without blocking the caller
+
+        Args:
+            url (str): Page URL
+            product_name (str): Product name, stored in the index
+            body (bytes): Raw response body
+            verdict (bool): Verdict the classifier reached for this page
+            encoding (str): Encoding needed to decode body for replay
+        """
+        self.submitted += 1
+        try:
+            self._queue.put_nowait((time.time(), url, product_name, body, verdict, encoding))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout=10):
+        """Write everything still queued and stop the writer thread"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while True:
+            if (self._last_evict is None or self._writes_since_evict >= EVICT_EVERY or
+                    time.monotonic() - self._last_evict >= EVICT_INTERVAL):
+                try:
+                    self._evict()
+                except Exception as e:
+                    logger.error(f"Failed to evict captured pages: {str(e)}")
+            try:
+                item = self._queue.get(timeout=EVICT_INTERVAL)
+            except queue.Empty:
+                continue
+            if item is None:
+                break
+            try:
+                self._capture(*item)
+            except Exception as e:
+                logger.error(f"Failed to capture page: {str(e)}")
+
+    @contextmanager
+    def _locked(self):
+        """Hold the store's lock, shared with other processes using the same directory"""
+        with open(self.lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield  # Closing the file releases the lock
+
+    def _capture(self, captured_at, url, product_name, body, verdict, encoding):
+        self._seen += 1
+        previous = self._last_verdicts.get(url)
+        self._last_verdicts[url] = verdict
+        if previous is not None and previous != verdict:
+            reason = REASON_VERDICT_CHANGED
+        elif previous is None or self._seen % self.sample_every == 0:
+            reason = REASON_SAMPLED
+        else:
+            return
+
+        digest = hashlib.sha256(body).hexdigest()
+        entry = {
+            'captured_at': captured_at,
+            'url': url,
+            'product_name': product_name,
+            'sha256': digest,
+            'verdict': verdict,
+            'encoding': encoding,
+            'reason': reason,
+        }
+        compressed = None
+        if self._object_path(digest) is None:
+            compressed = _compress(body)
+        # The object and its index line are written together so eviction never sees one without the other
+        with self._locked():
+            if self._object_path(digest) is not None:
+                self.deduplicated += 1
+            else:
+                data, suffix = compressed or _compress(body)
+                object_path = os.path.join(self.objects_dir, digest[:2], digest + suffix)
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                tmp_path = object_path + '.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, object_path)
+                self.stored += 1
+                self._writes_since_evict += 1
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+
+    def _object_path(self, digest):
+        """Path of the stored object for a digest, or None if it isn't stored"""
+        for suffix in ('.zst', '.gz'):
+            path = os.path.join(self.objects_dir, digest[:2], digest + suffix)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _evict(self):
+        """Drop captures past max_age, then the oldest until under max_bytes, and delete unreferenced objects"""
+        self._writes_since_evict = 0
+        self._last_evict = time.monotonic()
+        with self._locked():
+            objects = {}  # digest -> (size, path)
+            for root, _, files in os.walk(self.objects_dir):
+                for name in files:
+                    if name.endswith('.tmp'):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        objects[name.split('.', 1)[0]] = (os.path.getsize(path), path)
+                    except FileNotFoundError:
+                        continue
+
+            # (captured_at, digest, line length) per index line, in file order, which is capture order
+            lines = []
+            if os.path.exists(self.index_path):
+                with open(self.index_path, 'rb') as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                            lines.append((entry['captured_at'], entry['sha256'], len(line)))
+                        except (ValueError, KeyError):
+                            lines.append((0, None, len(line)))
+
+            references = Counter(digest for _, digest, _ in lines)
+            total = (sum(length for _, _, length in lines) +
+                     sum(objects[digest][0] for digest in references if digest in objects))
+            cutoff = time.time() - self.max_age
+            keep = []
+            for captured_at, digest, length in lines:
+                if digest is not None and captured_at >= cutoff and total <= self.max_bytes:
+                    keep.append(True)
+                    continue
+                keep.append(False)
+                total -= length
+                references[digest] -= 1
+                if references[digest] == 0 and digest in objects:
+                    total -= objects[digest][0]
+
+            dropped = keep.count(False)
+            if dropped:
+                self._rewrite_index(keep)
+            removed = 0
+            for digest, (_, path) in objects.items():
+                if references[digest] <= 0:
+                    try:
+                        os.remove(path)
+                        removed += 1
+                    except FileNotFoundError:
+                        pass
+        if dropped or removed:
+            logger.info(f"Evicted {dropped} captures and {removed} captured pages")
+
+    def _rewrite_index(self, keep):
+        """Rewrite the index with only the lines whose flag in `keep` is set; call with the lock held"""
+        tmp_path = self.index_path + '.tmp'
+        with open(self.index_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            for line, kept in zip(src, keep):
+                if kept:
+                    dst.write(line)
+        os.replace(tmp_path, self.index_path)
+
+    def iter_captures(self, since=0):
+        """
+        Yield (index entry, page HTML) for every capture still stored, oldest first
+
+        Reads one page at a time so large stores can be replayed in constant memory.
+        """
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry['captured_at'] < since:
+                    continue
+                path = self._object_path(entry['sha256'])
+                if path is None:
+                    continue
+                with open(path, 'rb') as obj:
+                    body = _decompress(obj.read(), path)
+                yield entry, body.decode(entry.get('encoding') or 'utf-8', errors='replace')
+
+    def replay(self, classify=None, since=0):
+        """
+        Run captured pages back through the classifier
+
+        Yields:
+            tuple: (index entry, recorded verdict, new verdict)
+        """
+        if classify is None:
+            from stock_classifier import classify_stock as classify
+        for entry, html in self.iter_captures(since):
+            yield entry, entry['verdict'], classify(html, entry['product_name'])
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_capture_store():
+    """Return the shared, started capture store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = CaptureStore().start()
+            atexit.register(_store.close)
+        return _store
+
+
+if __name__ == "__main__":
+    # Replay every captured page and report verdicts that differ from the recorded ones
+    logging.basicConfig(level=logging.WARNING)
+    total = mismatched = 0
+    for entry, recorded, current in CaptureStore().replay():
+        total += 1
+        if recorded != current:
+            mismatched += 1
+            print(f"{entry['product_name']} ({entry['url']}) captured {entry['captured_at']:.0f}: "
+                  f"recorded {recorded}, now {current}")
+    print(f"Replayed {total} captured pages, {mismatched} verdict changes")
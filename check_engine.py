@@ -0,0 +1,85 @@
+import asyncio
+import logging
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import http_pool
+import metrics
+from config import CHECK_CONCURRENCY, PER_HOST_RATE
+
+logger = logging.getLogger("CromaStockAlert.engine")
+
+# error is None on success; latency is the wall time of the check itself in seconds;
+# price is None unless the check function reported one
+CheckResult = namedtuple('CheckResult', ['product', 'in_stock', 'error', 'latency', 'price'], defaults=(None,))
+
+
+class HostRateLimiter:
+    """Spaces out request start times so that no host gets more than `rate` requests per second"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next_slot = {}
+
+    async def wait(self, host):
+        """Wait until the next free request slot for a host"""
+        if not self.interval:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next_slot.get(host, now))
+        self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class CheckEngine:
+    """
+    Runs blocking stock checks concurrently on a thread pool
+
+    Args:
+        check_func (callable): check_func(url, name) -> bool, e.g. check_stock_with_requests,
+            or -> (bool, price) like check_stock_and_price; None for the bool means "unknown"
+        concurrency (int): Maximum number of checks in flight at once
+        host_rate (float): Maximum requests per second per host (0 disables the limit)
+    """
+
+    def __init__(self, check_func, concurrency=CHECK_CONCURRENCY, host_rate=PER_HOST_RATE):
+        self.check_func = check_func
+        self.concurrency = max(1, concurrency)
+        http_pool.ensure_pool_size(self.concurrency)
+        self.rate_limiter = HostRateLimiter(host_rate)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="check")
+        self._semaphore = None
+
+    async def check_product(self, product):
+        """Check a single product, returning a CheckResult"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        async with self._semaphore:
+            await self.rate_limiter.wait(urlsplit(product['url']).netloc)
+            loop = asyncio.get_running_loop()
+            start = time.monotonic()
+            try:
+                outcome = await loop.run_in_executor(
+                    self._executor, self.check_func, product['url'], product['name']
+                )
+                in_stock, price = outcome if isinstance(outcome, tuple) else (outcome, None)
+                return CheckResult(product, in_stock, None, time.monotonic() - start, price)
+            except Exception as e:
+                return CheckResult(product, False, e, time.monotonic() - start)
+
+    async def sweep(self, products):
+        """Check all products concurrently, returning results in the same order as products"""
+        start = time.monotonic()
+        results = await asyncio.gather(*(self.check_product(p) for p in products))
+        duration = time.monotonic() - start
+        metrics.sweep_seconds.observe(duration)
+        logger.info(f"Checked {len(products)} products in {duration:.2f}s")
+        return results
+
+    def close(self):
+        """Shut down the worker threads"""
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+
+import metrics
+from config import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_MAX_OPEN_SECONDS, CIRCUIT_OPEN_SECONDS
+
+logger = logging.getLogger("CromaStockAlert.circuit")
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Statuses that mean the host is refusing or throttling us rather than answering
+BLOCKED_STATUS_CODES = frozenset({403, 429})
+
+
+def is_failure_status(status_code):
+    """True for responses that count against a host: blocks, throttling and server errors"""
+    return status_code in BLOCKED_STATUS_CODES or status_code >= 500
+
+
+def retry_after(headers):
+    """Seconds asked for in a Retry-After header, or None (the HTTP-date form is ignored)"""
+    value = headers.get('Retry-After')
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a host that keeps failing or blocking us, then probes it again
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    allow() refuses requests for `open_seconds` (or longer if the host sent
+    Retry-After). Then a single probe request is let through (half-open):
+    success closes the circuit, failure opens it again for twice as long, up
+    to `max_open_seconds`.
+    """
+
+    def __init__(self, name, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, open_seconds=CIRCUIT_OPEN_SECONDS,
+                 max_open_seconds=CIRCUIT_MAX_OPEN_SECONDS, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0       # Consecutive failures while closed
+        self.trips = 0          # Consecutive times the circuit opened without a successful probe
+        self._open_until = 0.0
+        self._probe_started = None
+
+    def allow(self):
+        """Whether a request may be sent now; in half-open state only one probe at a time is allowed"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = self.clock()
+            if self.state == OPEN:
+                if now < self._open_until:
+                    return False
+                self._set_state(HALF_OPEN)
+            # A probe that never reported back (e.g. its thread died) doesn't block the host forever
+            if self._probe_started is not None and now - self._probe_started < self.open_seconds:
+                return False
+            self._probe_started = now
+            return True
+
+    def retry_in(self):
+        """Seconds until the next request will be allowed, 0 if it would be now"""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self._open_until - self.clock())
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.trips = 0
+            self._probe_started = None
+            if self.state != CLOSED:
+                logger.info(f"{self.name} is answering again, resuming requests")
+                self._set_state(CLOSED)
+
+    def record_failure(self, retry_after=None):
+        """Count a failed request; retry_after (seconds) keeps the circuit open at least that long"""
+        with self._lock:
+            self.failures += 1
+            self._probe_started = None
+            if self.state == CLOSED and self.failures < self.failure_threshold and not retry_after:
+                return
+            if self.state == OPEN:
+                # A request sent before the circuit opened; don't stretch the backoff for it
+                if retry_after:
+                    self._open_until = max(self._open_until, self.clock() + retry_after)
+                return
+            delay = min(self.max_open_seconds, self.open_seconds * (2 ** self.trips))
+            if retry_after:
+                delay = max(delay, retry_after)
+            self.trips += 1
+            self._open_until = self.clock() + delay
+            logger.warning(f"Pausing requests to {self.name} for {delay:.0f}s after {self.failures} failures")
+            self._set_state(OPEN)
+
+    def _set_state(self, state):
+        self.state = state
+        metrics.circuit_transitions.inc(host=self.name, state=state)
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(host):
+    """Return the process-wide CircuitBreaker for a host"""
+    breaker = _breakers.get(host)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(host, CircuitBreaker(host))
+    return breaker
+
+
+def open_circuits():
+    """{host: seconds until its next probe} for every host whose circuit is open"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.retry_in() for b in breakers if b.state == OPEN}
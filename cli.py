@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Croma Stock Alert command line
+
+  run          monitor products.json and send Telegram alerts (same as main.py)
+  check-once   check every product once and print the verdicts
+  manual       fetch one product page and print what the page analysis finds
+  pincode      check delivery of one product to one or more pincodes
+  stats        availability uptime and time-to-restock from the check event log
+
+Each subcommand imports only what it uses, so e.g. check-once never loads
+selenium and pincode only loads it if the page has to be rendered.
+"""
+import argparse
+import logging
+import sys
+
+
+def cmd_run(args):
+    import main
+    main.start(workers=args.workers)
+
+
+def cmd_check_once(args):
+    import asyncio
+    from check_engine import CheckEngine
+    from event_log import CHECKER_STOCK, check_event, get_event_log
+    from product_registry import ProductRegistry
+    from stock_checker import check_stock_and_price, check_stock_and_price_with_api
+    from config import CROMA_API_ENABLED, EVENT_LOG_ENABLED, PRODUCTS_PATH
+
+    registry = ProductRegistry(args.products or PRODUCTS_PATH)
+    registry.refresh()
+    if not len(registry):
+        print(f"No products found in {registry.path}")
+        return 1
+
+    use_api = CROMA_API_ENABLED if args.api is None else args.api
+    engine = CheckEngine(check_stock_and_price_with_api if use_api else check_stock_and_price)
+    try:
+        results = asyncio.run(engine.sweep(registry.products))
+    finally:
+        engine.close()
+
+    event_log = get_event_log() if EVENT_LOG_ENABLED else None
+    for result in results:
+        if event_log is not None:
+            event_log.append(check_event(CHECKER_STOCK, result.product['id'], result.product['url'],
+                                         result.in_stock if result.error is None else None, price=result.price,
+                                         latency=result.latency,
+                                         error=str(result.error) if result.error is not None else None))
+        if result.error is not None:
+            verdict = f"ERROR ({result.error})"
+        elif result.in_stock is None:
+            verdict = "UNKNOWN"
+        else:
+            verdict = "IN STOCK" if result.in_stock else "OUT OF STOCK"
+        price = f"  ₹{result.price:,.0f}" if result.price is not None else ""
+        print(f"{verdict:<13} {result.latency * 1000:>6.0f} ms  {result.product['name']}{price}")
+    return 0
+
+
+def cmd_manual(args):
+    from manual_check import manual_check
+    options = {'url': args.url} if args.url else {}
+    if args.name:
+        options['product_name'] = args.name
+    manual_check(**options)
+
+
+def cmd_pincode(args):
+    from product_checker import CromaProductChecker
+
+    options = {}
+    if args.api is not None:
+        options['use_api'] = args.api
+    if args.api_base:
+        from croma_api import CromaApiClient
+        options['api_client'] = CromaApiClient(args.api_base)
+    checker = CromaProductChecker(**options)
+    try:
+        results = checker.check_pincodes(args.url, args.pincodes)
+    finally:
+        checker.close()
+
+    for pincode, result in results.items():
+        print(f"\nPincode {pincode}")
+        print("=" * 50)
+        for key, value in result.items():
+            print(f"{key}: {value}")
+    return 0
+
+
+def cmd_stats(args):
+    import time
+    from event_log import aggregate
+    from config import EVENT_LOG_PATH
+
+    since = time.time() - args.hours * 3600 if args.hours else 0
+    results = aggregate(args.path or EVENT_LOG_PATH, since=since)
+    if not results:
+        print("No check events logged yet")
+        return 1
+
+    print(f"{'product':<24} {'pincode':<8} {'checks':>7} {'unknown':>8} {'uptime':>7} {'restocks':>9} "
+          f"{'mean restock':>13} {'max restock':>12}  now")
+    for (product_id, pincode), stats in sorted(results.items()):
+        uptime = f"{stats['uptime']:.1%}" if stats['uptime'] is not None else "-"
+        now = {True: "in stock", False: "out of stock", None: "unknown"}[stats['in_stock']]
+        print(f"{product_id[:24]:<24} {pincode or '-':<8} {stats['checks']:>7} {stats['unknown']:>8} {uptime:>7} "
+              f"{stats['restocks']:>9} {_duration(stats['mean_time_to_restock']):>13} "
+              f"{_duration(stats['max_time_to_restock']):>12}  {now}")
+    return 0
+
+
+def _duration(seconds):
+    if seconds is None:
+        return "-"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f}m"
+    if seconds < 86400:
+        return f"{seconds / 3600:.1f}h"
+    return f"{seconds / 86400:.1f}d"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-q", "--quiet", action="store_true", help="only log warnings and errors")
+    subcommands = parser.add_subparsers(dest="command", metavar="command")
+    subcommands.required = True
+
+    run = subcommands.add_parser("run", help="monitor products and send alerts")
+    run.add_argument("--workers", type=int, default=1,
+                     help="number of checker processes (default: check in this process)")
+    run.set_defaults(func=cmd_run)
+
+    check_once = subcommands.add_parser("check-once", help="check every product once and print the verdicts")
+    check_once.add_argument("--products", default=None, help="product file or directory (default: PRODUCTS_PATH)")
+    _add_api_flags(check_once)
+    check_once.set_defaults(func=cmd_check_once)
+
+    manual = subcommands.add_parser("manual", help="fetch one product page and print the analysis")
+    manual.add_argument("url", nargs="?", help="product page (default: the page manual_check.py looks at)")
+    manual.add_argument("--name", help="product name to print")
+    manual.set_defaults(func=cmd_manual)
+
+    pincode = subcommands.add_parser("pincode", help="check delivery of a product to pincodes")
+    pincode.add_argument("url")
+    pincode.add_argument("pincodes", nargs="+")
+    pincode.add_argument("--api-base", help="Croma API root, e.g. a local stand-in server")
+    _add_api_flags(pincode)
+    pincode.set_defaults(func=cmd_pincode)
+
+    stats = subcommands.add_parser("stats", help="availability uptime and time-to-restock per product")
+    stats.add_argument("--hours", type=float, help="only look at the last N hours")
+    stats.add_argument("--path", help="event log to read (default: EVENT_LOG_PATH)")
+    stats.set_defaults(func=cmd_stats)
+    return parser
+
+
+def _add_api_flags(parser):
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--api", dest="api", action="store_true", default=None,
+                       help="ask the Croma API first (default: CROMA_API_ENABLED)")
+    group.add_argument("--no-api", dest="api", action="store_false", help="only look at the product page")
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.quiet:
+        logging.getLogger("CromaStockAlert").setLevel(logging.WARNING)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
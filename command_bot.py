@@ -0,0 +1,359 @@
+import asyncio
+import json
+import logging
+import os
+import re
+from urllib.parse import urlsplit
+
+from config import BOT_CHATS_PATH, DELIVERY_CHECK_INTERVAL, TELEGRAM_BOT_TOKEN, TELEGRAM_POLL_TIMEOUT
+from croma_api import CromaApiError, get_client, sku_from_url
+from notifier import MAX_MESSAGE_LENGTH
+from telegram_bot import TelegramError, call_api, get_updates
+
+logger = logging.getLogger("CromaStockAlert.bot")
+
+HELP_TEXT = (
+    "Commands:\n"
+    "/watch <croma product url> - get alerts for a product\n"
+    "/unwatch <url or product code> - stop alerts for a product\n"
+    "/pincode <pincode> - get told whether your products deliver there\n"
+    "/status - stock status of your products"
+)
+
+_PINCODE_PATTERN = re.compile(r'^[1-9]\d{5}$')
+
+
+def name_from_url(url):
+    """Readable product name from the URL slug, e.g. …/vivo-x200-fe-5g/p/316890 -> Vivo X200 Fe 5g"""
+    parts = [p for p in urlsplit(url).path.split('/') if p]
+    slug = parts[-3] if len(parts) >= 3 and parts[-2] == 'p' else (parts[0] if parts else url)
+    return ' '.join(word.capitalize() for word in slug.split('-') if word) or url
+
+
+class CommandBot:
+    """
+    Telegram command handler that runs on the same event loop as the checker
+
+    A long-polling getUpdates loop reads commands; /watch and /unwatch change
+    the product registry and hand the resulting RegistryDiff to
+    `on_products_changed` so the scheduler picks it up straight away. /status
+    answers from the verdicts already in memory and never triggers a check.
+
+    Chats that set a /pincode have their watched products checked for home
+    delivery there every `delivery_interval` seconds (and right after the
+    pincode changes), with one serviceability call per pincode, and get a
+    message whenever a product becomes deliverable or stops being so.
+
+    Args:
+        registry (ProductRegistry): Products being monitored
+        product_status (dict): product id -> last verdict, as kept by main
+        store (StateStore): Source of last prices and change times, optional
+        on_products_changed (callable): on_products_changed(diff) after /watch or /unwatch
+        allowed_chats (list): Chats that may use commands, None allows any chat
+        chats_path (str): JSON file keeping each chat's products and pincode
+        poll_timeout (int): getUpdates long-poll timeout in seconds
+        api_client (CromaApiClient): Client for serviceability checks, defaults to the shared one
+        delivery_interval (float): Seconds between serviceability checks
+    """
+
+    def __init__(self, registry, product_status, store=None, on_products_changed=None, allowed_chats=None,
+                 chats_path=BOT_CHATS_PATH, poll_timeout=TELEGRAM_POLL_TIMEOUT, api_client=None,
+                 delivery_interval=DELIVERY_CHECK_INTERVAL):
+        self.registry = registry
+        self.product_status = product_status
+        self.store = store
+        self.on_products_changed = on_products_changed
+        self.allowed_chats = None if allowed_chats is None else {str(c) for c in allowed_chats}
+        self.chats_path = chats_path
+        self.poll_timeout = poll_timeout
+        self.api_client = api_client
+        self.delivery_interval = delivery_interval
+        # chat id -> {'products': [ids], 'pincode': str or None, 'delivery': {product id: deliverable}}
+        self.chats = self._load_chats()
+        self._offset = None
+        self._tasks = []
+        self._delivery_due = None
+
+    def _load_chats(self):
+        try:
+            with open(self.chats_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not read {self.chats_path}, starting without chat settings: {str(e)}")
+            return {}
+
+    def _save_chats(self):
+        tmp_path = self.chats_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.chats, f, indent=2)
+        os.replace(tmp_path, self.chats_path)
+
+    def _chat(self, chat_id):
+        chat = self.chats.setdefault(chat_id, {'products': [], 'pincode': None})
+        chat.setdefault('delivery', {})
+        return chat
+
+    def chats_watching(self, product_id):
+        """Chats that asked for alerts about a product with /watch"""
+        return [chat_id for chat_id, chat in self.chats.items() if product_id in chat['products']]
+
+    def start(self):
+        """Start polling for commands and checking delivery on the running event loop"""
+        if not self._tasks:
+            self._delivery_due = asyncio.Event()
+            self._tasks = [asyncio.create_task(self._run()), asyncio.create_task(self._watch_delivery())]
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    async def _run(self):
+        if not TELEGRAM_BOT_TOKEN:
+            logger.error("Telegram bot token is not configured in config.py, commands are disabled")
+            return
+        loop = asyncio.get_running_loop()
+        backoff = 1.0
+        while True:
+            try:
+                updates = await loop.run_in_executor(None, get_updates, self._offset, self.poll_timeout)
+                backoff = 1.0
+            except TelegramError as e:
+                delay = float(e.retry_after) if e.retry_after else backoff
+                backoff = min(backoff * 2, 60.0)
+                logger.warning(f"Polling Telegram for commands failed: {str(e)}, retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            for update in updates:
+                self._offset = update['update_id'] + 1
+                try:
+                    await self.handle_update(update)
+                except Exception as e:
+                    logger.error(f"Error handling Telegram update {update.get('update_id')}: {str(e)}")
+
+    async def handle_update(self, update):
+        message = update.get('message') or {}
+        text = message.get('text')
+        chat_id = message.get('chat', {}).get('id')
+        if not text or chat_id is None:
+            return
+        reply = self.handle_command(str(chat_id), text)
+        if reply:
+            await self._reply(str(chat_id), reply)
+
+    async def _reply(self, chat_id, text):
+        loop = asyncio.get_running_loop()
+        payload = {'chat_id': chat_id, 'text': text[:MAX_MESSAGE_LENGTH], 'disable_web_page_preview': True}
+        try:
+            await loop.run_in_executor(None, call_api, 'sendMessage', payload)
+        except TelegramError as e:
+            logger.error(f"Could not reply to Telegram chat {chat_id}: {str(e)}")
+
+    def handle_command(self, chat_id, text):
+        """
+        Run one command and return the reply text (None for messages that aren't commands)
+        """
+        if not text.startswith('/'):
+            return None
+        command, _, argument = text.strip().partition(' ')
+        command = command.split('@', 1)[0].lower()  # /status@MyBot in group chats
+        argument = argument.strip()
+
+        if self.allowed_chats is not None and chat_id not in self.allowed_chats:
+            logger.warning(f"Ignoring {command} from chat {chat_id}, which is not allowed to use commands")
+            return "Sorry, this bot only takes commands from its configured chats."
+
+        handler = {
+            '/watch': self._watch,
+            '/unwatch': self._unwatch,
+            '/pincode': self._pincode,
+            '/status': self._status,
+        }.get(command)
+        if handler is None:
+            return HELP_TEXT
+        logger.info(f"Command {command} from chat {chat_id}")
+        return handler(chat_id, argument)
+
+    def _watch(self, chat_id, argument):
+        if not argument:
+            return "Usage: /watch <croma product url>"
+        url = argument.split()[0]
+        host = urlsplit(url).netloc.lower()
+        try:
+            sku = sku_from_url(url)
+        except CromaApiError:
+            sku = None
+        if sku is None or not (host == 'croma.com' or host.endswith('.croma.com')):
+            return "That doesn't look like a Croma product link (…croma.com/…/p/123456)."
+
+        product = self._find_product(sku)
+        if product is None:
+            product = {'id': sku, 'name': name_from_url(url), 'url': url}
+            diff = self.registry.watch(product)
+            self._products_changed(diff)
+
+        chat = self._chat(chat_id)
+        if product['id'] not in chat['products']:
+            chat['products'].append(product['id'])
+            self._save_chats()
+        return f"Watching {product['name']}. You'll get a message when its stock or price changes."
+
+    def _find_product(self, sku):
+        """The monitored product for a SKU, whether its id is the SKU or not"""
+        product = self.registry.get(sku)
+        if product is not None:
+            return product
+        for product in self.registry.products:
+            try:
+                if sku_from_url(product['url']) == sku:
+                    return product
+            except CromaApiError:
+                continue
+        return None
+
+    def _unwatch(self, chat_id, argument):
+        chat = self._chat(chat_id)
+        if not argument:
+            return "Usage: /unwatch <url or product code>"
+        product_id = argument.split()[0]
+        try:
+            product = self._find_product(sku_from_url(product_id))
+            if product is not None:
+                product_id = product['id']
+        except CromaApiError:
+            pass
+        if product_id not in chat['products']:
+            return f"You aren't watching {product_id}."
+
+        chat['products'].remove(product_id)
+        chat['delivery'].pop(product_id, None)
+        self._save_chats()
+        # Stop checking products added with /watch once nobody watches them
+        if not self.chats_watching(product_id) and self.registry.is_watched(product_id):
+            self._products_changed(self.registry.unwatch(product_id))
+        return f"Stopped watching {product_id}."
+
+    def _pincode(self, chat_id, argument):
+        chat = self._chat(chat_id)
+        if not argument:
+            current = chat.get('pincode')
+            return f"Your pincode is {current}." if current else "Usage: /pincode <6 digit pincode>"
+        if not _PINCODE_PATTERN.match(argument):
+            return "Pincodes have 6 digits and don't start with 0."
+        if argument != chat.get('pincode'):
+            chat['pincode'] = argument
+            chat['delivery'] = {}
+            self._save_chats()
+            if self._delivery_due is not None:
+                self._delivery_due.set()
+        return (f"Pincode set to {argument}. I'll tell you which of your products can be delivered there, "
+                f"and when that changes.")
+
+    def _status(self, chat_id, argument):
+        """Answered from in-memory state only"""
+        chat = self._chat(chat_id)
+        product_ids = chat['products']
+        # Chats configured to get every alert see every product
+        if not product_ids and (self.allowed_chats is None or chat_id in self.allowed_chats):
+            product_ids = [p['id'] for p in self.registry.products]
+        if not product_ids:
+            return "You aren't watching any products. Use /watch <croma product url>."
+
+        lines = []
+        for product_id in product_ids:
+            product = self.registry.get(product_id)
+            name = product['name'] if product else product_id
+            in_stock = self.product_status.get(product_id)
+            state = self.store.get(product_id) if self.store is not None else None
+            if in_stock is None:
+                line = f"⏳ {name}: not checked yet"
+            else:
+                line = f"{'✅' if in_stock else '❌'} {name}: {'in stock' if in_stock else 'out of stock'}"
+            if state and state.get('price'):
+                line += f", {state['price']}"
+            deliverable = chat['delivery'].get(product_id)
+            if deliverable is not None:
+                line += f", {'delivers' if deliverable else 'no delivery'} to {chat['pincode']}"
+            lines.append(line)
+        if chat.get('pincode'):
+            lines.append(f"\nPincode: {chat['pincode']}")
+        return '\n'.join(lines)
+
+    async def _watch_delivery(self):
+        if not TELEGRAM_BOT_TOKEN:
+            return
+        while True:
+            self._delivery_due.clear()
+            try:
+                await self.check_delivery()
+            except Exception as e:
+                logger.error(f"Error checking delivery to chat pincodes: {str(e)}")
+            try:
+                await asyncio.wait_for(self._delivery_due.wait(), self.delivery_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def check_delivery(self):
+        """Check every chat's watched products at its pincode and message the chats whose results changed"""
+        products_by_pincode = {}
+        for chat in self.chats.values():
+            if chat.get('pincode') and chat['products']:
+                products_by_pincode.setdefault(chat['pincode'], set()).update(chat['products'])
+        if not products_by_pincode:
+            return
+
+        client = self.api_client or get_client()
+        loop = asyncio.get_running_loop()
+        changed = False
+        for pincode, product_ids in products_by_pincode.items():
+            skus = {}
+            for product_id in product_ids:
+                product = self.registry.get(product_id)
+                try:
+                    skus[product_id] = sku_from_url(product['url']) if product else None
+                except CromaApiError:
+                    skus[product_id] = None
+            try:
+                deliverable = await loop.run_in_executor(
+                    None, client.get_serviceability, sorted({sku for sku in skus.values() if sku}), pincode)
+            except CromaApiError as e:
+                logger.warning(f"Could not check delivery to {pincode}: {str(e)}")
+                continue
+
+            for chat_id, chat in self.chats.items():
+                if chat.get('pincode') != pincode:
+                    continue  # Also skips chats whose pincode changed while the call was running
+                known = chat.setdefault('delivery', {})
+                lines = []
+                for product_id in chat['products']:
+                    if skus.get(product_id) is None:
+                        continue
+                    now = deliverable.get(skus[product_id], False)
+                    before = known.get(product_id)
+                    if before == now:
+                        continue
+                    known[product_id] = now
+                    changed = True
+                    product = self.registry.get(product_id)
+                    name = product['name'] if product else product_id
+                    if before is None:
+                        lines.append(f"{'📦' if now else '🚫'} {name}: "
+                                     f"{'can be delivered' if now else 'no home delivery'}")
+                    else:
+                        lines.append(f"{'📦' if now else '🚫'} {name} can {'now' if now else 'no longer'} "
+                                     f"be delivered")
+                if lines:
+                    await self._reply(chat_id, f"Delivery to {pincode}:\n" + '\n'.join(lines))
+        if changed:
+            self._save_chats()
+
+    def _products_changed(self, diff):
+        if self.on_products_changed is not None and (diff.added or diff.removed or diff.changed):
+            self.on_products_changed(diff)
@@ -4,3 +4,79 @@ TELEGRAM_CHAT_ID = ""    # Your Telegram chat ID
 
 # Check interval in seconds
 CHECK_INTERVAL = 20  # Check every 20 seconds
+
+# Concurrent check engine
+CHECK_CONCURRENCY = 8  # Maximum number of product checks in flight at once
+PER_HOST_RATE = 5.0    # Maximum requests per second sent to any single host
+
+# Circuit breaker for hosts that block or fail us (403, 429, 5xx, captcha pages, timeouts)
+CIRCUIT_FAILURE_THRESHOLD = 3    # Consecutive failures before requests to a host are paused
+CIRCUIT_OPEN_SECONDS = 30        # First pause, doubled after every failed probe
+CIRCUIT_MAX_OPEN_SECONDS = 900   # Longest pause
+
+# Headless browser pool used by product_checker
+BROWSER_POOL_SIZE = 2         # Maximum number of browsers kept running
+BROWSER_MAX_PAGES = 200       # Restart a browser after this many page loads
+BROWSER_MAX_MEMORY_MB = 1024  # Restart a browser once it uses more memory than this (needs psutil)
+BROWSER_LIGHTWEIGHT = True    # Block images, fonts and trackers and stop loading once stock/price are shown
+
+# ChromeDriver location; resolving it with webdriver_manager may hit the network
+CHROMEDRIVER_PATH = ""                         # Use this chromedriver and skip webdriver_manager entirely
+DRIVER_PATH_CACHE = ".chromedriver_path.json"  # Last path webdriver_manager resolved, reused across runs
+DRIVER_PATH_CACHE_MAX_AGE = 7 * 24 * 3600      # Resolve again after this many seconds
+
+# Croma JSON API used instead of rendering product pages
+CROMA_API_ENABLED = True                 # Fall back to page scraping only when the API call fails
+CROMA_API_BASE = "https://api.croma.com"
+SERVICEABILITY_CACHE_TTL = 900           # Reuse a (SKU, pincode) availability result for this many seconds
+
+# Telegram notification dispatcher
+TELEGRAM_CHAT_IDS = []                        # Extra chat IDs that receive every alert
+TELEGRAM_API_BASE = "https://api.telegram.org"
+NOTIFY_COALESCE_SECONDS = 2.0                 # Alerts for the same chat within this window are sent as one message
+NOTIFY_MAX_RETRIES = 5                        # Give up on a message after this many failed attempts
+
+# Telegram commands (/watch, /unwatch, /pincode, /status)
+TELEGRAM_COMMANDS_ENABLED = True
+TELEGRAM_POLL_TIMEOUT = 25        # Long-poll timeout for getUpdates (seconds)
+TELEGRAM_ALLOW_ANY_CHAT = False   # Only the chats above may use commands unless this is True
+BOT_CHATS_PATH = "bot_chats.json" # Per-chat watched products and pincode
+DELIVERY_CHECK_INTERVAL = 900     # Seconds between serviceability checks of watched products at each chat's pincode
+
+# Persistent state and history
+STATE_DB_PATH = "croma_state.db"  # SQLite database holding last verdicts and check history
+STATE_FLUSH_INTERVAL = 5.0        # Write buffered check results at least this often (seconds)
+STATE_FLUSH_BATCH = 200           # ...or as soon as this many are buffered
+
+# Adaptive polling scheduler (CHECK_INTERVAL is the starting interval for each product)
+SCHEDULER_MIN_INTERVAL = 10    # Never check a product more often than this (seconds)
+SCHEDULER_MAX_INTERVAL = 600   # Never leave a product unchecked for longer than this (seconds)
+SCHEDULER_MAX_RPS = 2.0        # Global budget of checks started per second
+SCHEDULER_JITTER = 0.1         # Randomise each interval by up to +/-10%
+
+# Check result event log (JSON lines, one per check, read with `python cli.py stats`)
+EVENT_LOG_ENABLED = True
+EVENT_LOG_PATH = "check_events.jsonl"
+EVENT_LOG_MAX_BYTES = 50 * 1024 * 1024  # Rotate to check_events.jsonl.1 beyond this size
+EVENT_LOG_BACKUPS = 5                   # Rotated files kept
+EVENT_LOG_FLUSH_INTERVAL = 5.0          # Write buffered events at least this often (seconds)
+EVENT_LOG_FLUSH_BATCH = 500             # ...or as soon as this many are buffered
+
+# Product list
+PRODUCTS_PATH = "products.json"  # A .json list, a .jsonl file, or a directory of .json/.jsonl shards
+PRODUCTS_RELOAD_INTERVAL = 5     # Seconds between checks for changes to the product files
+WATCHLIST_PATH = "watchlist.jsonl"  # Products added with /watch, loaded on top of PRODUCTS_PATH
+
+# Page capture store (replaces the per-check HTML dumps in responses/)
+CAPTURE_ENABLED = True
+CAPTURE_DIR = "captures"
+CAPTURE_SAMPLE_EVERY = 50               # Keep 1 in N pages; pages whose verdict changed are always kept
+CAPTURE_MAX_BYTES = 200 * 1024 * 1024   # Evict the oldest captures beyond this total compressed size
+CAPTURE_MAX_AGE_DAYS = 7                # Evict captures older than this
+
+# Multi-process mode (python main.py --workers N)
+SUPERVISOR_RESTART_DELAY = 5  # Seconds to wait before restarting a crashed worker process
+
+# Prometheus-style metrics endpoint (http://METRICS_HOST:METRICS_PORT/metrics)
+METRICS_PORT = 9108         # 0 disables the endpoint
+METRICS_HOST = "127.0.0.1"
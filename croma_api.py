@@ -0,0 +1,221 @@
+import logging
+import re
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import http_pool
+from circuit_breaker import breaker_for, is_failure_status, retry_after
+from config import CROMA_API_BASE
+
+logger = logging.getLogger("CromaStockAlert.api")
+
+# Endpoints the Croma product page calls for product data, prices and pincode serviceability
+PRODUCT_PATH = "/product/allchannels/v1/detail"
+PRICE_PATH = "/pricing-services/v1/price"
+SERVICEABILITY_PATH = "/inventory/oms/v2/tms/details-pwa/"
+
+IN_STOCK_STATUSES = {'instock', 'lowstock'}
+
+_SKU_PATTERN = re.compile(r'/p/(\d+)')
+
+
+class CromaApiError(Exception):
+    """Raised when an API call fails or returns something we can't interpret"""
+
+
+class CromaApiUnavailable(CromaApiError):
+    """Raised without sending a request while calls to the API host are paused by its circuit breaker"""
+
+
+def sku_from_url(url: str) -> str:
+    """Extract the product code from a Croma product URL (…/p/316890)"""
+    match = _SKU_PATTERN.search(url)
+    if not match:
+        raise CromaApiError(f"No product code in URL: {url}")
+    return match.group(1)
+
+
+def format_inr(value: float) -> str:
+    """Format a rupee amount the way the product page does, e.g. 129900 -> ₹1,29,900"""
+    digits = str(int(round(value)))
+    if len(digits) > 3:
+        head, tail = digits[:-3], digits[-3:]
+        groups = []
+        while len(head) > 2:
+            groups.insert(0, head[-2:])
+            head = head[:-2]
+        if head:
+            groups.insert(0, head)
+        digits = ",".join(groups) + "," + tail
+    return f"₹{digits}"
+
+
+class CromaApiClient:
+    """
+    Client for the JSON endpoints behind the Croma product page
+
+    Args:
+        base_url (str): API root, point this at a stand-in server for testing
+        timeout (float): Per-request timeout in seconds
+    """
+
+    def __init__(self, base_url: str = CROMA_API_BASE, timeout: float = 10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.breaker = breaker_for(urlsplit(self.base_url).netloc)
+
+    def _request(self, method: str, path: str, **kwargs) -> Dict:
+        if not self.breaker.allow():
+            raise CromaApiUnavailable(f"{method} {path} skipped, requests to {self.breaker.name} are paused "
+                                      f"for {self.breaker.retry_in():.0f}s")
+        try:
+            response = http_pool.get_session().request(
+                method, self.base_url + path, timeout=self.timeout,
+                headers={'Accept': 'application/json', 'Origin': 'https://www.croma.com'}, **kwargs
+            )
+        except Exception as e:
+            self.breaker.record_failure()
+            raise CromaApiError(f"{method} {path} failed: {str(e)}") from e
+        if is_failure_status(response.status_code):
+            self.breaker.record_failure(retry_after=retry_after(response.headers))
+            raise CromaApiError(f"{method} {path} returned status {response.status_code}")
+        if response.status_code != 200:
+            self.breaker.record_success()  # e.g. 404 for an unknown product: the host itself is fine
+            raise CromaApiError(f"{method} {path} returned status {response.status_code}")
+        try:
+            data = response.json()
+        except ValueError as e:
+            # Usually a captcha or bot-protection page served instead of JSON
+            self.breaker.record_failure()
+            raise CromaApiError(f"{method} {path} returned invalid JSON") from e
+        self.breaker.record_success()
+        return data
+
+    def get_product(self, sku: str) -> Dict:
+        """
+        Returns:
+            dict: {'name': str, 'in_stock': bool, 'price': float or None}
+        """
+        data = self._request("GET", PRODUCT_PATH, params={'productCode': sku, 'fields': 'FULL'})
+        try:
+            status = data['stock']['stockLevelStatus']
+        except (KeyError, TypeError) as e:
+            raise CromaApiError(f"No stock status for product {sku}") from e
+        try:
+            price = float(data['price']['value'])
+        except (KeyError, TypeError, ValueError):
+            price = None  # Only some responses carry the price, get_prices() always does
+        return {'name': data.get('name', ''), 'in_stock': status.lower() in IN_STOCK_STATUSES, 'price': price}
+
+    def get_prices(self, skus: Iterable[str]) -> Dict[str, float]:
+        """Selling price for many products in a single call"""
+        skus = list(skus)
+        if not skus:
+            return {}
+        data = self._request("GET", PRICE_PATH, params={'productList': ",".join(skus)})
+        prices = {}
+        for entry in data.get('pricelist', []):
+            try:
+                prices[entry['productCode']] = float(entry['sellingPrice']['value'])
+            except (KeyError, TypeError, ValueError):
+                logger.warning(f"Unreadable price entry: {entry}")
+        return prices
+
+    def get_serviceability(self, skus: Iterable[str], pincode: str) -> Dict[str, bool]:
+        """Home-delivery serviceability of many products to one pincode in a single call"""
+        skus = list(skus)
+        if not skus:
+            return {}
+        lines = [
+            {
+                'fulfillmentType': 'HDEL',
+                'itemID': sku,
+                'lineId': str(i + 1),
+                'requiredQty': '1',
+                'shipToAddress': {'zipCode': pincode},
+                'extn': {'widerStoreFlag': 'N'},
+            }
+            for i, sku in enumerate(skus)
+        ]
+        payload = {
+            'promise': {
+                'allocationRuleID': 'SYSTEM',
+                'checkInventory': 'Y',
+                'organizationCode': 'CROMA',
+                'sourcingClassification': 'EC',
+                'promiseLines': {'promiseLine': lines},
+            }
+        }
+        data = self._request("POST", SERVICEABILITY_PATH, json=payload)
+        try:
+            promise = data['promise']
+            option = promise.get('suggestedOption', {}).get('option', {})
+            available = {line['itemID'] for line in option.get('promiseLines', {}).get('promiseLine', [])}
+        except (KeyError, TypeError, AttributeError) as e:
+            raise CromaApiError(f"Unreadable serviceability response for pincode {pincode}") from e
+        return {sku: sku in available for sku in skus}
+
+    def check_availability(self, url: str, pincode: str) -> Dict:
+        """
+        Check product availability, returning the same dict as CromaProductChecker.check_availability
+
+        Raises:
+            CromaApiError: if the API can't answer, so the caller can fall back to the browser
+        """
+        return self.check_availability_batch([url], [pincode])[0]
+
+    def check_availability_batch(self, urls: List[str], pincodes: List[str]) -> List[Dict]:
+        """
+        Check every URL against every pincode
+
+        Prices come from one call, and serviceability from one call per
+        pincode covering all in-stock products.
+
+        Returns:
+            list: One result dict per (url, pincode) pair, URLs in the outer loop
+        """
+        skus = [sku_from_url(url) for url in urls]
+        unique_skus = list(dict.fromkeys(skus))
+        products = {sku: self.get_product(sku) for sku in unique_skus}
+        prices = self.get_prices(unique_skus)
+
+        in_stock_skus = [sku for sku in unique_skus if products[sku]['in_stock']]
+        serviceable: Dict[Tuple[str, str], bool] = {}
+        for pincode in dict.fromkeys(pincodes):
+            for sku, deliverable in self.get_serviceability(in_stock_skus, pincode).items():
+                serviceable[(sku, pincode)] = deliverable
+
+        timestamp = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        results = []
+        for url, sku in zip(urls, skus):
+            product = products[sku]
+            price = prices.get(sku)
+            for pincode in pincodes:
+                result = {
+                    'timestamp': timestamp,
+                    'product_name': product['name'] or "Product Name Not Found",
+                    'price': format_inr(price) if price is not None else "Price Not Found",
+                    'url': url,
+                    'pincode': pincode,
+                    'is_available': product['in_stock'],
+                    'status_message': "Product appears to be in stock" if product['in_stock'] else "Out of Stock",
+                }
+                if product['in_stock']:
+                    deliverable = serviceable.get((sku, pincode), False)
+                    result['delivery_available'] = deliverable
+                    result['delivery_message'] = (f"Delivery available at {pincode}" if deliverable
+                                                  else f"Delivery not available at {pincode}")
+                results.append(result)
+        return results
+
+
+_default_client: Optional[CromaApiClient] = None
+
+
+def get_client() -> CromaApiClient:
+    """Return a shared client for CROMA_API_BASE"""
+    global _default_client
+    if _default_client is None:
+        _default_client = CromaApiClient()
+    return _default_client
@@ -0,0 +1,261 @@
+import atexit
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+
+from config import (EVENT_LOG_PATH, EVENT_LOG_MAX_BYTES, EVENT_LOG_BACKUPS, EVENT_LOG_FLUSH_INTERVAL,
+                    EVENT_LOG_FLUSH_BATCH, SCHEDULER_MAX_INTERVAL)
+
+logger = logging.getLogger("CromaStockAlert.events")
+
+CHECKER_STOCK = 'stock_checker'           # main loop: product page / API verdicts, one per product
+CHECKER_AVAILABILITY = 'product_checker'  # CromaProductChecker: one per product and pincode
+
+# One line of the event log. product_id is the Croma SKU whenever the URL has one, so that both
+# checkers' events for a product share it. in_stock is None when the check couldn't tell (blocked,
+# captcha, failed), delivery is None when no pincode was checked, price is in rupees.
+CheckEvent = namedtuple('CheckEvent', ['ts', 'checker', 'product_id', 'url', 'pincode', 'in_stock', 'price',
+                                       'delivery', 'latency', 'error'],
+                        defaults=('', None, None, None, None, None))
+
+_RUPEES_PATTERN = re.compile(r'\d[\d,]*(?:\.\d+)?')
+
+
+def product_key(url, fallback=None):
+    """The id a product's events are logged under: its SKU from the URL, else `fallback` or the URL"""
+    # Imported here so reading the log (cli.py stats) doesn't load requests through croma_api
+    from croma_api import CromaApiError, sku_from_url
+
+    try:
+        return sku_from_url(url or '')
+    except CromaApiError:
+        return fallback or url
+
+
+def check_event(checker, product_id, url, in_stock, **fields):
+    """Build a CheckEvent stamped with the current time, logged under product_key(url, product_id)"""
+    return CheckEvent(time.time(), checker, product_key(url, product_id), url, in_stock=in_stock, **fields)
+
+
+def event_from_availability(result, product_id=None, latency=None):
+    """
+    Convert a CromaProductChecker / CromaApiClient result dict to a CheckEvent
+
+    Both checkers' results end up in the same schema, so the log can be
+    aggregated without caring which one produced a line.
+    """
+    match = _RUPEES_PATTERN.search(result.get('price') or '')
+    return check_event(
+        CHECKER_AVAILABILITY,
+        product_id,
+        result.get('url'),
+        None if 'error' in result else bool(result.get('is_available')),
+        pincode=result.get('pincode') or '',
+        price=float(match.group(0).replace(',', '')) if match else None,
+        delivery=result.get('delivery_available'),
+        latency=latency,
+        error=result.get('error'),
+    )
+
+
+class EventLog:
+    """
+    Append-only JSONL log of check results, rotated by size
+
+    append() only serializes the event into a buffer; lines are written in
+    one go once `flush_batch` are pending or `flush_interval` seconds have
+    passed. When the file grows past `max_bytes` it is renamed to <path>.1
+    (older files shift up to <path>.<backups>, the oldest is deleted).
+    """
+
+    def __init__(self, path=EVENT_LOG_PATH, max_bytes=EVENT_LOG_MAX_BYTES, backups=EVENT_LOG_BACKUPS,
+                 flush_interval=EVENT_LOG_FLUSH_INTERVAL, flush_batch=EVENT_LOG_FLUSH_BATCH):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.written = 0
+
+        self._lock = threading.Lock()
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._file = None
+
+    def append(self, event):
+        """Buffer one CheckEvent"""
+        line = json.dumps(event._asdict(), separators=(',', ':'))
+        with self._lock:
+            self._pending.append(line)
+            due = (len(self._pending) >= self.flush_batch or
+                   time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write all buffered events"""
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._pending:
+                return
+            lines, self._pending = self._pending, []
+            try:
+                if self._file is None:
+                    self._file = open(self.path, 'a', encoding='utf-8')
+                self._file.write('\n'.join(lines) + '\n')
+                self._file.flush()
+                self.written += len(lines)
+                if self.max_bytes and self._file.tell() >= self.max_bytes:
+                    self._rotate()
+            except OSError as e:
+                logger.error(f"Failed to write {len(lines)} check events to {self.path}: {str(e)}")
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        if self.backups <= 0:
+            os.remove(self.path)
+            return
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{index}"):
+                os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+        logger.info(f"Rotated {self.path}")
+
+    def close(self):
+        """Flush buffered events and close the file"""
+        self.flush()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def log_files(path=EVENT_LOG_PATH):
+    """The current log and its rotated predecessors that exist, oldest first"""
+    directory, name = os.path.split(os.path.abspath(path))
+    pattern = re.compile(re.escape(name) + r'\.(\d+)$')
+    rotated = []
+    for entry in os.listdir(directory):
+        match = pattern.match(entry)
+        if match:
+            rotated.append((int(match.group(1)), os.path.join(directory, entry)))
+    files = [file_path for _, file_path in sorted(rotated, reverse=True)]
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def iter_events(path=EVENT_LOG_PATH, since=0):
+    """
+    Yield every logged event as a dict, oldest first, one line at a time
+
+    Unreadable lines (e.g. one cut short by a crash) are skipped.
+    """
+    for file_path in log_files(path):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if event.get('ts', 0) >= since:
+                    yield event
+
+
+class AvailabilityAggregator:
+    """
+    Streaming per-(product, pincode) availability statistics
+
+    Feed events in time order with add(); memory grows with the number of
+    products, not events. The time between two known verdicts counts as in
+    stock or out of stock according to the first of them, unless the gap is
+    longer than `max_gap` seconds (the checker wasn't running), in which case
+    it isn't counted at all. Unknown verdicts don't change the state.
+    """
+
+    def __init__(self, max_gap=2 * SCHEDULER_MAX_INTERVAL):
+        self.max_gap = max_gap
+        self._stats = {}
+
+    def add(self, event):
+        key = (event['product_id'], event.get('pincode') or '')
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = {
+                'checks': 0, 'unknown': 0, 'in_stock_seconds': 0.0, 'observed_seconds': 0.0,
+                'restocks': 0, 'restock_seconds': 0.0, 'max_restock_seconds': 0.0,
+                'state': None, 'since': None, 'out_since': None, 'last_ts': None,
+            }
+        stats['checks'] += 1
+        in_stock = event.get('in_stock')
+        if in_stock is None:
+            stats['unknown'] += 1
+            return
+
+        ts = event['ts']
+        if stats['last_ts'] is not None:
+            gap = ts - stats['last_ts']
+            if 0 <= gap <= self.max_gap:
+                stats['observed_seconds'] += gap
+                if stats['state']:
+                    stats['in_stock_seconds'] += gap
+        stats['last_ts'] = ts
+
+        if in_stock != stats['state']:
+            if in_stock and stats['out_since'] is not None:
+                waited = ts - stats['out_since']
+                stats['restocks'] += 1
+                stats['restock_seconds'] += waited
+                stats['max_restock_seconds'] = max(stats['max_restock_seconds'], waited)
+            stats['out_since'] = None if in_stock else ts
+            stats['state'] = in_stock
+            stats['since'] = ts
+
+    def results(self):
+        """
+        Returns:
+            dict: (product_id, pincode) -> {'checks', 'unknown', 'uptime' (0-1 or None), 'restocks',
+                  'mean_time_to_restock', 'max_time_to_restock' (seconds or None), 'in_stock', 'since'}
+        """
+        results = {}
+        for key, stats in self._stats.items():
+            restocks = stats['restocks']
+            results[key] = {
+                'checks': stats['checks'],
+                'unknown': stats['unknown'],
+                'uptime': (stats['in_stock_seconds'] / stats['observed_seconds']
+                           if stats['observed_seconds'] else None),
+                'restocks': restocks,
+                'mean_time_to_restock': stats['restock_seconds'] / restocks if restocks else None,
+                'max_time_to_restock': stats['max_restock_seconds'] if restocks else None,
+                'in_stock': stats['state'],
+                'since': stats['since'],
+            }
+        return results
+
+
+def aggregate(path=EVENT_LOG_PATH, since=0, max_gap=2 * SCHEDULER_MAX_INTERVAL):
+    """Availability statistics for every product in the log, see AvailabilityAggregator.results()"""
+    aggregator = AvailabilityAggregator(max_gap)
+    for event in iter_events(path, since):
+        aggregator.add(event)
+    return aggregator.results()
+
+
+_log = None
+_log_lock = threading.Lock()
+
+
+def get_event_log():
+    """Return the shared event log, flushed at exit"""
+    global _log
+    with _log_lock:
+        if _log is None:
+            _log = EventLog()
+            atexit.register(_log.close)
+        return _log
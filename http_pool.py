@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from config import CHECK_CONCURRENCY
+
+logger = logging.getLogger("CromaStockAlert.http")
+
+_session = None
+_session_lock = threading.Lock()
+# Connections kept alive per host; raised by ensure_pool_size() for wider check engines
+_pool_size = max(10, CHECK_CONCURRENCY)
+
+
+def get_session():
+    """
+    Return the process-wide requests.Session
+
+    The session keeps TCP/TLS connections alive between checks and Telegram
+    calls, so each request after the first skips the handshake.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                _mount_adapter(session)
+                _session = session
+    return _session
+
+
+def _mount_adapter(session):
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=_pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+
+def ensure_pool_size(size):
+    """
+    Keep at least `size` connections per host alive in the shared session
+
+    Checks running beyond the pool size would each open a new connection and
+    have it discarded afterwards, losing keep-alive.
+    """
+    global _pool_size
+    with _session_lock:
+        if size <= _pool_size:
+            return
+        _pool_size = size
+        if _session is not None:
+            _mount_adapter(_session)
+
+
+class FetchStats:
+    """Thread-safe counters for request latency and bytes downloaded"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.not_modified = 0
+            self.bytes_downloaded = 0
+            self.total_latency = 0.0
+
+    def record(self, status_code, latency, size):
+        with self._lock:
+            self.requests += 1
+            self.total_latency += latency
+            self.bytes_downloaded += size
+            if status_code == 304:
+                self.not_modified += 1
+
+    def summary(self):
+        """Return a one-line summary suitable for logging"""
+        with self._lock:
+            avg_ms = (self.total_latency / self.requests * 1000) if self.requests else 0.0
+            return (f"{self.requests} requests, {self.not_modified} not modified, "
+                    f"{self.bytes_downloaded / 1024:.1f} KiB downloaded, avg latency {avg_ms:.0f} ms")
+
+
+stats = FetchStats()
+
+# url -> {'etag': str, 'last_modified': str}
+_validators = {}
+_validators_lock = threading.Lock()
+
+
+def conditional_get(url, headers=None, timeout=15):
+    """
+    GET a page through the shared session, revalidating against the last response
+
+    If validators were stored for this URL with remember_validators(), the request
+    carries If-None-Match / If-Modified-Since and the server may answer 304.
+    The caller keeps whatever it derived from the last 200 to reuse on a 304.
+    """
+    request_headers = dict(headers or {})
+    with _validators_lock:
+        entry = _validators.get(url)
+    if entry is not None:
+        if entry.get('etag'):
+            request_headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            request_headers['If-Modified-Since'] = entry['last_modified']
+
+    start = time.perf_counter()
+    response = get_session().get(url, headers=request_headers, timeout=timeout)
+    size = len(response.content)
+    latency = time.perf_counter() - start
+    stats.record(response.status_code, latency, size)
+    metrics.stage_seconds.observe(latency, stage='fetch')
+    metrics.http_responses.inc(status=response.status_code)
+    return response
+
+
+def remember_validators(url, response):
+    """Store the ETag / Last-Modified of a response to revalidate the next request for the URL"""
+    etag = response.headers.get('ETag')
+    last_modified = response.headers.get('Last-Modified')
+    with _validators_lock:
+        if etag or last_modified:
+            _validators[url] = {'etag': etag, 'last_modified': last_modified}
+        else:
+            _validators.pop(url, None)
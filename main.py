@@ -1,12 +1,25 @@
 #!/usr/bin/env python3
-import json
+import argparse
+import asyncio
 import time
 import logging
 import os
 from datetime import datetime
-from stock_checker import check_stock_with_selenium
-from telegram_bot import send_telegram_message
-from config import TELEGRAM_CHAT_ID, CHECK_INTERVAL
+from stock_checker import check_stock_and_price, check_stock_and_price_with_api
+from croma_api import format_inr
+from notifier import NotificationDispatcher
+from check_engine import CheckEngine
+import circuit_breaker
+import http_pool
+import metrics
+from event_log import CHECKER_STOCK, check_event, get_event_log
+from state_store import EVENT_IN_STOCK, EVENT_OUT_OF_STOCK, EVENT_PRICE_CHANGED, StateStore
+from state_table import Verdict
+from scheduler import PollScheduler, SweepTimer
+from product_registry import ProductRegistry
+from command_bot import CommandBot
+from config import (CHECK_INTERVAL, CROMA_API_ENABLED, EVENT_LOG_ENABLED, METRICS_HOST, METRICS_PORT,
+                    PRODUCTS_RELOAD_INTERVAL, TELEGRAM_ALLOW_ANY_CHAT, TELEGRAM_COMMANDS_ENABLED)
 
 # Set up logging
 logging.basicConfig(
@@ -19,71 +32,236 @@ logging.basicConfig(
 )
 logger = logging.getLogger("CromaStockAlert")
 
-def load_products():
-    """Load products to monitor from JSON file"""
+def update_product_status(product, in_stock, event, current_time, notify):
+    """Queue a notification through notify(message) if StateStore.record reported a stock change"""
+    name = product['name']
+    url = product['url']
+
+    # If product is now in stock but wasn't before (or we're checking it for the first time)
+    if event == EVENT_IN_STOCK:
+        message = f"🎉 IN STOCK ALERT! 🎉\n\n{name} is now available at Croma!\n\nYou can buy it here: {url}\n\nChecked at: {current_time}"
+        notify(message)
+        logger.info(f"Product now in stock, notification queued: {name}")
+
+    # If product was in stock before but isn't anymore
+    elif event == EVENT_OUT_OF_STOCK:
+        message = f"⚠️ OUT OF STOCK ALERT ⚠️\n\n{name} is no longer available at Croma.\n\nWe'll notify you when it's back in stock."
+        notify(message)
+        logger.info(f"Product now out of stock: {name}")
+
+    # No change in status, just log it
+    else:
+        status_text = "in stock" if in_stock else "out of stock"
+        logger.debug("Product %s remains %s", name, status_text)
+
+def price_change_message(product, old_price, new_price):
+    """Alert text for a price change; prices are the formatted strings kept in the state store"""
+    direction = "dropped" if _rupees(new_price) < _rupees(old_price) else "increased"
+    return (f"💰 PRICE ALERT 💰\n\nThe price of {product['name']} has {direction} "
+            f"from {old_price} to {new_price}.\n\nYou can buy it here: {product['url']}")
+
+def _rupees(price_text):
+    return float(''.join(c for c in price_text if c.isdigit() or c == '.') or 0)
+
+def apply_registry_diff(scheduler, diff, sweep_timer=None):
+    """Reschedule only the products that were added, removed or changed in the product files"""
+    for product in diff.removed:
+        scheduler.remove(product['id'])
+        if sweep_timer is not None:
+            sweep_timer.discard(product['id'])
+    for product in diff.added:
+        scheduler.add(product)
+    for product in diff.changed:
+        scheduler.update(product)
+
+async def run_bot(workers=1):
+    """
+    Check products whenever the scheduler says they are due and send notifications
+
+    With workers > 1 the checks run in that many worker processes and only the
+    transitions, history and notifications happen here.
+    """
+    # Track product stock status to avoid duplicate notifications, starting from
+    # the last known verdicts so a restart doesn't re-alert. The store keeps them
+    # in one compact table that product_status reads through.
+    store = StateStore()
+    state = store.table
+    product_status = state.status()
+    dispatcher = NotificationDispatcher()
+    dispatcher.start()
+    registry = ProductRegistry()
+    sweep_timer = SweepTimer(metrics.sweep_seconds, lambda: [product['id'] for product in registry.products])
+    event_log = get_event_log() if EVENT_LOG_ENABLED else None
+    metrics_server = None
+    if METRICS_PORT:
+        try:
+            metrics_server = metrics.start_http_server(METRICS_PORT, METRICS_HOST)
+        except OSError as e:
+            logger.error(f"Could not start metrics endpoint on port {METRICS_PORT}: {str(e)}")
+
+    # Telegram commands; on_products_changed is set below once the scheduler or supervisor exists
+    bot = None
+    if TELEGRAM_COMMANDS_ENABLED:
+        bot = CommandBot(registry, product_status, store,
+                         allowed_chats=None if TELEGRAM_ALLOW_ANY_CHAT else dispatcher.subscribers)
+
+    def notify_about(product):
+        """notify(message) for alerts about one product: every subscriber plus chats that /watch it"""
+        if bot is None:
+            return dispatcher.notify
+        chat_ids = list(dict.fromkeys(dispatcher.subscribers + bot.chats_watching(product['id'])))
+        return lambda message: dispatcher.notify(message, chat_ids=chat_ids)
+
+    def log_check(product, in_stock, latency, price=None, error=None):
+        """Append every check, unknown verdicts and errors included, to the event log"""
+        if event_log is not None:
+            event_log.append(check_event(CHECKER_STOCK, product['id'], product['url'],
+                                         None if error is not None else in_stock,
+                                         price=price, latency=latency, error=error))
+
+    def record_result(product, in_stock, latency, price=None):
+        """The single transition stage every verdict goes through"""
+        metrics.verdicts.inc(verdict='in_stock' if in_stock else 'out_of_stock')
+        metrics.check_seconds.observe(latency)
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        notify = notify_about(product)
+        previous = store.get(product['id'])
+        event = store.record(product['id'], in_stock, price=price, latency=latency)
+        update_product_status(product, in_stock, event, current_time, notify)
+        if event == EVENT_PRICE_CHANGED:
+            price_text = format_inr(price)
+            notify(price_change_message(product, previous['price'], price_text))
+            logger.info(f"Price of {product['name']} changed from {previous['price']} to {price_text}")
+
+    if workers > 1:
+        from supervisor import Supervisor
+
+        def on_result(product_id, in_stock, error, latency, price):
+            product = registry.get(product_id)
+            if product is None:
+                return  # Removed while the check was in flight
+            sweep_timer.checked(product_id)
+            log_check(product, in_stock, latency, price, error)
+            if error is not None:
+                logger.error(f"Error checking product {product['name']}: {error}")
+                metrics.check_errors.inc(stage='check')
+                return
+            if in_stock is None:
+                metrics.verdicts.inc(verdict='unknown')
+                try:
+                    state.record(product_id, Verdict.UNKNOWN)
+                except Exception as e:
+                    logger.error(f"Error checking product {product['name']}: {str(e)}")
+                return
+            record_result(product, in_stock, latency, price)
+
+        supervisor = Supervisor(workers, on_result)
+
+        def apply_diff(diff):
+            supervisor.apply_diff(diff)
+            for product in diff.removed:
+                sweep_timer.discard(product['id'])
+
+        if bot is not None:
+            bot.on_products_changed = apply_diff
+            bot.start()
+        try:
+            await supervisor.run(registry, on_diff=apply_diff)
+        finally:
+            if bot is not None:
+                await bot.close()
+            if event_log is not None:
+                event_log.close()
+            store.close()
+            await dispatcher.close()
+            if metrics_server is not None:
+                metrics_server.shutdown()
+        return
+
+    engine = CheckEngine(check_stock_and_price_with_api if CROMA_API_ENABLED else check_stock_and_price)
+    scheduler = PollScheduler()
+    in_flight = set()
+    if bot is not None:
+        bot.on_products_changed = lambda diff: apply_registry_diff(scheduler, diff, sweep_timer)
+        bot.start()
+
+    async def check(product):
+        result = await engine.check_product(product)
+        sweep_timer.checked(product['id'])
+        log_check(product, result.in_stock, result.latency, result.price,
+                  str(result.error) if result.error is not None else None)
+        if result.error is not None:
+            logger.error(f"Error checking product {product['name']}: {str(result.error)}")
+            metrics.check_errors.inc(stage='check')
+            scheduler.report(product['id'], error=True)
+            return
+        if result.in_stock is None:
+            # Blocked, throttled or unreadable: no evidence either way, so no alert and back off
+            metrics.verdicts.inc(verdict='unknown')
+            try:
+                state.record(product['id'], Verdict.UNKNOWN)
+            except Exception as e:
+                logger.error(f"Error checking product {product['name']}: {str(e)}")
+            scheduler.report(product['id'], error=True)
+            return
+        previous = product_status.get(product['id'])
+        try:
+            record_result(product, result.in_stock, result.latency, result.price)
+        except Exception as e:
+            logger.error(f"Error checking product {product['name']}: {str(e)}")
+        scheduler.report(product['id'], changed=previous is not None and previous != result.in_stock)
+
+    next_reload = 0.0
+    next_stats = time.monotonic() + CHECK_INTERVAL
     try:
-        with open('products.json', 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        logger.error("Products file not found. Please create products.json")
-        return []
-    except json.JSONDecodeError:
-        logger.error("Invalid JSON in products.json")
-        return []
+        while True:
+            now = time.monotonic()
+            if now >= next_reload:
+                apply_registry_diff(scheduler, registry.refresh(), sweep_timer)
+                next_reload = now + PRODUCTS_RELOAD_INTERVAL
+            if now >= next_stats:
+                if not len(registry):
+                    logger.warning("No products found to monitor. Add products to products.json")
+                logger.info(f"Monitoring {len(scheduler)} products. HTTP stats: {http_pool.stats.summary()}")
+                for host, retry_in in circuit_breaker.open_circuits().items():
+                    logger.warning(f"Requests to {host} are paused, next probe in {retry_in:.0f}s")
+                next_stats = now + CHECK_INTERVAL
 
-def main():
-    """Main bot function that checks product stock and sends notifications"""
+            for product in scheduler.pop_due():
+                task = asyncio.create_task(check(product))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+
+            await asyncio.sleep(max(0.05, min(scheduler.seconds_until_next(), 1.0)))
+    finally:
+        for task in list(in_flight):
+            task.cancel()
+        engine.close()
+        if bot is not None:
+            await bot.close()
+        if event_log is not None:
+            event_log.close()
+        store.close()
+        await dispatcher.close()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+
+def start(workers=1):
+    """Run the bot until interrupted; also the `run` subcommand of cli.py"""
     logger.info("Starting Croma Stock Alert Bot")
     
     # Create directory for screenshots if it doesn't exist
     os.makedirs("screenshots", exist_ok=True)
-    
-    # Track product stock status to avoid duplicate notifications
-    product_status = {}
-    
-    while True:
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        logger.info(f"Running stock check at {current_time}")
-        
-        products = load_products()
-        if not products:
-            logger.warning("No products found to monitor. Add products to products.json")
-            time.sleep(CHECK_INTERVAL)
-            continue
-        
-        for product in products:
-            product_id = product['id']
-            name = product['name']
-            url = product['url']
-            
-            try:
-                in_stock = check_stock_with_selenium(url, name)
-                
-                # If product is now in stock but wasn't before (or we're checking it for the first time)
-                if in_stock and product_status.get(product_id) != True:
-                    product_status[product_id] = True
-                    message = f"🎉 IN STOCK ALERT! 🎉\n\n{name} is now available at Croma!\n\nYou can buy it here: {url}\n\nChecked at: {current_time}"
-                    send_telegram_message(TELEGRAM_CHAT_ID, message)
-                    logger.info(f"Product now in stock, notification sent: {name}")
-                
-                # If product was in stock before but isn't anymore
-                elif not in_stock and product_status.get(product_id) == True:
-                    product_status[product_id] = False
-                    message = f"⚠️ OUT OF STOCK ALERT ⚠️\n\n{name} is no longer available at Croma.\n\nWe'll notify you when it's back in stock."
-                    send_telegram_message(TELEGRAM_CHAT_ID, message)
-                    logger.info(f"Product now out of stock: {name}")
-                
-                # No change in status, just log it
-                else:
-                    status_text = "in stock" if in_stock else "out of stock"
-                    product_status[product_id] = in_stock
-                    logger.info(f"Product {name} remains {status_text}")
-                    
-            except Exception as e:
-                logger.error(f"Error checking product {name}: {str(e)}")
-        
-        logger.info(f"Finished checking all products. Next check in {CHECK_INTERVAL} seconds.")
-        time.sleep(CHECK_INTERVAL)
+
+    asyncio.run(run_bot(workers=workers))
+
+def main():
+    """Main bot function that checks product stock and sends notifications"""
+    parser = argparse.ArgumentParser(description="Croma Stock Alert Bot")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of checker processes (default: check in this process)")
+    args = parser.parse_args()
+    start(workers=args.workers)
 
 if __name__ == "__main__":
     main()
@@ -1,58 +1,87 @@
 # Manual checking script
-import requests
-from bs4 import BeautifulSoup
 
-def manual_check():
-    url = "https://www.croma.com/vivo-x200-fe-5g-12gb-ram-256gb-frost-blue-/p/316890"
+ADD_TO_CART_SELECTOR = 'button[data-testid="add-to-cart"], .pdp-action, .add-to-cart, .buy-button'
+PRICE_SELECTOR = '.price, .pdp-price, [data-testid="price"]'
+
+
+def analyze_page(html):
+    """
+    Analyze a product page without any network access or output
+
+    Returns:
+        dict: title, add_to_cart_buttons (text, class, disabled), out_of_stock_text,
+              prices and the resulting in_stock verdict
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+
+    buttons = [
+        {'text': button.text.strip(), 'class': button.get('class'), 'disabled': button.get('disabled')}
+        for button in soup.select(ADD_TO_CART_SELECTOR)
+    ]
+    out_of_stock_text = "out of stock" in html.lower()
+
+    return {
+        'title': soup.title.text if soup.title else "No title",
+        'add_to_cart_buttons': buttons,
+        'out_of_stock_text': out_of_stock_text,
+        'prices': [element.text.strip() for element in soup.select(PRICE_SELECTOR)],
+        'in_stock': bool(not out_of_stock_text and buttons and not all(button['disabled'] for button in buttons)),
+    }
+
+
+def manual_check(url="https://www.croma.com/vivo-x200-fe-5g-12gb-ram-256gb-frost-blue-/p/316890",
+                 product_name="Vivo X200 FE 5G"):
+    import requests
+
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36',
     }
-    
-    print(f"Manually checking Vivo X200 FE 5G...")
+
+    print(f"Manually checking {product_name}...")
     response = requests.get(url, headers=headers)
-    
+
     if response.status_code == 200:
         print("Successfully loaded product page")
-        
+
         # Save HTML for inspection
         with open("vivo_x200_manual_check.html", "w", encoding="utf-8") as f:
             f.write(response.text)
         print("Saved HTML to vivo_x200_manual_check.html")
-        
+
         # Parse and analyze the page
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
+        analysis = analyze_page(response.text)
+
         # Check page title
-        title = soup.title.text if soup.title else "No title"
-        print(f"Page title: {title}")
-        
+        print(f"Page title: {analysis['title']}")
+
         # Look for Add to Cart button
-        add_to_cart_buttons = soup.select('button[data-testid="add-to-cart"], .pdp-action, .add-to-cart, .buy-button')
-        if add_to_cart_buttons:
-            print(f"Found {len(add_to_cart_buttons)} potential Add to Cart buttons:")
-            for i, button in enumerate(add_to_cart_buttons):
-                print(f"  Button {i+1}: Text='{button.text.strip()}', Class='{button.get('class')}', Disabled='{button.get('disabled')}'")
+        buttons = analysis['add_to_cart_buttons']
+        if buttons:
+            print(f"Found {len(buttons)} potential Add to Cart buttons:")
+            for i, button in enumerate(buttons):
+                print(f"  Button {i+1}: Text='{button['text']}', Class='{button['class']}', Disabled='{button['disabled']}'")
         else:
             print("No Add to Cart buttons found")
-        
+
         # Check for "Out of Stock" text
-        if "out of stock" in response.text.lower():
+        if analysis['out_of_stock_text']:
             print("Found 'out of stock' text on the page")
         else:
             print("No 'out of stock' text found")
-            
+
         # Check for price elements
-        price_elements = soup.select('.price, .pdp-price, [data-testid="price"]')
-        if price_elements:
+        if analysis['prices']:
             print("Found price elements:")
-            for i, element in enumerate(price_elements):
-                print(f"  Price {i+1}: '{element.text.strip()}'")
-        
+            for i, price in enumerate(analysis['prices']):
+                print(f"  Price {i+1}: '{price}'")
+
         print("\nBased on manual analysis:")
-        if "out of stock" not in response.text.lower() and add_to_cart_buttons and not all(button.get('disabled') for button in add_to_cart_buttons):
-            print("✅ Vivo X200 FE 5G appears to be IN STOCK")
+        if analysis['in_stock']:
+            print(f"✅ {product_name} appears to be IN STOCK")
         else:
-            print("❌ Vivo X200 FE 5G appears to be OUT OF STOCK")
+            print(f"❌ {product_name} appears to be OUT OF STOCK")
     else:
         print(f"Failed to load product page. Status code: {response.status_code}")
 
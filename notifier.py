@@ -0,0 +1,184 @@
+import asyncio
+import logging
+
+import metrics
+from config import (TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, TELEGRAM_CHAT_IDS,
+                    NOTIFY_COALESCE_SECONDS, NOTIFY_MAX_RETRIES)
+from telegram_bot import TelegramError, call_api
+
+logger = logging.getLogger("CromaStockAlert.notifier")
+
+# Telegram rejects messages longer than this
+MAX_MESSAGE_LENGTH = 4096
+MESSAGE_SEPARATOR = "\n\n➖➖➖➖➖\n\n"
+
+
+def coalesce(texts, limit=MAX_MESSAGE_LENGTH):
+    """Join alerts into as few messages as possible without exceeding Telegram's length limit"""
+    messages = []
+    current = ""
+    for text in texts:
+        text = text[:limit]
+        if not current:
+            current = text
+        elif len(current) + len(MESSAGE_SEPARATOR) + len(text) <= limit:
+            current += MESSAGE_SEPARATOR + text
+        else:
+            messages.append(current)
+            current = text
+    if current:
+        messages.append(current)
+    return messages
+
+
+class NotificationDispatcher:
+    """
+    Asynchronous outbound queue for Telegram alerts
+
+    notify() only enqueues, so a slow or failing Telegram call never holds up
+    stock checks. The dispatcher waits `coalesce_window` seconds after the
+    first queued alert, sends everything collected for a chat as one message,
+    honours Telegram's retry_after on 429 and backs off exponentially on
+    network and server errors. Other errors are not retried, except that a
+    message whose Markdown Telegram can't parse is resent as plain text.
+
+    Args:
+        chat_ids (list): Chats that receive every alert, defaults to the chats in config.py
+        coalesce_window (float): Seconds to collect alerts before sending
+        max_retries (int): Attempts per message before it is dropped
+    """
+
+    def __init__(self, chat_ids=None, coalesce_window=NOTIFY_COALESCE_SECONDS, max_retries=NOTIFY_MAX_RETRIES):
+        if chat_ids is None:
+            chat_ids = [TELEGRAM_CHAT_ID] + list(TELEGRAM_CHAT_IDS)
+        self.subscribers = list(dict.fromkeys(str(c) for c in chat_ids if c))
+        self.coalesce_window = coalesce_window
+        self.max_retries = max_retries
+        self.sent = 0
+        self.failed = 0
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    def subscribe(self, chat_id):
+        """Add a chat to the broadcast list"""
+        chat_id = str(chat_id)
+        if chat_id not in self.subscribers:
+            self.subscribers.append(chat_id)
+
+    def unsubscribe(self, chat_id):
+        """Remove a chat from the broadcast list"""
+        chat_id = str(chat_id)
+        if chat_id in self.subscribers:
+            self.subscribers.remove(chat_id)
+
+    def notify(self, message, chat_ids=None):
+        """
+        Queue an alert without waiting for it to be sent
+
+        Args:
+            message (str): Alert text
+            chat_ids (list): Chats to send to, defaults to every subscriber
+        """
+        targets = self.subscribers if chat_ids is None else [str(c) for c in chat_ids]
+        if not targets:
+            logger.error("No Telegram chat IDs configured, dropping notification")
+            return
+        for chat_id in targets:
+            self._queue.put_nowait((chat_id, message))
+
+    def start(self):
+        """Start the background sender on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def close(self, timeout=30):
+        """Send whatever is still queued, then stop the background sender"""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{self._queue.qsize()} notifications still queued at shutdown")
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.coalesce_window
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            pending = {}
+            for chat_id, text in batch:
+                pending.setdefault(chat_id, []).append(text)
+            try:
+                await asyncio.gather(*(self._deliver(chat_id, texts) for chat_id, texts in pending.items()))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _deliver(self, chat_id, texts):
+        for message in coalesce(texts):
+            with metrics.stage_seconds.time(stage='notify'):
+                delivered = await self._send_with_retry(chat_id, message)
+            if delivered:
+                self.sent += 1
+                metrics.telegram_messages.inc(outcome='sent')
+            else:
+                self.failed += 1
+                metrics.telegram_messages.inc(outcome='failed')
+
+    async def _send_with_retry(self, chat_id, message):
+        if not TELEGRAM_BOT_TOKEN:
+            logger.error("Telegram bot token is not configured in config.py")
+            return False
+
+        payload = {
+            'chat_id': chat_id,
+            'text': message,
+            'parse_mode': 'Markdown',
+            'disable_web_page_preview': False
+        }
+        loop = asyncio.get_running_loop()
+        backoff = 1.0
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                await loop.run_in_executor(None, call_api, 'sendMessage', payload)
+                logger.info(f"Message sent successfully to Telegram chat {chat_id}")
+                return True
+            except TelegramError as e:
+                if e.parse_error and 'parse_mode' in payload:
+                    # A stray _ or * in a product name breaks Markdown; send the text as it is
+                    logger.warning(f"Telegram could not parse message to chat {chat_id}, resending as plain text: {str(e)}")
+                    del payload['parse_mode']
+                    continue
+                if not e.retryable:
+                    logger.error(f"Telegram rejected message to chat {chat_id}: {str(e)}")
+                    return False
+                if attempt >= self.max_retries:
+                    logger.error(f"Giving up on Telegram message to chat {chat_id} after {attempt} attempts: {str(e)}")
+                    return False
+                metrics.telegram_messages.inc(outcome='rate_limited' if e.retry_after else 'retried')
+                if e.retry_after:
+                    delay = float(e.retry_after)
+                    logger.warning(f"Telegram rate limit hit for chat {chat_id}, retrying in {delay:.0f}s")
+                else:
+                    delay = backoff
+                    backoff = min(backoff * 2, 60.0)
+                    logger.warning(f"Error sending Telegram message to chat {chat_id}: {str(e)}, retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
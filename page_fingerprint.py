@@ -0,0 +1,110 @@
+import hashlib
+import re
+import threading
+
+# Keywords in the class / data-testid of the nodes the classifier reads: stock status,
+# price, buy buttons and delivery. Every tag containing one is hashed with REGION_WINDOW
+# characters from its start.
+REGION_KEYWORDS = ('stock', 'price', 'add-to-cart', 'addtocart', 'buy-button', 'pdp-action', 'delivery')
+REGION_WINDOW = 300
+# Tags and schema.org fields hashed the same way, with their own window size
+MARKERS = (('<button', 200), ('"availability"', 80), ('"price"', 40))
+# Page-wide phrases the classifier also looks at outside those nodes
+PHRASES = ('out of stock', 'sold out', 'currently unavailable', 'coming soon', 'in stock', 'add to cart', 'buy now')
+
+_JSONLD_PRICE_PATTERN = re.compile(r'"price"\s*:\s*"?(\d+(?:\.\d+)?)')
+_PRICE_CLASS_PATTERN = re.compile(
+    r'<\w+\b[^>]*?\b(?:class|data-testid)\s*=\s*"[^"]*price[^"]*"[^>]*>(.{0,200}?)</', re.IGNORECASE | re.DOTALL)
+_RUPEE_AMOUNT_PATTERN = re.compile(r'(?:₹|&#8377;|&#x20b9;|Rs\.?)\s*([\d,]+(?:\.\d+)?)', re.IGNORECASE)
+
+
+def availability_fingerprint(html):
+    """
+    Hash of only the parts of a page that can change the stock verdict or the price
+
+    Covers the stock status, price, buy button and delivery nodes, every
+    <button>, the schema.org availability/price fields and which stock
+    phrases appear anywhere on the page. Banners, recommendations, tracking
+    ids and the like don't affect it.
+    """
+    # str.find runs in C and is much faster on large pages than a regex alternation
+    page = html.lower()
+    windows = set()
+    for keyword in REGION_KEYWORDS:
+        index = page.find(keyword)
+        while index != -1:
+            tag_start = page.rfind('<', 0, index)
+            if tag_start > page.rfind('>', 0, index):  # inside a tag, i.e. in an attribute
+                windows.add((tag_start, REGION_WINDOW))
+            index = page.find(keyword, index + len(keyword))
+    for marker, size in MARKERS:
+        index = page.find(marker)
+        while index != -1:
+            windows.add((index, size))
+            index = page.find(marker, index + len(marker))
+
+    digest = hashlib.blake2b(digest_size=16)
+    for start, size in sorted(windows):
+        digest.update(page[start:start + size].encode('utf-8', 'replace'))
+    digest.update('|'.join(phrase for phrase in PHRASES if phrase in page).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def extract_price(html):
+    """
+    Selling price shown on a product page
+
+    Returns:
+        float: The schema.org offer price, else the first rupee amount in a price node, or None
+    """
+    match = _JSONLD_PRICE_PATTERN.search(html)
+    if match:
+        return float(match.group(1))
+    for node in _PRICE_CLASS_PATTERN.finditer(html):
+        if 'mrp' in node.group(0).lower():
+            continue
+        amount = _RUPEE_AMOUNT_PATTERN.search(node.group(1))
+        if amount:
+            try:
+                return float(amount.group(1).replace(',', ''))
+            except ValueError:
+                continue
+    return None
+
+
+class FingerprintCache:
+    """
+    Last fingerprint and the result derived from it, per key (usually a URL)
+
+    lookup() returns the stored result only while the fingerprint is unchanged,
+    so callers can skip classifying a page that looks the same as last time.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key, fingerprint):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def last(self, key):
+        """The stored result whatever the fingerprint, e.g. after a 304 Not Modified"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None else None
+
+    def store(self, key, fingerprint, result):
+        with self._lock:
+            self._entries[key] = (fingerprint, result)
+
+    def forget(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
@@ -1,18 +1,85 @@
+import hashlib
 import logging
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from datetime import datetime
+import threading
 import time
-from typing import Dict
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from browser_pool import DriverPool
+from croma_api import CromaApiClient, CromaApiError, get_client, sku_from_url
+from event_log import EventLog, event_from_availability, get_event_log
+from page_fingerprint import FingerprintCache
+from stock_classifier import is_block_page
+from config import CROMA_API_ENABLED, EVENT_LOG_ENABLED, SERVICEABILITY_CACHE_TTL
+
+# Only true of the check that saw the change, so never served from the cache
+PRICE_CHANGE_KEYS = ('price_changed', 'previous_price')
+
+# selenium is only imported once a page actually has to be rendered, so API-only
+# checks and the CLI start without it
+if TYPE_CHECKING:
+    from selenium import webdriver
+
+PRICE_XPATH = "//span[contains(@class, 'price')]"
+OUT_OF_STOCK_XPATH = "//*[contains(text(), 'Out of Stock') or contains(text(), 'Currently Unavailable')]"
+BUY_BUTTON_XPATH = "//button[contains(text(), 'Buy Now') or contains(text(), 'ADD TO CART')]"
+DELIVERY_XPATH = "//*[contains(text(), 'Delivery') or contains(text(), 'delivery')]"
+
+# Seconds to wait for the delivery message after clicking Check: the first pincode on a
+# page waits for a message to appear, later ones may legitimately read the same as before
+DELIVERY_FIRST_TIMEOUT = 5
+DELIVERY_REPEAT_TIMEOUT = 1
+
+# Markup of the nodes the availability checks read, for fingerprinting the rendered page
+AVAILABILITY_REGION_SCRIPT = """
+var nodes = document.querySelectorAll('h1, [class*="price"], [class*="stock"], button');
+var parts = Array.prototype.map.call(nodes, function (node) { return node.outerHTML.slice(0, 500); });
+var text = (document.body && document.body.textContent || '').match(/out of stock|currently unavailable/gi) || [];
+return parts.join('\\n') + '\\n' + text.join('|');
+"""
+
+
+def _availability_nodes_present(driver: 'webdriver.Chrome') -> bool:
+    """True once the price and either a buy button or an out of stock message are in the DOM"""
+    from selenium.webdriver.common.by import By
+
+    if not driver.find_elements(By.XPATH, PRICE_XPATH):
+        return False
+    return bool(driver.find_elements(By.XPATH, BUY_BUTTON_XPATH) or
+                driver.find_elements(By.XPATH, OUT_OF_STOCK_XPATH))
 
 class CromaProductChecker:
-    def __init__(self):
+    def __init__(self, pool: Optional[DriverPool] = None, use_api: bool = CROMA_API_ENABLED,
+                 api_client: Optional[CromaApiClient] = None, cache_ttl: float = SERVICEABILITY_CACHE_TTL,
+                 event_log: Optional[EventLog] = None):
+        """
+        Args:
+            pool: Shared browser pool; a private single-browser pool is started if omitted
+            use_api: Ask Croma's JSON API first and only render the page if that fails
+            api_client: API client to use, defaults to the shared client for CROMA_API_BASE
+            cache_ttl: Seconds a (SKU, pincode) result is reused for; 0 disables the cache
+            event_log: Where fresh results are recorded, defaults to the shared log if EVENT_LOG_ENABLED
+        """
         self.logger = self._setup_logging()
-        self.driver = self._setup_webdriver()
+        self.event_log = event_log or (get_event_log() if EVENT_LOG_ENABLED else None)
+        self.cache_ttl = cache_ttl
+        self._cache: Dict[Tuple[str, str], Tuple[float, Dict]] = {}
+        self._cache_lock = threading.Lock()
+        # SKU (or URL) -> price text of the last fresh result, for price change flags
+        self._last_prices: Dict[str, str] = {}
+        # url -> (product_name, price, initial status) while the rendered availability region is unchanged
+        self._page_results = FingerprintCache()
+        self.api_client = (api_client or get_client()) if use_api else None
+        self._owns_pool = pool is None
+        if pool is None:
+            pool = DriverPool(size=1)
+            # With the API in front the browser is only a fallback, so start it on first use
+            if self.api_client is None:
+                try:
+                    pool.warm_up()
+                except Exception as e:
+                    self.logger.error(f"Failed to setup WebDriver: {str(e)}")
+                    raise
+        self.pool = pool
         
     def _setup_logging(self) -> logging.Logger:
         logger = logging.getLogger('CromaAvailabilityBot')
@@ -23,101 +90,272 @@ class CromaProductChecker:
         logger.addHandler(handler)
         return logger
 
-    def _setup_webdriver(self) -> webdriver.Chrome:
-        # Install ChromeDriver if not present
-        try:
-            options = webdriver.ChromeOptions()
-            options.add_argument('--headless')
-            options.add_argument('--disable-gpu')
-            options.add_argument('--no-sandbox')
-            options.add_argument('--disable-dev-shm-usage')
-            # Add chrome binary location if needed
-            options.binary_location = "/usr/bin/chromium-browser"  # for Ubuntu/Debian
-            options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36')
-            
-            # Setup ChromeDriver using webdriver_manager
-            service = Service(ChromeDriverManager().install())
-            return webdriver.Chrome(service=service, options=options)
-        except Exception as e:
-            self.logger.error(f"Failed to setup WebDriver: {str(e)}")
-            raise
-
     def check_availability(self, url: str, pincode: str) -> Dict:
         """
         Check product availability for Croma product
         """
+        return self.check_pincodes(url, [pincode])[pincode]
+
+    def check_pincodes(self, url: str, pincodes: List[str]) -> Dict[str, Dict]:
+        """
+        Check one product against several pincodes
+
+        Results cached within cache_ttl are reused. For the rest, the API is
+        asked once, or the page is loaded once and each pincode is entered on
+        that same page.
+
+        Returns:
+            dict: pincode -> result dict, as returned by check_availability
+        """
+        pincodes = list(dict.fromkeys(pincodes))
+        results = {}
+        missing = []
+        for pincode in pincodes:
+            cached = self._cached_result(url, pincode)
+            if cached is not None:
+                results[pincode] = cached
+            else:
+                missing.append(pincode)
+        if not missing:
+            self.logger.info(f"All {len(pincodes)} pincodes for {url} answered from cache")
+            return results
+
+        start = time.monotonic()
+        fresh = None
+        if self.api_client is not None:
+            try:
+                fresh = dict(zip(missing, self.api_client.check_availability_batch([url], missing)))
+            except CromaApiError as e:
+                self.logger.warning(f"API check failed, falling back to browser: {str(e)}")
+        if fresh is None:
+            fresh = self._check_pincodes_in_browser(url, missing)
+
+        latency = time.monotonic() - start
+        self._flag_price_change(url, list(fresh.values()))
+        for pincode, result in fresh.items():
+            self.logger.info(f"Check completed: {result}")
+            self._log_event(result, latency)
+            if 'error' not in result:
+                self._cache_result(url, pincode, result)
+        results.update(fresh)
+        return {pincode: results[pincode] for pincode in pincodes}
+
+    def _cache_key(self, url: str, pincode: str) -> Tuple[str, str]:
+        try:
+            return sku_from_url(url), pincode
+        except CromaApiError:
+            return url, pincode
+
+    def _cached_result(self, url: str, pincode: str) -> Optional[Dict]:
+        if self.cache_ttl <= 0:
+            return None
+        key = self._cache_key(url, pincode)
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._cache[key]
+                return None
+            return dict(entry[1], url=url)
+
+    def _cache_result(self, url: str, pincode: str, result: Dict):
+        if self.cache_ttl <= 0:
+            return
+        cached = {key: value for key, value in result.items() if key not in PRICE_CHANGE_KEYS}
+        with self._cache_lock:
+            self._cache[self._cache_key(url, pincode)] = (time.monotonic() + self.cache_ttl, cached)
+
+    def _flag_price_change(self, url: str, results: List[Dict]):
+        """Mark fresh results with price_changed/previous_price if the price differs from the last one seen"""
+        prices = [r['price'] for r in results if 'error' not in r and "Not Found" not in r.get('price', "Not Found")]
+        if not prices:
+            return
+        key = self._cache_key(url, '')[0]
+        with self._cache_lock:
+            previous = self._last_prices.get(key)
+            self._last_prices[key] = prices[-1]
+        if previous is None or previous == prices[-1]:
+            return
+        self.logger.info(f"Price changed from {previous} to {prices[-1]} for URL: {url}")
+        for result in results:
+            if 'error' not in result:
+                result.update(price_changed=True, previous_price=previous)
+
+    def _log_event(self, result: Dict, latency: Optional[float] = None):
+        if self.event_log is not None:
+            self.event_log.append(event_from_availability(result, latency=latency))
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
+
+    def check_availability_batch(self, urls: List[str], pincodes: List[str]) -> List[Dict]:
+        """
+        Check every URL against every pincode, batching the API calls
+
+        Pairs cached within cache_ttl are reused; the API is asked about the
+        rest in one batch, covering only the URLs that have a pair missing.
+
+        Returns:
+            list: One result dict per (url, pincode) pair, URLs in the outer loop
+        """
+        requested = pincodes
+        pincodes = list(dict.fromkeys(pincodes))
+        results: Dict[Tuple[str, str], Dict] = {}
+        for url in dict.fromkeys(urls):
+            for pincode in pincodes:
+                cached = self._cached_result(url, pincode)
+                if cached is not None:
+                    results[(url, pincode)] = cached
+        missing_urls = [url for url in dict.fromkeys(urls)
+                        if any((url, pincode) not in results for pincode in pincodes)]
+
+        if missing_urls and self.api_client is not None:
+            try:
+                start = time.monotonic()
+                fresh = self.api_client.check_availability_batch(missing_urls, pincodes)
+                latency = time.monotonic() - start
+                by_url: Dict[str, List[Dict]] = {}
+                for result in fresh:
+                    by_url.setdefault(result['url'], []).append(result)
+                for url, url_results in by_url.items():
+                    self._flag_price_change(url, url_results)
+                for result in fresh:
+                    key = (result['url'], result['pincode'])
+                    if key in results:
+                        continue  # Already answered from the cache
+                    self._log_event(result, latency)
+                    self._cache_result(result['url'], result['pincode'], result)
+                    results[key] = result
+                missing_urls = []
+            except CromaApiError as e:
+                self.logger.warning(f"Batched API check failed, falling back to browser: {str(e)}")
+        for url in missing_urls:
+            for pincode, result in self.check_pincodes(url, pincodes).items():
+                results[(url, pincode)] = result
+        return [results[(url, pincode)] for url in urls for pincode in requested]
+
+    def _check_pincodes_in_browser(self, url: str, pincodes: List[str]) -> Dict[str, Dict]:
+        """Render the product page once on a pooled browser and check every pincode on it"""
+        try:
+            with self.pool.lease() as driver:
+                return self._check_pincodes(driver, url, pincodes)
+        except Exception as e:
+            self.logger.error(f"Error checking availability: {str(e)}")
+            return {pincode: self._error_result(url, pincode, e) for pincode in pincodes}
+
+    def _error_result(self, url: str, pincode: str, error: Exception) -> Dict:
+        return {
+            'timestamp': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+            'error': str(error),
+            'is_available': False,
+            'url': url,
+            'pincode': pincode
+        }
+
+    def _check_pincodes(self, driver: 'webdriver.Chrome', url: str, pincodes: List[str]) -> Dict[str, Dict]:
+        """Load the page once, then enter each pincode in turn on the same page"""
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
         try:
             self.logger.info(f"Checking availability for URL: {url}")
-            self.driver.get(url)
+            driver.get(url)
             
-            # Wait for page to load
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
+            if self.pool.lightweight:
+                # driver.get() returned before the load event, so wait only for
+                # the nodes we read and then stop whatever is still loading
+                try:
+                    WebDriverWait(driver, 10, poll_frequency=0.1).until(_availability_nodes_present)
+                except TimeoutException:
+                    self.logger.warning(f"Price/availability not found within 10s, reading partial page: {url}")
+                driver.execute_script("window.stop();")
+            else:
+                # Wait for page to load
+                WebDriverWait(driver, 10).until(
+                    EC.presence_of_element_located((By.TAG_NAME, "body"))
+                )
 
-            # Get product name
-            try:
-                product_name = self.driver.find_element(By.TAG_NAME, "h1").text
-            except:
-                product_name = "Product Name Not Found"
+            # A captcha or access-denied page has no buy button and would read as out of
+            # stock; report it as an error so it is neither cached nor logged as a verdict
+            if is_block_page(driver.page_source):
+                self.logger.warning(f"Croma served a captcha or access-denied page, availability unknown: {url}")
+                error = RuntimeError("captcha or access-denied page instead of the product page")
+                return {pincode: self._error_result(url, pincode, error) for pincode in pincodes}
 
-            # Get price
-            try:
-                price_element = self.driver.find_element(By.XPATH, "//span[contains(@class, 'price')]")
-                price = price_element.text.strip()
-            except:
-                price = "Price Not Found"
-
-            # Check initial availability
-            initial_status = self._check_initial_availability()
-
-            # If product appears available, check pincode availability
-            if initial_status['is_available']:
-                delivery_status = self._check_pincode_availability(pincode)
-                initial_status.update(delivery_status)
-
-            # Add product details to response
-            result = {
-                'timestamp': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
-                'product_name': product_name,
-                'price': price,
-                'url': url,
-                'pincode': pincode,
-                **initial_status
-            }
+            fingerprint = self._availability_fingerprint(driver)
+            cached = self._page_results.lookup(url, fingerprint) if fingerprint else None
+            if cached is not None:
+                self.logger.info(f"Availability region unchanged, reusing last status for URL: {url}")
+                product_name, price, initial_status = cached
+            else:
+                # Get product name
+                try:
+                    product_name = driver.find_element(By.TAG_NAME, "h1").text
+                except:
+                    product_name = "Product Name Not Found"
 
-            self.logger.info(f"Check completed: {result}")
-            return result
+                # Get price
+                try:
+                    price_element = driver.find_element(By.XPATH, PRICE_XPATH)
+                    price = price_element.text.strip()
+                except:
+                    price = "Price Not Found"
+
+                # Check initial availability
+                initial_status = self._check_initial_availability(driver)
+                if fingerprint:
+                    self._page_results.store(url, fingerprint, (product_name, price, dict(initial_status)))
+
+            # The page-level status is the same for every pincode; only delivery changes
+            results = {}
+            for pincode in pincodes:
+                status = dict(initial_status)
+                if initial_status['is_available']:
+                    status.update(self._check_pincode_availability(driver, pincode))
+
+                # Add product details to response
+                results[pincode] = {
+                    'timestamp': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+                    'product_name': product_name,
+                    'price': price,
+                    'url': url,
+                    'pincode': pincode,
+                    **status
+                }
+            return results
 
         except Exception as e:
             self.logger.error(f"Error checking availability: {str(e)}")
-            return {
-                'timestamp': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
-                'error': str(e),
-                'is_available': False,
-                'url': url,
-                'pincode': pincode
-            }
+            return {pincode: self._error_result(url, pincode, e) for pincode in pincodes}
 
-    def _check_initial_availability(self) -> Dict:
+    def _availability_fingerprint(self, driver: 'webdriver.Chrome') -> Optional[str]:
+        """Fingerprint of the rendered price, stock and button nodes, or None if it can't be read"""
+        try:
+            region = driver.execute_script(AVAILABILITY_REGION_SCRIPT) or ''
+            return hashlib.blake2b(region.encode('utf-8', 'replace'), digest_size=16).hexdigest()
+        except Exception as e:
+            self.logger.warning(f"Could not fingerprint page: {str(e)}")
+            return None
+
+    def _check_initial_availability(self, driver: 'webdriver.Chrome') -> Dict:
         """Check basic availability indicators"""
+        from selenium.webdriver.common.by import By
+
         status = {'is_available': False}
 
         try:
             # Check for out of stock messages
-            out_of_stock_elements = self.driver.find_elements(
-                By.XPATH, 
-                "//*[contains(text(), 'Out of Stock') or contains(text(), 'Currently Unavailable')]"
-            )
+            out_of_stock_elements = driver.find_elements(By.XPATH, OUT_OF_STOCK_XPATH)
             if out_of_stock_elements:
                 status['status_message'] = "Out of Stock"
                 return status
 
             # Check for buy now button
-            buy_buttons = self.driver.find_elements(
-                By.XPATH, 
-                "//button[contains(text(), 'Buy Now') or contains(text(), 'ADD TO CART')]"
-            )
+            buy_buttons = driver.find_elements(By.XPATH, BUY_BUTTON_XPATH)
             if buy_buttons:
                 status['is_available'] = True
                 status['status_message'] = "Product appears to be in stock"
@@ -129,27 +367,46 @@ class CromaProductChecker:
 
         return status
 
-    def _check_pincode_availability(self, pincode: str) -> Dict:
+    def _check_pincode_availability(self, driver: 'webdriver.Chrome', pincode: str) -> Dict:
         """Check delivery availability for pincode"""
+        from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
         try:
             # Find and fill pincode input
-            pincode_input = WebDriverWait(self.driver, 5).until(
+            pincode_input = WebDriverWait(driver, 5).until(
                 EC.presence_of_element_located((By.XPATH, "//input[@type='text'][@placeholder='Enter Pincode']"))
             )
             pincode_input.clear()
             pincode_input.send_keys(pincode)
 
+            # Remember the delivery text shown before the check so we can tell when it updates
+            before_elements = driver.find_elements(By.XPATH, DELIVERY_XPATH)
+            before = [element.text for element in before_elements]
+
             # Click check button
-            check_button = self.driver.find_element(By.XPATH, "//button[contains(text(), 'Check')]")
+            check_button = driver.find_element(By.XPATH, "//button[contains(text(), 'Check')]")
             check_button.click()
 
-            # Wait and check delivery message
-            time.sleep(2)  # Wait for delivery status to update
-            
-            delivery_messages = self.driver.find_elements(
-                By.XPATH, 
-                "//*[contains(text(), 'Delivery') or contains(text(), 'delivery')]"
-            )
+            # This click has been answered once the message names the typed pincode, reads
+            # differently or was re-rendered. Several pincodes in a row often get the same
+            # message ("Delivery by tomorrow") without a re-render, so after the first one
+            # only wait briefly before reading it
+            def answered(d):
+                texts = [element.text for element in d.find_elements(By.XPATH, DELIVERY_XPATH)]
+                return (any(pincode in text for text in texts) or texts != before or
+                        bool(before_elements and EC.staleness_of(before_elements[0])(d)))
+
+            timeout = DELIVERY_REPEAT_TIMEOUT if any(before) else DELIVERY_FIRST_TIMEOUT
+            try:
+                WebDriverWait(driver, timeout, poll_frequency=0.1,
+                              ignored_exceptions=(StaleElementReferenceException,)).until(answered)
+            except TimeoutException:
+                pass  # The message may legitimately be unchanged, read what is there
+
+            delivery_messages = driver.find_elements(By.XPATH, DELIVERY_XPATH)
             
             if delivery_messages:
                 message = delivery_messages[0].text
@@ -170,10 +427,14 @@ class CromaProductChecker:
                 'delivery_message': f'Error checking delivery: {str(e)}'
             }
 
+    def close(self):
+        """Shut down the browser pool if this checker started it"""
+        if getattr(self, '_owns_pool', False) and hasattr(self, 'pool'):
+            self.pool.close()
+
     def __del__(self):
         """Cleanup"""
-        if hasattr(self, 'driver'):
-            self.driver.quit()
+        self.close()
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,202 @@
+import json
+import logging
+import math
+import os
+from collections import namedtuple
+
+from config import PRODUCTS_PATH, WATCHLIST_PATH
+
+logger = logging.getLogger("CromaStockAlert.registry")
+
+# Lists of product dicts; `changed` holds the new version of each changed product
+RegistryDiff = namedtuple('RegistryDiff', ['added', 'removed', 'changed'])
+
+REQUIRED_FIELDS = ('id', 'name', 'url')
+
+
+def _valid_priority(value):
+    """True if value can be a product's scheduling priority: a positive, finite number"""
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        return False
+    try:
+        value = float(value)
+    except ValueError:
+        return False
+    return math.isfinite(value) and value > 0
+
+
+def _parse_file(path):
+    """Parse a .json list or a .jsonl file (one product per line) into a list of products"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            products = []
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    products.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"line {line_number}: {str(e)}") from e
+            return products
+        data = json.load(f)
+    if not isinstance(data, list):
+        raise ValueError("expected a JSON list of products")
+    return data
+
+
+class ProductRegistry:
+    """
+    The set of products to monitor, loaded from products.json or a directory of shards
+
+    refresh() only stats the files; a file is re-parsed when its mtime or size
+    changed, and a file that fails to parse keeps its last good contents.
+    Shards are *.json (a list) or *.jsonl (one product per line) files.
+
+    Products added at runtime with watch() are kept in a separate watchlist
+    file (.jsonl) that is loaded last, so they survive restarts.
+    """
+
+    def __init__(self, path=PRODUCTS_PATH, watchlist_path=WATCHLIST_PATH):
+        self.path = path
+        self.watchlist_path = watchlist_path
+        self._files = {}      # file path -> ((mtime_ns, size), [products])
+        self._products = {}   # product id -> product
+
+    @property
+    def products(self):
+        return list(self._products.values())
+
+    def get(self, product_id):
+        return self._products.get(product_id)
+
+    def __len__(self):
+        return len(self._products)
+
+    def _source_files(self):
+        if os.path.isdir(self.path):
+            files = sorted(
+                os.path.join(self.path, name) for name in os.listdir(self.path)
+                if name.endswith(('.json', '.jsonl')) and not name.startswith('.')
+            )
+        else:
+            files = [self.path] if os.path.exists(self.path) else []
+        if self.watchlist_path and os.path.exists(self.watchlist_path):
+            watchlist = os.path.abspath(self.watchlist_path)
+            files = [f for f in files if os.path.abspath(f) != watchlist] + [self.watchlist_path]
+        return files
+
+    def is_watched(self, product_id):
+        """True if the product came from the watchlist rather than the product files"""
+        cached = self._files.get(self.watchlist_path)
+        return cached is not None and any(p.get('id') == product_id for p in cached[1] if isinstance(p, dict))
+
+    def watch(self, product):
+        """
+        Add a product (a dict with id, name and url) to the watchlist
+
+        Returns:
+            RegistryDiff: the resulting change, already applied to the registry
+        """
+        if any(not product.get(k) for k in REQUIRED_FIELDS):
+            raise ValueError(f"product needs {'/'.join(REQUIRED_FIELDS)}")
+        products = [p for p in self._read_watchlist() if p.get('id') != product['id']]
+        products.append(product)
+        return self._write_watchlist(products)
+
+    def unwatch(self, product_id):
+        """
+        Remove a product from the watchlist; products from the product files are not touched
+
+        Returns:
+            RegistryDiff: the resulting change, already applied to the registry
+        """
+        products = self._read_watchlist()
+        remaining = [p for p in products if p.get('id') != product_id]
+        if len(remaining) == len(products):
+            return RegistryDiff([], [], [])
+        return self._write_watchlist(remaining)
+
+    def _read_watchlist(self):
+        try:
+            return [p for p in _parse_file(self.watchlist_path) if isinstance(p, dict)]
+        except FileNotFoundError:
+            return []
+
+    def _write_watchlist(self, products):
+        tmp_path = self.watchlist_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for product in products:
+                f.write(json.dumps(product, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, self.watchlist_path)
+        # Two writes within the mtime resolution can leave mtime and size unchanged
+        self._files.pop(self.watchlist_path, None)
+        return self.refresh()
+
+    def refresh(self):
+        """
+        Pick up changes to the product files
+
+        Returns:
+            RegistryDiff: products added, removed and changed since the last refresh
+        """
+        files = self._source_files()
+        if not files and not self._files:
+            logger.error(f"Products file not found. Please create {self.path}")
+
+        dirty = False
+        for path in list(self._files):
+            if path not in files:
+                del self._files[path]
+                dirty = True
+
+        for path in files:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            signature = (stat.st_mtime_ns, stat.st_size)
+            cached = self._files.get(path)
+            if cached is not None and cached[0] == signature:
+                continue
+            try:
+                products = _parse_file(path)
+            except (OSError, ValueError) as e:
+                # json.JSONDecodeError is a ValueError; keep serving the last good version
+                logger.error(f"Invalid product file {path}, keeping previous version: {str(e)}")
+                if cached is not None:
+                    self._files[path] = (signature, cached[1])
+                continue
+            self._files[path] = (signature, products)
+            dirty = True
+
+        if not dirty:
+            return RegistryDiff([], [], [])
+        return self._rebuild()
+
+    def _rebuild(self):
+        latest = {}
+        for path, (_, products) in self._files.items():
+            for product in products:
+                if not isinstance(product, dict) or any(not product.get(k) for k in REQUIRED_FIELDS):
+                    logger.warning(f"Skipping product without {'/'.join(REQUIRED_FIELDS)} in {path}: {product}")
+                    continue
+                if not isinstance(product['id'], str):
+                    # Ids key the state table, scheduler and bot commands, which all expect strings
+                    product = dict(product, id=str(product['id']))
+                if 'priority' in product and not _valid_priority(product['priority']):
+                    logger.warning(f"Ignoring invalid priority {product['priority']!r} of product {product['id']} "
+                                   f"in {path}, using the default")
+                    product = {k: v for k, v in product.items() if k != 'priority'}
+                if product['id'] in latest:
+                    logger.warning(f"Duplicate product id {product['id']} in {path}, using the last one")
+                latest[product['id']] = product
+
+        previous = self._products
+        added = [p for pid, p in latest.items() if pid not in previous]
+        removed = [p for pid, p in previous.items() if pid not in latest]
+        changed = [p for pid, p in latest.items() if pid in previous and previous[pid] != p]
+        self._products = latest
+        if added or removed or changed:
+            logger.info(f"Products reloaded: {len(added)} added, {len(removed)} removed, {len(changed)} changed")
+        return RegistryDiff(added, removed, changed)
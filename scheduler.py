@@ -0,0 +1,219 @@
+import heapq
+import itertools
+import logging
+import random
+import time
+
+from config import (CHECK_INTERVAL, SCHEDULER_MIN_INTERVAL, SCHEDULER_MAX_INTERVAL,
+                    SCHEDULER_MAX_RPS, SCHEDULER_JITTER)
+
+logger = logging.getLogger("CromaStockAlert.scheduler")
+
+# A product whose verdict changed is checked this much more often, an unchanged one this much less
+SPEED_UP_ON_CHANGE = 0.5
+SLOW_DOWN_ON_STABLE = 1.25
+# Cap on the error backoff exponent; 2 ** 32 already reaches max_interval, and a float
+# interval times 2 ** 1024 would overflow
+MAX_BACKOFF_EXPONENT = 32
+
+
+class _Entry:
+    __slots__ = ('product', 'priority', 'interval', 'errors', 'due')
+
+    def __init__(self, product, priority, interval, due):
+        self.product = product
+        self.priority = priority
+        self.interval = interval
+        self.errors = 0
+        self.due = due
+
+
+class PollScheduler:
+    """
+    Heap of products keyed by next-due time, with per-product adaptive intervals
+
+    Each product starts at `base_interval`. A check that sees a change halves
+    the interval, an unchanged result stretches it by 25%, and errors back off
+    exponentially; the result is divided by the product's priority, clamped to
+    [min_interval, max_interval] and jittered. pop_due() never hands out more
+    checks than the global `max_rps` token bucket allows.
+
+    Products are dicts from products.json; an optional 'priority' field (default 1)
+    makes a product proportionally more or less frequent.
+    """
+
+    def __init__(self, base_interval=CHECK_INTERVAL, min_interval=SCHEDULER_MIN_INTERVAL,
+                 max_interval=SCHEDULER_MAX_INTERVAL, max_rps=SCHEDULER_MAX_RPS,
+                 jitter=SCHEDULER_JITTER, clock=time.monotonic, rng=None):
+        self.base_interval = base_interval
+        self.min_interval = min(min_interval, base_interval)
+        self.max_interval = max(max_interval, base_interval)
+        self.max_rps = max_rps
+        self.jitter = jitter
+        self.clock = clock
+        self.rng = rng or random.Random()
+
+        self._entries = {}
+        self._heap = []
+        self._counter = itertools.count()
+        self._in_flight = set()
+
+        self._burst = max(1.0, max_rps)
+        self._tokens = self._burst
+        self._tokens_at = clock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, product_id):
+        return product_id in self._entries
+
+    def add(self, product, due=None):
+        """Start scheduling a product, due immediately unless `due` is given"""
+        product_id = product['id']
+        if product_id in self._entries:
+            self.update(product)
+            return
+        entry = _Entry(product, float(product.get('priority', 1.0)) or 1.0, self.base_interval,
+                       self.clock() if due is None else due)
+        self._entries[product_id] = entry
+        self._push(product_id, entry)
+
+    def update(self, product):
+        """Replace a product's details (e.g. new URL or priority) and check it again soon"""
+        entry = self._entries.get(product['id'])
+        if entry is None:
+            self.add(product)
+            return
+        entry.product = product
+        entry.priority = float(product.get('priority', 1.0)) or 1.0
+        entry.interval = self.base_interval
+        entry.errors = 0
+        if product['id'] not in self._in_flight:
+            entry.due = self.clock()
+            self._push(product['id'], entry)
+
+    def remove(self, product_id):
+        """Stop scheduling a product; stale heap entries are skipped lazily"""
+        self._entries.pop(product_id, None)
+        self._in_flight.discard(product_id)
+
+    def seconds_until_next(self):
+        """Seconds until the next product is due and the request budget allows it"""
+        self._drop_stale()
+        if not self._heap:
+            return self.max_interval
+        wait = max(0.0, self._heap[0][0] - self.clock())
+        self._refill()
+        if self._tokens < 1 and self.max_rps > 0:
+            wait = max(wait, (1 - self._tokens) / self.max_rps)
+        return wait
+
+    def pop_due(self, limit=None):
+        """
+        Take the products whose checks are due, within the request budget
+
+        Each returned product must be handed back through report() once checked.
+        """
+        now = self.clock()
+        self._refill()
+        due = []
+        while self._heap and (limit is None or len(due) < limit):
+            self._drop_stale()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            if self.max_rps > 0 and self._tokens < 1:
+                break
+            _, _, product_id, entry = heapq.heappop(self._heap)
+            self._tokens -= 1
+            self._in_flight.add(product_id)
+            due.append(entry.product)
+        return due
+
+    def report(self, product_id, changed=False, error=False):
+        """Reschedule a product after a check, adapting its interval to the outcome"""
+        self._in_flight.discard(product_id)
+        entry = self._entries.get(product_id)
+        if entry is None:
+            return
+
+        if error:
+            entry.errors += 1
+            delay = min(self.max_interval, entry.interval * (2 ** min(entry.errors, MAX_BACKOFF_EXPONENT)))
+        else:
+            entry.errors = 0
+            factor = SPEED_UP_ON_CHANGE if changed else SLOW_DOWN_ON_STABLE
+            entry.interval = min(self.max_interval, max(self.min_interval, entry.interval * factor))
+            delay = min(self.max_interval, max(self.min_interval, entry.interval / entry.priority))
+
+        if self.jitter:
+            delay *= self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+        entry.due = self.clock() + delay
+        self._push(product_id, entry)
+
+    def interval(self, product_id):
+        """Current adaptive interval for a product, or None if it isn't scheduled"""
+        entry = self._entries.get(product_id)
+        return entry.interval if entry else None
+
+    def _push(self, product_id, entry):
+        heapq.heappush(self._heap, (entry.due, next(self._counter), product_id, entry))
+
+    def _drop_stale(self):
+        # Entries are re-pushed instead of updated in place, so skip the outdated copies
+        while self._heap:
+            due, _, product_id, entry = self._heap[0]
+            if (self._entries.get(product_id) is entry and entry.due == due
+                    and product_id not in self._in_flight):
+                return
+            heapq.heappop(self._heap)
+
+    def _refill(self):
+        now = self.clock()
+        if self.max_rps > 0:
+            self._tokens = min(self._burst, self._tokens + (now - self._tokens_at) * self.max_rps)
+        self._tokens_at = now
+
+
+class SweepTimer:
+    """
+    Measures how long it takes until every product has been checked once
+
+    With per-product scheduling there is no sweep to time, so a sweep starts
+    with the products known at that moment and ends once each of them has
+    reported a check (or been removed); its duration goes to `histogram` and
+    the next sweep starts with the products known then.
+
+    Args:
+        histogram: metrics histogram to observe sweep durations in
+        product_ids (callable): returns the ids of the products currently monitored
+    """
+
+    def __init__(self, histogram, product_ids, clock=time.monotonic):
+        self.histogram = histogram
+        self.product_ids = product_ids
+        self.clock = clock
+        self._pending = None
+        self._started = None
+
+    def checked(self, product_id):
+        """Note a finished check of a product, successful or not"""
+        if self._pending is None:
+            self._start()
+        self._pending.discard(product_id)
+        self._finish_if_done()
+
+    def discard(self, product_id):
+        """Stop waiting for a product that is no longer monitored"""
+        if self._pending is not None:
+            self._pending.discard(product_id)
+            self._finish_if_done()
+
+    def _start(self):
+        self._pending = set(self.product_ids())
+        self._started = self.clock()
+
+    def _finish_if_done(self):
+        if not self._pending:
+            self.histogram.observe(self.clock() - self._started)
+            self._start()
@@ -0,0 +1,203 @@
+import logging
+import sqlite3
+import threading
+import time
+
+from config import STATE_DB_PATH, STATE_FLUSH_INTERVAL, STATE_FLUSH_BATCH
+from croma_api import format_inr
+from state_table import StateTable, Verdict
+
+logger = logging.getLogger("CromaStockAlert.state")
+
+EVENT_IN_STOCK = 'in_stock'
+EVENT_OUT_OF_STOCK = 'out_of_stock'
+EVENT_PRICE_CHANGED = 'price_changed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS product_state (
+    product_id   TEXT NOT NULL,
+    pincode      TEXT NOT NULL DEFAULT '',
+    in_stock     INTEGER NOT NULL,
+    price        TEXT,
+    last_changed REAL NOT NULL,
+    last_checked REAL NOT NULL,
+    latency      REAL,
+    PRIMARY KEY (product_id, pincode)
+);
+CREATE TABLE IF NOT EXISTS check_history (
+    id         INTEGER PRIMARY KEY,
+    product_id TEXT NOT NULL,
+    pincode    TEXT NOT NULL DEFAULT '',
+    checked_at REAL NOT NULL,
+    in_stock   INTEGER NOT NULL,
+    price      TEXT,
+    latency    REAL,
+    event      TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_history_event_time ON check_history (event, checked_at) WHERE event IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_history_product_time ON check_history (product_id, pincode, checked_at);
+"""
+
+
+def _rupees(price_text):
+    """Rupees in a stored price like ₹1,29,900, or None"""
+    digits = ''.join(c for c in price_text or '' if c.isdigit() or c == '.')
+    try:
+        return float(digits) if digits else None
+    except ValueError:
+        return None
+
+
+class StateStore:
+    """
+    SQLite (WAL) store for the last verdict per product/pincode and the check history
+
+    record() updates the in-memory copy of the state (a compact StateTable,
+    also exposed as `table` for main's status view) straight away and buffers
+    the rows; they are written in one transaction once `flush_batch` rows are
+    pending or `flush_interval` seconds have passed, so the check loop doesn't
+    wait on the disk for every result. Prices are kept in whole rupees.
+    """
+
+    def __init__(self, path=STATE_DB_PATH, flush_interval=STATE_FLUSH_INTERVAL, flush_batch=STATE_FLUSH_BATCH):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # In WAL mode NORMAL only syncs at checkpoints, which is enough for state we can re-check
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+        self.table = StateTable()
+        for product_id, pincode, in_stock, price, last_changed, last_checked in self._conn.execute(
+                "SELECT product_id, pincode, in_stock, price, last_changed, last_checked FROM product_state"):
+            self.table.put(product_id, Verdict.from_bool(bool(in_stock)), pincode, price=_rupees(price),
+                           last_changed=last_changed, last_checked=last_checked)
+
+        self._pending_state = {}
+        self._pending_history = []
+        self._last_flush = time.monotonic()
+
+    def load_status(self, pincode=''):
+        """Return {product_id: in_stock} for one pincode"""
+        with self._lock:
+            return {pid: verdict.to_bool() for pid, pc, verdict in self.table.items()
+                    if pc == pincode and verdict is not Verdict.UNKNOWN}
+
+    def get(self, product_id, pincode=''):
+        """
+        Returns:
+            dict: {'in_stock', 'price' (formatted, e.g. ₹54,999, or None), 'last_changed'} or None if the
+                  product never got a verdict
+        """
+        with self._lock:
+            state = self.table.get(product_id, pincode)
+        if state is None or state['verdict'] is Verdict.UNKNOWN:
+            return None
+        price = state['price']
+        return {'in_stock': state['verdict'].to_bool(), 'price': format_inr(price) if price else None,
+                'last_changed': state['last_changed']}
+
+    def record(self, product_id, in_stock, price=None, latency=None, pincode='', checked_at=None):
+        """
+        Record a check result
+
+        Args:
+            price (float): Price in rupees, None if the check didn't see one
+
+        Returns:
+            str: EVENT_IN_STOCK or EVENT_OUT_OF_STOCK if the verdict changed, EVENT_PRICE_CHANGED
+                 if only the price changed, otherwise None
+        """
+        checked_at = time.time() if checked_at is None else checked_at
+        with self._lock:
+            previous = self.table.get(product_id, pincode)
+            known = previous is not None and previous['verdict'] is not Verdict.UNKNOWN
+            event = None
+            if not known or previous['verdict'].to_bool() != in_stock:
+                if in_stock:
+                    event = EVENT_IN_STOCK
+                elif known:
+                    event = EVENT_OUT_OF_STOCK
+            elif price is not None and previous['price'] and int(round(price)) != previous['price']:
+                event = EVENT_PRICE_CHANGED
+
+            self.table.record(product_id, Verdict.from_bool(in_stock), pincode, price=price, checked_at=checked_at)
+            state = self.table.get(product_id, pincode)
+            price_text = format_inr(state['price']) if state['price'] else None
+            self._pending_state[(product_id, pincode)] = (product_id, pincode, int(in_stock), price_text,
+                                                          state['last_changed'], checked_at, latency)
+            self._pending_history.append((product_id, pincode, checked_at, int(in_stock),
+                                          format_inr(price) if price is not None else None, latency, event))
+            due = (len(self._pending_history) >= self.flush_batch or
+                   time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+        return event
+
+    def flush(self):
+        """Write all buffered results in a single transaction"""
+        with self._lock:
+            if not self._pending_history:
+                self._last_flush = time.monotonic()
+                return
+            state_rows = list(self._pending_state.values())
+            history_rows = self._pending_history
+            self._pending_state = {}
+            self._pending_history = []
+            try:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT INTO product_state (product_id, pincode, in_stock, price, last_changed, last_checked, latency) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT (product_id, pincode) DO UPDATE SET in_stock = excluded.in_stock, "
+                        "price = excluded.price, last_changed = excluded.last_changed, "
+                        "last_checked = excluded.last_checked, latency = excluded.latency",
+                        state_rows)
+                    self._conn.executemany(
+                        "INSERT INTO check_history (product_id, pincode, checked_at, in_stock, price, latency, event) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        history_rows)
+            except sqlite3.Error as e:
+                logger.error(f"Failed to write {len(history_rows)} check results: {str(e)}")
+            self._last_flush = time.monotonic()
+
+    def events_since(self, event, since):
+        """
+        Return events of one kind recorded at or after a Unix timestamp, newest first
+
+        Returns:
+            list: (product_id, pincode, checked_at, price) tuples
+        """
+        self.flush()
+        with self._lock:
+            return self._conn.execute(
+                "SELECT product_id, pincode, checked_at, price FROM check_history "
+                "WHERE event = ? AND checked_at >= ? ORDER BY checked_at DESC",
+                (event, since)).fetchall()
+
+    def restocks_in_last(self, seconds=24 * 3600):
+        """Products that came back in stock within the last `seconds` seconds"""
+        return self.events_since(EVENT_IN_STOCK, time.time() - seconds)
+
+    def history(self, product_id, pincode='', since=0):
+        """
+        Returns:
+            list: (checked_at, in_stock, price, latency) tuples for one product, oldest first
+        """
+        self.flush()
+        with self._lock:
+            return [(checked_at, bool(in_stock), price, latency) for checked_at, in_stock, price, latency in
+                    self._conn.execute(
+                        "SELECT checked_at, in_stock, price, latency FROM check_history "
+                        "WHERE product_id = ? AND pincode = ? AND checked_at >= ? ORDER BY checked_at",
+                        (product_id, pincode, since))]
+
+    def close(self):
+        """Flush buffered results and close the database"""
+        self.flush()
+        with self._lock:
+            self._conn.close()
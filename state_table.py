@@ -0,0 +1,207 @@
+import sys
+import time
+from array import array
+from collections.abc import MutableMapping
+from enum import IntEnum
+
+# Slot keys pack the product and pincode numbers into one int: product << 24 | pincode
+_PINCODE_BITS = 24
+
+
+class Verdict(IntEnum):
+    UNKNOWN = 0
+    OUT_OF_STOCK = 1
+    IN_STOCK = 2
+
+    @classmethod
+    def from_bool(cls, in_stock):
+        """True/False/None (the checkers' verdicts) -> Verdict"""
+        if in_stock is None:
+            return cls.UNKNOWN
+        return cls.IN_STOCK if in_stock else cls.OUT_OF_STOCK
+
+    def to_bool(self):
+        return None if self is Verdict.UNKNOWN else self is Verdict.IN_STOCK
+
+
+# Indexing this is much cheaper than calling Verdict(value) on every lookup
+_VERDICTS = tuple(Verdict)
+
+
+class StateTable:
+    """
+    Last verdict, price and change time for many product × pincode pairs, in little memory
+
+    Product ids and pincodes are interned to small ints and each pair gets a
+    slot in array-backed columns: verdict (1 byte), price in whole rupees and
+    last-changed / last-checked times as epoch seconds (4 bytes each). Lookups
+    and record() are O(1). Not thread-safe; use it from the event loop.
+    """
+
+    def __init__(self):
+        self._product_numbers = {}
+        self._product_ids = []
+        self._pincode_numbers = {}
+        self._pincodes = []
+        self._slots = {}   # packed key -> slot
+        self._free = []
+
+        self._verdict = array('B')
+        self._price = array('I')          # rupees, 0 when unknown
+        self._last_changed = array('I')   # epoch seconds, 0 when never known
+        self._last_checked = array('I')
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, key):
+        product_id, pincode = key if isinstance(key, tuple) else (key, '')
+        return self._key(product_id, pincode, create=False) in self._slots
+
+    def _key(self, product_id, pincode, create=True):
+        number = self._product_numbers.get(product_id)
+        if number is None:
+            if not create:
+                return None
+            product_id = sys.intern(product_id)
+            number = self._product_numbers[product_id] = len(self._product_ids)
+            self._product_ids.append(product_id)
+        pincode_number = self._pincode_numbers.get(pincode)
+        if pincode_number is None:
+            if not create:
+                return None
+            pincode_number = self._pincode_numbers[pincode] = len(self._pincodes)
+            self._pincodes.append(pincode)
+        return number << _PINCODE_BITS | pincode_number
+
+    def _slot(self, product_id, pincode):
+        key = self._key(product_id, pincode)
+        slot = self._slots.get(key)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+                self._verdict[slot] = Verdict.UNKNOWN
+                self._price[slot] = self._last_changed[slot] = self._last_checked[slot] = 0
+            else:
+                slot = len(self._verdict)
+                self._verdict.append(Verdict.UNKNOWN)
+                self._price.append(0)
+                self._last_changed.append(0)
+                self._last_checked.append(0)
+            self._slots[key] = slot
+        return slot
+
+    def _find(self, product_id, pincode):
+        key = self._key(product_id, pincode, create=False)
+        return None if key is None else self._slots.get(key)
+
+    def record(self, product_id, verdict, pincode='', price=None, checked_at=None):
+        """
+        Store a check result
+
+        An UNKNOWN verdict only updates the check time and keeps the last known verdict.
+
+        Returns:
+            Verdict: The verdict before this result; it differs from `verdict` on a transition
+                     (UNKNOWN the first time a pair gets a known verdict)
+        """
+        verdict = _VERDICTS[verdict]
+        now = int(time.time() if checked_at is None else checked_at)
+        slot = self._slot(product_id, pincode)
+        previous = _VERDICTS[self._verdict[slot]]
+        self._last_checked[slot] = now
+        if verdict is Verdict.UNKNOWN:
+            return previous
+        if verdict != previous:
+            self._verdict[slot] = verdict
+            self._last_changed[slot] = now
+        if price is not None:
+            self._price[slot] = int(round(price))
+        return previous
+
+    def put(self, product_id, verdict, pincode='', price=None, last_changed=None, last_checked=None):
+        """Set every field of a pair as given, e.g. when loading saved state"""
+        slot = self._slot(product_id, pincode)
+        self._verdict[slot] = _VERDICTS[verdict]
+        self._price[slot] = 0 if price is None else int(round(price))
+        self._last_changed[slot] = int(last_changed or 0)
+        self._last_checked[slot] = int(last_checked or last_changed or 0)
+
+    def verdict(self, product_id, pincode=''):
+        slot = self._find(product_id, pincode)
+        return Verdict.UNKNOWN if slot is None else _VERDICTS[self._verdict[slot]]
+
+    def get(self, product_id, pincode=''):
+        """
+        Returns:
+            dict: {'verdict', 'price' (rupees or None), 'last_changed', 'last_checked'} or None
+        """
+        slot = self._find(product_id, pincode)
+        if slot is None:
+            return None
+        return {
+            'verdict': _VERDICTS[self._verdict[slot]],
+            'price': self._price[slot] or None,
+            'last_changed': self._last_changed[slot] or None,
+            'last_checked': self._last_checked[slot] or None,
+        }
+
+    def discard(self, product_id, pincode=''):
+        """Forget one pair, e.g. a product removed from products.json; its slot is reused"""
+        key = self._key(product_id, pincode, create=False)
+        slot = self._slots.pop(key, None) if key is not None else None
+        if slot is not None:
+            self._verdict[slot] = Verdict.UNKNOWN
+            self._free.append(slot)
+
+    def items(self):
+        """Yield (product_id, pincode, Verdict) for every pair"""
+        mask = (1 << _PINCODE_BITS) - 1
+        for key, slot in self._slots.items():
+            yield self._product_ids[key >> _PINCODE_BITS], self._pincodes[key & mask], _VERDICTS[self._verdict[slot]]
+
+    def load(self, status, pincode='', checked_at=0):
+        """Seed verdicts from a {product_id: in_stock} dict"""
+        for product_id, in_stock in status.items():
+            self.record(product_id, Verdict.from_bool(in_stock), pincode, checked_at=checked_at)
+
+    def status(self, pincode=''):
+        """A {product_id: in_stock} mapping over one pincode, backed by this table"""
+        return StatusView(self, pincode)
+
+
+class StatusView(MutableMapping):
+    """
+    product_id -> True/False view of one pincode's verdicts in a StateTable
+
+    Drop-in for the plain {product_id: bool} dict main used to keep: pairs
+    without a known verdict look missing, so get() returns None for them.
+    """
+
+    def __init__(self, table, pincode=''):
+        self.table = table
+        self.pincode = pincode
+
+    def __getitem__(self, product_id):
+        in_stock = self.table.verdict(product_id, self.pincode).to_bool()
+        if in_stock is None:
+            raise KeyError(product_id)
+        return in_stock
+
+    def __setitem__(self, product_id, in_stock):
+        self.table.record(product_id, Verdict.from_bool(in_stock), self.pincode)
+
+    def __delitem__(self, product_id):
+        if product_id not in self:
+            raise KeyError(product_id)
+        self.table.discard(product_id, self.pincode)
+
+    def __contains__(self, product_id):
+        return self.table.verdict(product_id, self.pincode) is not Verdict.UNKNOWN
+
+    def __iter__(self):
+        return (product_id for product_id, pincode, verdict in self.table.items()
+                if pincode == self.pincode and verdict is not Verdict.UNKNOWN)
+
+    def __len__(self):
+        return sum(1 for _ in self)
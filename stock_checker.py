@@ -1,11 +1,13 @@
-import requests
-import json
 import logging
-import time
-from bs4 import BeautifulSoup
-from datetime import datetime
-import os
-import re
+from urllib.parse import urlsplit
+import http_pool
+import metrics
+from capture_store import get_capture_store
+from circuit_breaker import breaker_for, is_failure_status, retry_after
+from croma_api import CromaApiError, CromaApiUnavailable, get_client, sku_from_url
+from page_fingerprint import FingerprintCache, availability_fingerprint, extract_price
+from stock_classifier import classify_stock, detect_stock, is_block_page
+from config import CAPTURE_ENABLED
 
 # Set up logging
 logging.basicConfig(
@@ -18,8 +20,26 @@ logging.basicConfig(
 )
 logger = logging.getLogger("CromaStockAlert")
 
+# Last (verdict, price) per URL, reused while the availability region of the page is unchanged
+_page_results = FingerprintCache()
+
 def check_stock_with_requests(url, product_name):
-    """Improved stock checking function with better detection logic"""
+    """
+    Improved stock checking function with better detection logic
+
+    Returns:
+        bool: True/False, or None when the verdict is unknown (blocked, captcha or fetch failure)
+    """
+    return check_stock_and_price(url, product_name)[0]
+
+def check_stock_and_price(url, product_name):
+    """
+    Same as check_stock_with_requests, but also returns the price shown on the page
+
+    Returns:
+        tuple: (in_stock, price) where in_stock is None if the page couldn't be read and
+               price is a float or None if no price was found
+    """
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36',
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
@@ -32,113 +52,107 @@ def check_stock_with_requests(url, product_name):
         'sec-ch-ua-platform': '"Windows"',
     }
     
+    host = urlsplit(url).netloc
+    breaker = breaker_for(host)
+    if not breaker.allow():
+        logger.debug("Requests to %s are paused, verdict for %s unknown", host, product_name)
+        metrics.check_errors.inc(stage='circuit_open')
+        return None, None
+
     try:
-        logger.info(f"Checking stock for {product_name} at {url}")
-        response = requests.get(url, headers=headers, timeout=15)
+        logger.debug("Checking stock for %s at %s", product_name, url)
+        response = http_pool.conditional_get(url, headers=headers, timeout=15)
+    except Exception as e:
+        breaker.record_failure()
+        logger.error(f"Error fetching page for {product_name}: {str(e)}")
+        metrics.check_errors.inc(stage='fetch')
+        return None, None
+
+    try:
+        html = response.text if response.status_code == 200 else None
+        # Never classify a block or captcha page: it would read as out of stock
+        if is_failure_status(response.status_code) or (html is not None and is_block_page(html)):
+            breaker.record_failure(retry_after=retry_after(response.headers))
+            logger.warning(f"{host} refused the page for {product_name} (status {response.status_code}"
+                           f"{', captcha page' if html is not None else ''}), verdict unknown")
+            metrics.check_errors.inc(stage='blocked')
+            return None, None
+        breaker.record_success()
+
+        if response.status_code == 304:
+            previous = _page_results.last(url)
+            if previous is not None:
+                logger.info(f"Page for {product_name} not modified, reusing last verdict")
+                return previous
         
         if response.status_code == 200:
-            logger.info(f"Successfully loaded page for {product_name}")
-            
-            # Create directory for HTML responses if it doesn't exist
-            os.makedirs("responses", exist_ok=True)
-            
-            # Save the response for debugging
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"responses/{product_name.replace(' ', '_')}_{timestamp}.html"
-            with open(filename, "w", encoding="utf-8") as f:
-                f.write(response.text)
-            logger.info(f"Saved HTML response to {filename} for inspection")
+            logger.debug("Successfully loaded page for %s", product_name)
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            page_text = response.text.lower()
+            # Only classify pages whose stock/price region changed since the last check
+            fingerprint = availability_fingerprint(html)
+            cached = _page_results.lookup(url, fingerprint)
+            if cached is not None:
+                metrics.fingerprint_checks.inc(outcome='unchanged')
+                logger.debug("Availability region unchanged for %s, reusing last verdict", product_name)
+                verdict, price = cached
+            else:
+                metrics.fingerprint_checks.inc(outcome='changed')
+                verdict = classify_stock(html, product_name)
+                price = extract_price(html)
+                _page_results.store(url, fingerprint, (verdict, price))
+            http_pool.remember_validators(url, response)
             
-            # DETECTION METHOD 1: Check for explicit "In Stock" text
-            stock_status_elements = soup.select('.stock-status, .pdp-stock, [data-testid="stock-status"]')
-            for element in stock_status_elements:
-                text = element.text.strip().lower()
-                logger.info(f"Found stock status element with text: '{text}'")
-                if "in stock" in text:
-                    logger.info(f"✅ Product {product_name} is IN STOCK! (Found 'in stock' text)")
-                    return True
-                if any(x in text for x in ["out of stock", "sold out", "currently unavailable"]):
-                    logger.info(f"❌ Product {product_name} is OUT OF STOCK (Found out of stock text)")
-                    return False
-            
-            # DETECTION METHOD 2: Check for Add to Cart buttons
-            add_to_cart_patterns = [
-                'button[data-testid="add-to-cart"]',
-                '.pdp-action', 
-                '.add-to-cart',
-                '.buy-button',
-                '[data-testid="addToCartButton"]',
-                'button:contains("Add to Cart")',
-                'button:contains("Buy Now")'
-            ]
-            
-            for pattern in add_to_cart_patterns:
-                elements = soup.select(pattern)
-                if elements:
-                    logger.info(f"Found {len(elements)} potential add-to-cart elements with selector '{pattern}'")
-                    
-                    for element in elements:
-                        element_html = str(element)
-                        element_text = element.text.strip()
-                        
-                        logger.info(f"Button text: '{element_text}', HTML snippet: '{element_html[:100]}...'")
-                        
-                        # Check if button is disabled
-                        disabled = ('disabled' in element.get('class', []) or 
-                                   element.get('disabled') == 'disabled' or
-                                   'disabled' in element_html.lower())
-                        
-                        if not disabled and ('add to cart' in element_text.lower() or 'buy now' in element_text.lower()):
-                            logger.info(f"✅ Product {product_name} is IN STOCK! (Found enabled Add to Cart button)")
-                            return True
-            
-            # DETECTION METHOD 3: Look for any indication of "Out of Stock"
-            out_of_stock_indicators = ['out of stock', 'sold out', 'currently unavailable', 'coming soon']
-            for indicator in out_of_stock_indicators:
-                if indicator in page_text:
-                    logger.info(f"❌ Product {product_name} is OUT OF STOCK (found text: '{indicator}')")
-                    return False
-            
-            # DETECTION METHOD 4: Check for price display (usually indicates in stock)
-            price_elements = soup.select('.price, .pdp-price, [data-testid="price"]')
-            if price_elements:
-                # Look for price pattern (₹XX,XXX) to confirm it's actually a price
-                for element in price_elements:
-                    price_text = element.text.strip()
-                    logger.info(f"Found price element with text: '{price_text}'")
-                    
-                    # Indian Rupee price pattern
-                    if re.search(r'₹\s*[\d,]+', price_text):
-                        logger.info(f"✅ Product {product_name} shows price, likely IN STOCK")
-                        return True
-            
-            # DETECTION METHOD 5: Delivery availability usually indicates in stock
-            delivery_elements = soup.select('.delivery-details, .delivery-info, [data-testid="delivery"]')
-            for element in delivery_elements:
-                delivery_text = element.text.strip().lower()
-                logger.info(f"Found delivery element with text: '{delivery_text}'")
-                
-                if 'delivery' in delivery_text and not any(x in delivery_text for x in ["unavailable", "not available"]):
-                    logger.info(f"✅ Product {product_name} shows delivery options, likely IN STOCK")
-                    return True
-            
-            # If we couldn't definitively determine, check if there are any strong indicators of availability
-            if ('add to cart' in page_text and not any(x in page_text for x in out_of_stock_indicators)):
-                logger.info(f"✅ Product {product_name} likely IN STOCK (Add to Cart text found without Out of Stock indicators)")
-                return True
-                
-            logger.info(f"⚠️ Couldn't definitively determine stock status for {product_name}, defaulting to OUT OF STOCK")
-            return False
+            # Keep a sample of pages (and every verdict change) for inspection and replay
+            if CAPTURE_ENABLED:
+                get_capture_store().submit(url, product_name, response.content, verdict,
+                                           encoding=response.encoding or 'utf-8')
+            return verdict, price
             
         else:
             logger.error(f"Failed to load page for {product_name}. Status code: {response.status_code}")
-            return False
+            metrics.check_errors.inc(stage='fetch')
+            return None, None
     
     except Exception as e:
         logger.error(f"Error checking stock for {product_name}: {str(e)}")
-        return False
+        metrics.check_errors.inc(stage='check')
+        return None, None
+
+def check_stock_with_api(url, product_name):
+    """Stock check through Croma's JSON API, falling back to the product page if the API fails"""
+    return check_stock_and_price_with_api(url, product_name)[0]
+
+def check_stock_and_price_with_api(url, product_name):
+    """
+    Same as check_stock_with_api, but also returns the price
+
+    Returns:
+        tuple: (in_stock, price) where price is a float or None if the API has no price for it;
+               in_stock is None if neither the API nor the page gave a verdict
+    """
+    client = get_client()
+    try:
+        sku = sku_from_url(url)
+        product = client.get_product(sku)
+        status_text = "IN STOCK" if product['in_stock'] else "OUT OF STOCK"
+        logger.info(f"Product {product_name} is {status_text} according to the Croma API")
+    except CromaApiUnavailable:
+        # The API is paused after repeated failures, so its share of requests goes to the page
+        logger.debug("Croma API paused, checking the page for %s", product_name)
+        return check_stock_and_price(url, product_name)
+    except CromaApiError as e:
+        logger.warning(f"API check failed for {product_name}, falling back to page: {str(e)}")
+        metrics.check_errors.inc(stage='api')
+        return check_stock_and_price(url, product_name)
+
+    # Most detail responses carry no price, and without one price alerts would never fire
+    price = product.get('price')
+    if price is None:
+        try:
+            price = client.get_prices([sku]).get(sku)
+        except CromaApiError as e:
+            logger.warning(f"No price from the API for {product_name}: {str(e)}")
+            metrics.check_errors.inc(stage='api_price')
+    return product['in_stock'], price
 
 # The rest of the script (main function, etc.) remains the same as before
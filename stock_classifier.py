@@ -0,0 +1,249 @@
+import logging
+import re
+
+import metrics
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser  # selectolax < 1.0
+    except ImportError:  # selectolax is optional, tier 2 is skipped without it
+        HTMLParser = None
+
+logger = logging.getLogger("CromaStockAlert.classifier")
+
+# Tier 1 works on the raw page text, so these must be the same phrases detect_stock looks for
+OUT_OF_STOCK_INDICATORS = ('out of stock', 'sold out', 'currently unavailable', 'coming soon')
+IN_STOCK_INDICATORS = ('in stock', 'add to cart', 'buy now')
+
+_PHRASE_PATTERN = re.compile('|'.join(re.escape(p) for p in OUT_OF_STOCK_INDICATORS + IN_STOCK_INDICATORS))
+
+# Bot-protection and captcha interstitials. They are small pages, while real product pages
+# run to hundreds of KiB and may mention e.g. recaptcha in their scripts.
+BLOCK_PAGE_INDICATORS = ('captcha', 'are you a robot', 'verify you are human', 'unusual traffic',
+                         'access denied', "you don't have permission to access", 'request unsuccessful',
+                         'pardon our interruption', 'attention required')
+BLOCK_PAGE_MAX_LENGTH = 50 * 1024
+
+TIER_RAW = 1
+TIER_FAST_PARSER = 2
+TIER_FULL = 3
+
+
+def classify_stock(html, product_name):
+    """
+    Decide whether a product page shows the product as in stock, using the cheapest tier that can
+
+    Args:
+        html (str): Page HTML
+        product_name (str): Product name, used for logging
+
+    Returns:
+        bool: True if the product looks in stock, False otherwise
+    """
+    return classify_stock_with_tier(html, product_name)[0]
+
+
+def is_block_page(html):
+    """
+    Whether a page is a captcha or access-denied page instead of the product page
+
+    Such a page says nothing about stock, so callers should report the verdict
+    as unknown rather than classify it (which would read it as out of stock).
+    """
+    if len(html) > BLOCK_PAGE_MAX_LENGTH:
+        return False
+    page_text = html.lower()
+    return any(indicator in page_text for indicator in BLOCK_PAGE_INDICATORS)
+
+
+def classify_stock_with_tier(html, product_name):
+    """
+    Same as classify_stock but also reports which tier produced the verdict
+
+    Returns:
+        tuple: (in_stock, tier) where tier is TIER_RAW, TIER_FAST_PARSER or TIER_FULL
+    """
+    with metrics.stage_seconds.time(stage='classify'):
+        page_text = html.lower()
+
+        with metrics.detection_seconds.time(method='raw'):
+            verdict = _classify_raw(page_text)
+        if verdict is not None:
+            logger.debug("Tier 1 verdict for %s: %s", product_name, verdict)
+            return verdict, TIER_RAW
+
+        if HTMLParser is not None:
+            with metrics.detection_seconds.time(method='fast_parser'):
+                verdict = _classify_fast_parser(html, page_text)
+            if verdict is not None:
+                logger.debug("Tier 2 verdict for %s: %s", product_name, verdict)
+                return verdict, TIER_FAST_PARSER
+
+        return detect_stock(html, product_name), TIER_FULL
+
+
+def _classify_raw(page_text):
+    """
+    Tier 1: one regex pass over the page text
+
+    Only returns a verdict when detect_stock is bound to reach the same one:
+    without any in-stock phrase none of its checks can return True, and with
+    'add to cart' but no out-of-stock phrase its final check returns True.
+    The schema.org availability field is deliberately ignored: a stale
+    "InStock" next to a disabled Buy Now button or a "notify me when in
+    stock" banner is out of stock to detect_stock.
+    """
+    found = set(_PHRASE_PATTERN.findall(page_text))
+    has_out_of_stock = any(p in found for p in OUT_OF_STOCK_INDICATORS)
+    has_in_stock = any(p in found for p in IN_STOCK_INDICATORS)
+
+    if has_out_of_stock and not has_in_stock:
+        return False
+    if 'add to cart' in found and not has_out_of_stock:
+        return True
+    return None
+
+
+def _classify_fast_parser(html, page_text):
+    """
+    Tier 2: detection methods 1-3 of detect_stock on a selectolax tree
+
+    Returns None when those methods are inconclusive so that the caller can
+    fall back to the full detect_stock run.
+    """
+    tree = HTMLParser(html)
+
+    # DETECTION METHOD 1: explicit stock status text
+    for node in tree.css('.stock-status, .pdp-stock, [data-testid="stock-status"]'):
+        text = node.text().strip().lower()
+        if "in stock" in text:
+            return True
+        if any(x in text for x in ["out of stock", "sold out", "currently unavailable"]):
+            return False
+
+    # DETECTION METHOD 2: enabled Add to Cart / Buy Now buttons
+    candidates = []
+    for pattern in ('button[data-testid="add-to-cart"]', '.pdp-action', '.add-to-cart',
+                    '.buy-button', '[data-testid="addToCartButton"]'):
+        candidates.extend(tree.css(pattern))
+    # selectolax has no :contains(), so match button text the way soupsieve does (case-sensitive)
+    candidates.extend(node for node in tree.css('button')
+                      if 'Add to Cart' in node.text() or 'Buy Now' in node.text())
+
+    for node in candidates:
+        node_html = node.html or ''
+        node_text = node.text().strip().lower()
+        disabled = ('disabled' in (node.attributes.get('class') or '').split() or
+                    node.attributes.get('disabled') == 'disabled' or
+                    'disabled' in node_html.lower())
+        if not disabled and ('add to cart' in node_text or 'buy now' in node_text):
+            return True
+
+    # DETECTION METHOD 3: out of stock text anywhere on the page
+    if any(indicator in page_text for indicator in OUT_OF_STOCK_INDICATORS):
+        return False
+    return None
+
+
+def detect_stock(html, product_name):
+    """Decide whether a loaded product page shows the product as in stock"""
+    # Imported here: most pages are settled by tiers 1 and 2, which don't need bs4
+    from bs4 import BeautifulSoup
+
+    with metrics.stage_seconds.time(stage='parse'):
+        soup = BeautifulSoup(html, 'html.parser')
+    page_text = html.lower()
+    debug = logger.isEnabledFor(logging.DEBUG)
+    
+    # DETECTION METHOD 1: Check for explicit "In Stock" text
+    with metrics.detection_seconds.time(method='stock_status'):
+        stock_status_elements = soup.select('.stock-status, .pdp-stock, [data-testid="stock-status"]')
+        for element in stock_status_elements:
+            text = element.text.strip().lower()
+            if debug:
+                logger.debug("Found stock status element with text: '%s'", text)
+            if "in stock" in text:
+                logger.info(f"✅ Product {product_name} is IN STOCK! (Found 'in stock' text)")
+                return True
+            if any(x in text for x in ["out of stock", "sold out", "currently unavailable"]):
+                logger.info(f"❌ Product {product_name} is OUT OF STOCK (Found out of stock text)")
+                return False
+    
+    # DETECTION METHOD 2: Check for Add to Cart buttons
+    add_to_cart_patterns = [
+        'button[data-testid="add-to-cart"]',
+        '.pdp-action', 
+        '.add-to-cart',
+        '.buy-button',
+        '[data-testid="addToCartButton"]',
+        'button:contains("Add to Cart")',
+        'button:contains("Buy Now")'
+    ]
+    
+    with metrics.detection_seconds.time(method='buy_button'):
+        for pattern in add_to_cart_patterns:
+            elements = soup.select(pattern)
+            if elements:
+                if debug:
+                    logger.debug("Found %d potential add-to-cart elements with selector '%s'", len(elements), pattern)
+                
+                for element in elements:
+                    element_html = str(element)
+                    element_text = element.text.strip()
+                    
+                    if debug:
+                        logger.debug("Button text: '%s', HTML snippet: '%s...'", element_text, element_html[:100])
+                    
+                    # Check if button is disabled
+                    disabled = ('disabled' in element.get('class', []) or 
+                               element.get('disabled') == 'disabled' or
+                               'disabled' in element_html.lower())
+                    
+                    if not disabled and ('add to cart' in element_text.lower() or 'buy now' in element_text.lower()):
+                        logger.info(f"✅ Product {product_name} is IN STOCK! (Found enabled Add to Cart button)")
+                        return True
+    
+    # DETECTION METHOD 3: Look for any indication of "Out of Stock"
+    out_of_stock_indicators = ['out of stock', 'sold out', 'currently unavailable', 'coming soon']
+    with metrics.detection_seconds.time(method='out_of_stock_text'):
+        for indicator in out_of_stock_indicators:
+            if indicator in page_text:
+                logger.info(f"❌ Product {product_name} is OUT OF STOCK (found text: '{indicator}')")
+                return False
+    
+    # DETECTION METHOD 4: Check for price display (usually indicates in stock)
+    with metrics.detection_seconds.time(method='price'):
+        price_elements = soup.select('.price, .pdp-price, [data-testid="price"]')
+        if price_elements:
+            # Look for price pattern (₹XX,XXX) to confirm it's actually a price
+            for element in price_elements:
+                price_text = element.text.strip()
+                if debug:
+                    logger.debug("Found price element with text: '%s'", price_text)
+                
+                # Indian Rupee price pattern
+                if re.search(r'₹\s*[\d,]+', price_text):
+                    logger.info(f"✅ Product {product_name} shows price, likely IN STOCK")
+                    return True
+    
+    # DETECTION METHOD 5: Delivery availability usually indicates in stock
+    with metrics.detection_seconds.time(method='delivery'):
+        delivery_elements = soup.select('.delivery-details, .delivery-info, [data-testid="delivery"]')
+        for element in delivery_elements:
+            delivery_text = element.text.strip().lower()
+            if debug:
+                logger.debug("Found delivery element with text: '%s'", delivery_text)
+            
+            if 'delivery' in delivery_text and not any(x in delivery_text for x in ["unavailable", "not available"]):
+                logger.info(f"✅ Product {product_name} shows delivery options, likely IN STOCK")
+                return True
+    
+    # If we couldn't definitively determine, check if there are any strong indicators of availability
+    if ('add to cart' in page_text and not any(x in page_text for x in out_of_stock_indicators)):
+        logger.info(f"✅ Product {product_name} likely IN STOCK (Add to Cart text found without Out of Stock indicators)")
+        return True
+        
+    logger.info(f"⚠️ Couldn't definitively determine stock status for {product_name}, defaulting to OUT OF STOCK")
+    return False
@@ -0,0 +1,275 @@
+"""Local stand-in HTTP servers used by the benchmark scripts"""
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+from http.server import BaseHTTPRequestHandler, SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURE_PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pages")
+FIXTURE_API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "api")
+
+PRODUCT_PAGE = """<!DOCTYPE html>
+<html>
+<head><title>{name} | Croma</title></head>
+<body>
+  <h1 class="pd-title">{name}</h1>
+  <div class="pdp-price"><span class="amount">&#8377;{price}</span></div>
+  <div class="pdp-stock">{stock_text}</div>
+  <button data-testid="add-to-cart" class="add-to-cart"{disabled}>Add to Cart</button>
+</body>
+</html>
+"""
+
+CAPTCHA_PAGE = """<!DOCTYPE html>
+<html>
+<head><title>Access Denied</title></head>
+<body>
+  <h1>Please verify you are human</h1>
+  <div id="px-captcha"></div>
+</body>
+</html>
+"""
+
+
+def render_product_page(name="Stub Product", price="24,999", in_stock=True):
+    """Render a minimal Croma-like product page"""
+    return PRODUCT_PAGE.format(
+        name=name,
+        price=price,
+        stock_text="In Stock" if in_stock else "Out of Stock",
+        disabled="" if in_stock else ' disabled="disabled"',
+    )
+
+
+class ProductPageHandler(BaseHTTPRequestHandler):
+    """
+    Serves a product page for any /p/<id> path after a simulated network delay, honouring If-None-Match
+
+    Set blocked to a status code (e.g. 403 or 429) to answer with that status
+    and a captcha page instead, or to 200 to serve the captcha page as if it
+    were the product page, the way bot protection does.
+    """
+    latency = 0.05
+    in_stock = True
+    blocked = None
+    retry_after = None
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        if self.blocked is not None:
+            body = CAPTCHA_PAGE.encode("utf-8")
+            self.send_response(self.blocked)
+            if self.retry_after is not None:
+                self.send_header("Retry-After", str(self.retry_after))
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        body = render_product_page(name=f"Stub Product {self.path}", in_stock=self.in_stock).encode("utf-8")
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    """
+    Serves saved pages from fixtures/pages, e.g. /in_stock_jsonld.html
+
+    Image paths under /media/ get a synthetic image of media_size bytes so
+    that full page loads pay for images the way they do on the real site.
+    """
+    latency = 0.0
+    media_latency = 0.05
+    media_size = 200 * 1024
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=FIXTURE_PAGES_DIR, **kwargs)
+
+    def do_GET(self):
+        if self.path.startswith("/media/"):
+            time.sleep(self.media_latency)
+            body = b"\x89PNG\r\n\x1a\n" + bytes(self.media_size)
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        time.sleep(self.latency)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CromaApiHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in for the Croma JSON API, replaying recorded responses from fixtures/api
+
+    product_<sku>.json and prices.json are recorded responses; batched price
+    and serviceability replies are assembled from them, with serviceability.json
+    listing the deliverable products per pincode.
+    """
+    latency = 0.0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        if parts.path == "/product/allchannels/v1/detail":
+            sku = query.get("productCode", [""])[0]
+            path = os.path.join(FIXTURE_API_DIR, f"product_{os.path.basename(sku)}.json")
+            if not os.path.exists(path):
+                self._send_json(404, {"errors": [{"message": f"Product {sku} not found"}]})
+                return
+            self._send_json(200, _load_fixture(os.path.basename(path)))
+        elif parts.path == "/pricing-services/v1/price":
+            wanted = set(query.get("productList", [""])[0].split(","))
+            entries = [e for e in _load_fixture("prices.json")["pricelist"] if e["productCode"] in wanted]
+            self._send_json(200, {"pricelist": entries})
+        else:
+            self._send_json(404, {"errors": [{"message": "Not found"}]})
+
+    def do_POST(self):
+        time.sleep(self.latency)
+        if urlsplit(self.path).path != "/inventory/oms/v2/tms/details-pwa/":
+            self._send_json(404, {"errors": [{"message": "Not found"}]})
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        lines = body["promise"]["promiseLines"]["promiseLine"]
+        table = _load_fixture("serviceability.json")
+        available, unavailable = [], []
+        for line in lines:
+            deliverable = line["itemID"] in table.get(line["shipToAddress"]["zipCode"], [])
+            (available if deliverable else unavailable).append(line)
+        self._send_json(200, {"promise": {
+            "suggestedOption": {"option": {"promiseLines": {"promiseLine": [
+                {"itemID": line["itemID"], "lineId": line["lineId"], "fulfillmentType": "HDEL",
+                 "assignments": {"assignment": [{"deliveryDate": "2026-01-01T21:00:00+05:30"}]}}
+                for line in available
+            ]}}},
+            "unavailableLines": {"unavailableLine": [
+                {"itemID": line["itemID"], "lineId": line["lineId"], "reason": "NOT_SERVICEABLE"}
+                for line in unavailable
+            ]},
+        }})
+
+    def _send_json(self, status, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeTelegramHandler(BaseHTTPRequestHandler):
+    """
+    Fake Telegram Bot API: answers sendMessage and records what was sent
+
+    Set rate_limit_next to make that many following calls fail with HTTP 429
+    and retry_after seconds, the way Telegram throttles bursts. Like Telegram,
+    it rejects Markdown messages with an unmatched _, * or ` and chat ids that
+    aren't numbers with HTTP 400.
+
+    Incoming messages are queued with push_message() and handed out by
+    getUpdates, which long-polls like the real API.
+    """
+    sent = []
+    updates = []
+    rate_limit_next = 0
+    retry_after = 1
+    lock = threading.Lock()
+    new_update = threading.Condition(lock)
+
+    @classmethod
+    def push_message(cls, chat_id, text):
+        """Queue a message from a user, as getUpdates will return it"""
+        with cls.lock:
+            update_id = len(cls.updates) + 1
+            cls.updates.append({"update_id": update_id, "message": {
+                "message_id": update_id, "chat": {"id": chat_id, "type": "private"}, "text": text}})
+            cls.new_update.notify_all()
+        return update_id
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        params = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode("utf-8")).items()}
+        method = self.path.rsplit("/", 1)[-1]
+        cls = type(self)
+        with cls.lock:
+            if cls.rate_limit_next > 0:
+                cls.rate_limit_next -= 1
+                self._send_json(429, {"ok": False, "error_code": 429,
+                                      "description": f"Too Many Requests: retry after {cls.retry_after}",
+                                      "parameters": {"retry_after": cls.retry_after}})
+                return
+            if method == "getUpdates":
+                offset = int(params.get("offset", 0))
+                pending = lambda: [u for u in cls.updates if u["update_id"] >= offset]
+                cls.new_update.wait_for(pending, timeout=float(params.get("timeout", 0)))
+                result = pending()
+                self._send_json(200, {"ok": True, "result": result})
+                return
+            if method != "sendMessage":
+                self._send_json(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+                return
+            if not params.get("chat_id", "").lstrip("-").isdigit():
+                self._send_json(400, {"ok": False, "error_code": 400, "description": "Bad Request: chat not found"})
+                return
+            if params.get("parse_mode") == "Markdown" and any(params.get("text", "").count(c) % 2 for c in "_*`"):
+                self._send_json(400, {"ok": False, "error_code": 400,
+                                      "description": "Bad Request: can't parse entities: "
+                                                     "Can't find end of the entity"})
+                return
+            cls.sent.append(params)
+            message_id = len(cls.sent)
+        self._send_json(200, {"ok": True, "result": {"message_id": message_id, "chat": {"id": params.get("chat_id")},
+                                                      "text": params.get("text")}})
+
+    _send_json = CromaApiHandler._send_json
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _load_fixture(name):
+    with open(os.path.join(FIXTURE_API_DIR, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 drops connections under concurrent load
+    request_queue_size = 128
+
+
+def start_server(handler_cls, host="127.0.0.1", port=0):
+    """
+    Start a threaded HTTP server in a daemon thread
+
+    Returns:
+        tuple: (server, base_url); call server.shutdown() when done
+    """
+    server = StubServer((host, port), handler_cls)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
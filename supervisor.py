@@ -0,0 +1,233 @@
+import asyncio
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import queue
+import time
+
+from config import (CROMA_API_ENABLED, PER_HOST_RATE, PRODUCTS_RELOAD_INTERVAL, SCHEDULER_MAX_RPS,
+                    SUPERVISOR_RESTART_DELAY)
+
+logger = logging.getLogger("CromaStockAlert.supervisor")
+
+
+class HashRing:
+    """Consistent hash ring mapping product ids to worker ids"""
+
+    def __init__(self, nodes, replicas=100):
+        self._ring = []
+        for node in nodes:
+            for replica in range(replicas):
+                self._ring.append((self._hash(f"{node}:{replica}"), node))
+        self._ring.sort()
+        self._keys = [key for key, _ in self._ring]
+
+    @staticmethod
+    def _hash(value):
+        return int.from_bytes(hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest(), 'big')
+
+    def node_for(self, key):
+        index = bisect.bisect(self._keys, self._hash(key)) % len(self._ring)
+        return self._ring[index][1]
+
+
+def _worker_main(worker_id, products, commands, results, settings):
+    """Entry point of a worker process: check its shard of products and report every verdict"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f'%(asctime)s - worker {worker_id} - %(name)s - %(levelname)s - %(message)s',
+    )
+    try:
+        asyncio.run(_worker_loop(worker_id, products, commands, results, settings))
+    except KeyboardInterrupt:
+        pass
+
+
+async def _worker_loop(worker_id, products, commands, results, settings):
+    from check_engine import CheckEngine
+    from scheduler import PollScheduler
+
+    if settings.get('use_api'):
+        from stock_checker import check_stock_and_price_with_api as check_func
+    else:
+        from stock_checker import check_stock_and_price as check_func
+
+    scheduler_options = {k: settings[k] for k in ('base_interval', 'min_interval', 'max_interval') if k in settings}
+    scheduler = PollScheduler(max_rps=settings['max_rps'], **scheduler_options)
+    engine = CheckEngine(check_func, host_rate=settings['host_rate'])
+    for product in products:
+        scheduler.add(product)
+    last_verdicts = {}
+    in_flight = set()
+
+    async def check(product):
+        result = await engine.check_product(product)
+        error = None if result.error is None else str(result.error)
+        results.put((worker_id, product['id'], result.in_stock, error, result.latency, result.price))
+        if error is not None or result.in_stock is None:
+            scheduler.report(product['id'], error=True)
+            return
+        previous = last_verdicts.get(product['id'])
+        last_verdicts[product['id']] = result.in_stock
+        scheduler.report(product['id'], changed=previous is not None and previous != result.in_stock)
+
+    try:
+        while True:
+            while True:
+                try:
+                    command, payload = commands.get_nowait()
+                except queue.Empty:
+                    break
+                if command == 'add':
+                    scheduler.add(payload)
+                elif command == 'update':
+                    scheduler.update(payload)
+                elif command == 'remove':
+                    scheduler.remove(payload)
+                    last_verdicts.pop(payload, None)
+                elif command == 'stop':
+                    return
+
+            for product in scheduler.pop_due():
+                task = asyncio.create_task(check(product))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+
+            await asyncio.sleep(max(0.01, min(scheduler.seconds_until_next(), 0.5)))
+    finally:
+        for task in list(in_flight):
+            task.cancel()
+        engine.close()
+
+
+class Supervisor:
+    """
+    Runs the checks in N worker processes, sharded by a consistent hash of the product id
+
+    Workers only check and report; every verdict comes back over one queue so
+    that transitions and notifications happen in a single place in this
+    process. Workers that die are restarted with their shard.
+
+    Args:
+        workers (int): Number of worker processes
+        on_result (callable): on_result(product_id, in_stock, error, latency, price), called in this process
+        settings (dict): Worker options; 'max_rps' and 'host_rate' are global budgets split between workers
+    """
+
+    def __init__(self, workers, on_result, settings=None):
+        self.workers = max(1, workers)
+        self.on_result = on_result
+        self.settings = {'use_api': CROMA_API_ENABLED, 'max_rps': SCHEDULER_MAX_RPS, 'host_rate': PER_HOST_RATE}
+        self.settings.update(settings or {})
+        for budget in ('max_rps', 'host_rate'):
+            self.settings[budget] = self.settings[budget] / self.workers
+
+        self.ring = HashRing(range(self.workers))
+        self.results_received = 0
+        self.restarts = 0
+
+        self._context = multiprocessing.get_context('spawn')
+        self._results = self._context.Queue()
+        self._commands = {}
+        self._processes = {}
+        self._died_at = {}
+        self._shards = {worker_id: {} for worker_id in range(self.workers)}
+
+    def start(self):
+        for worker_id in range(self.workers):
+            self._start_worker(worker_id)
+
+    def _start_worker(self, worker_id):
+        commands = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_id, list(self._shards[worker_id].values()), commands, self._results, self.settings),
+            name=f"checker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        self._commands[worker_id] = commands
+        self._processes[worker_id] = process
+        self._died_at.pop(worker_id, None)
+        logger.info(f"Started worker {worker_id} (pid {process.pid}) with {len(self._shards[worker_id])} products")
+
+    def apply_diff(self, diff):
+        """Route added, changed and removed products (a RegistryDiff) to the workers that own them"""
+        for product in diff.removed:
+            worker_id = self.ring.node_for(product['id'])
+            self._shards[worker_id].pop(product['id'], None)
+            self._send(worker_id, 'remove', product['id'])
+        for command, products in (('add', diff.added), ('update', diff.changed)):
+            for product in products:
+                worker_id = self.ring.node_for(product['id'])
+                self._shards[worker_id][product['id']] = product
+                self._send(worker_id, command, product)
+
+    def _send(self, worker_id, command, payload):
+        commands = self._commands.get(worker_id)
+        if commands is not None:
+            commands.put((command, payload))
+
+    def drain_results(self, limit=10000):
+        """Hand queued verdicts to on_result; returns how many were processed"""
+        handled = 0
+        while handled < limit:
+            try:
+                _, product_id, in_stock, error, latency, price = self._results.get_nowait()
+            except queue.Empty:
+                break
+            handled += 1
+            try:
+                self.on_result(product_id, in_stock, error, latency, price)
+            except Exception as e:
+                logger.error(f"Error handling result for product {product_id}: {str(e)}")
+        self.results_received += handled
+        return handled
+
+    def check_workers(self):
+        """Restart workers that have exited, after SUPERVISOR_RESTART_DELAY seconds"""
+        now = time.monotonic()
+        for worker_id, process in list(self._processes.items()):
+            if process.is_alive():
+                continue
+            died_at = self._died_at.setdefault(worker_id, now)
+            if died_at == now:
+                logger.error(f"Worker {worker_id} exited with code {process.exitcode}, restarting "
+                             f"in {SUPERVISOR_RESTART_DELAY}s")
+            if now - died_at >= SUPERVISOR_RESTART_DELAY:
+                self.restarts += 1
+                self._start_worker(worker_id)
+
+    async def run(self, registry=None, on_diff=None):
+        """
+        Supervise until cancelled, reloading products from a ProductRegistry if one is given
+
+        Reloaded changes go through on_diff(diff) if given, which must call apply_diff() itself.
+        """
+        self.start()
+        next_reload = 0.0
+        try:
+            while True:
+                now = time.monotonic()
+                if registry is not None and now >= next_reload:
+                    (on_diff or self.apply_diff)(registry.refresh())
+                    next_reload = now + PRODUCTS_RELOAD_INTERVAL
+                self.check_workers()
+                if not self.drain_results():
+                    await asyncio.sleep(0.05)
+                else:
+                    await asyncio.sleep(0)
+        finally:
+            self.stop()
+
+    def stop(self, timeout=5):
+        """Ask every worker to stop, then terminate any that don't"""
+        for worker_id in self._processes:
+            self._send(worker_id, 'stop', None)
+        deadline = time.monotonic() + timeout
+        for process in self._processes.values():
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.terminate()
+        self._processes.clear()
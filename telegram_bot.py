@@ -1,9 +1,84 @@
 import requests
 import logging
-from config import TELEGRAM_BOT_TOKEN
+import http_pool
+from config import TELEGRAM_BOT_TOKEN, TELEGRAM_API_BASE
 
 logger = logging.getLogger("CromaStockAlert.telegram")
 
+class TelegramError(Exception):
+    """
+    A Bot API call failed
+
+    Attributes:
+        retry_after (int): Seconds Telegram asked us to wait (HTTP 429), or None
+        error_code (int): HTTP status or Telegram error_code, None if no response arrived
+    """
+    def __init__(self, description, retry_after=None, error_code=None):
+        super().__init__(description)
+        self.retry_after = retry_after
+        self.error_code = error_code
+
+    @property
+    def retryable(self):
+        """True for network errors, throttling and server errors; other errors fail the same way again"""
+        return self.error_code is None or self.error_code == 429 or self.error_code >= 500
+
+    @property
+    def parse_error(self):
+        """True if Telegram rejected the message's Markdown/HTML entities"""
+        return self.error_code == 400 and "can't parse entities" in str(self).lower()
+
+def call_api(method, payload, timeout=15):
+    """
+    Call a Telegram Bot API method
+
+    Args:
+        method (str): API method name, e.g. 'sendMessage'
+        payload (dict): Method parameters
+        timeout (float): Request timeout in seconds
+
+    Returns:
+        The 'result' field of the response
+
+    Raises:
+        TelegramError: if the request fails or Telegram answers ok=false
+    """
+    api_url = f"{TELEGRAM_API_BASE}/bot{TELEGRAM_BOT_TOKEN}/{method}"
+    try:
+        response = http_pool.get_session().post(api_url, data=payload, timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        raise TelegramError(str(e)) from e
+
+    try:
+        result = response.json()
+    except ValueError:
+        raise TelegramError(f"HTTP {response.status_code} with non-JSON body", error_code=response.status_code)
+
+    if not result.get('ok'):
+        retry_after = (result.get('parameters') or {}).get('retry_after')
+        raise TelegramError(result.get('description', f"HTTP {response.status_code}"), retry_after=retry_after,
+                            error_code=result.get('error_code', response.status_code))
+    return result.get('result')
+
+def get_updates(offset=None, timeout=25):
+    """
+    Long-poll the Bot API for new messages
+
+    Args:
+        offset (int): Identifier of the first update to return, i.e. last update_id + 1
+        timeout (int): Seconds Telegram may hold the request open waiting for an update
+
+    Returns:
+        list: Update dicts, oldest first
+
+    Raises:
+        TelegramError: if the request fails
+    """
+    payload = {'timeout': timeout, 'allowed_updates': '["message"]'}
+    if offset is not None:
+        payload['offset'] = offset
+    return call_api('getUpdates', payload, timeout=timeout + 10) or []
+
 def send_telegram_message(chat_id, message):
     """
     Send a message to a specified Telegram chat
@@ -22,8 +97,6 @@ def send_telegram_message(chat_id, message):
     if not chat_id:
         logger.error("Telegram chat ID is not configured in config.py")
         return False
-        
-    api_url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
     
     payload = {
         'chat_id': chat_id,
@@ -34,17 +107,10 @@ def send_telegram_message(chat_id, message):
     
     try:
         logger.debug(f"Sending Telegram message to chat {chat_id}")
-        response = requests.post(api_url, data=payload)
-        response.raise_for_status()
-        
-        result = response.json()
-        if result.get('ok'):
-            logger.info(f"Message sent successfully to Telegram chat {chat_id}")
-            return True
-        else:
-            logger.error(f"Failed to send Telegram message: {result.get('description')}")
-            return False
+        call_api('sendMessage', payload)
+        logger.info(f"Message sent successfully to Telegram chat {chat_id}")
+        return True
             
-    except requests.exceptions.RequestException as e:
+    except TelegramError as e:
         logger.error(f"Error sending Telegram message: {str(e)}")
         return False
@@ -0,0 +1,107 @@
+"""CommandBot driven through the fake Telegram Bot API in stub_servers.py"""
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from command_bot import CommandBot
+from croma_api import CromaApiClient
+from product_registry import ProductRegistry
+from stub_servers import CromaApiHandler, FakeTelegramHandler, start_server
+
+CHAT_ID = 42
+URL = "https://www.croma.com/vivo-x200-fe-5g-12gb-ram-256gb-frost-blue/p/316890"
+
+
+class CountingApiHandler(CromaApiHandler):
+    requests = 0
+
+    def do_GET(self):
+        type(self).requests += 1
+        super().do_GET()
+
+    def do_POST(self):
+        type(self).requests += 1
+        super().do_POST()
+
+
+class CommandBotTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.telegram, cls.telegram_url = start_server(FakeTelegramHandler)
+        cls.api, cls.api_url = start_server(CountingApiHandler)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.telegram.shutdown()
+        cls.api.shutdown()
+
+    def setUp(self):
+        FakeTelegramHandler.sent = []
+        FakeTelegramHandler.updates = []
+        FakeTelegramHandler.rate_limit_next = 0
+        for patcher in (mock.patch('telegram_bot.TELEGRAM_API_BASE', self.telegram_url),
+                        mock.patch('telegram_bot.TELEGRAM_BOT_TOKEN', 'test-token'),
+                        mock.patch('command_bot.TELEGRAM_BOT_TOKEN', 'test-token')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        products_path = os.path.join(directory.name, 'products.json')
+        with open(products_path, 'w', encoding='utf-8') as f:
+            json.dump([], f)
+        self.registry = ProductRegistry(products_path, os.path.join(directory.name, 'watchlist.jsonl'))
+        self.registry.refresh()
+        self.diffs = []
+        self.product_status = {}
+        self.bot = CommandBot(self.registry, self.product_status, on_products_changed=self.diffs.append,
+                              chats_path=os.path.join(directory.name, 'bot_chats.json'), poll_timeout=1,
+                              api_client=CromaApiClient(self.api_url, timeout=5), delivery_interval=3600)
+
+    async def command(self, text, replies=1):
+        """Send a command from CHAT_ID and return the texts of the next `replies` messages to it"""
+        sent = len(FakeTelegramHandler.sent)
+        FakeTelegramHandler.push_message(CHAT_ID, text)
+        for _ in range(100):
+            if len(FakeTelegramHandler.sent) >= sent + replies:
+                break
+            await asyncio.sleep(0.05)
+        return [m['text'] for m in FakeTelegramHandler.sent[sent:] if m['chat_id'] == str(CHAT_ID)]
+
+    def test_commands(self):
+        async def run():
+            self.bot.start()
+            try:
+                replies = await self.command(f"/watch {URL}")
+                self.assertIn("Watching", replies[0])
+                self.assertEqual([p['id'] for p in self.diffs[-1].added], ['316890'])
+
+                # The delivery check it triggers may answer before the command's reply
+                replies = sorted(await self.command("/pincode 400049", replies=2))
+                self.assertEqual(len(replies), 2)
+                self.assertIn("Delivery to 400049", replies[0])
+                self.assertIn("can be delivered", replies[0])
+                self.assertIn("Pincode set to 400049", replies[1])
+
+                # /status reads what the checker already knows, without asking Croma
+                self.product_status['316890'] = True
+                requests = CountingApiHandler.requests
+                replies = await self.command("/status")
+                self.assertEqual(CountingApiHandler.requests, requests)
+                self.assertIn("in stock", replies[0])
+                self.assertIn("delivers to 400049", replies[0])
+
+                replies = await self.command("/unwatch 316890")
+                self.assertIn("Stopped watching 316890", replies[0])
+                self.assertEqual([p['id'] for p in self.diffs[-1].removed], ['316890'])
+                self.assertIsNone(self.registry.get('316890'))
+            finally:
+                await self.bot.close()
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+"""CromaApiClient against the recorded-response stand-in server in stub_servers.py"""
+import unittest
+
+from croma_api import CromaApiClient, CromaApiError, CromaApiUnavailable
+from config import CIRCUIT_FAILURE_THRESHOLD
+from stub_servers import CromaApiHandler, ProductPageHandler, start_server
+
+# Keys of a CromaProductChecker.check_availability result for an in-stock product;
+# delivery_* are left out when the product is out of stock
+RESULT_KEYS = {'timestamp', 'product_name', 'price', 'url', 'pincode', 'is_available', 'status_message',
+               'delivery_available', 'delivery_message'}
+
+IN_STOCK_URL = "https://www.croma.com/vivo-x200-fe-5g-12gb-ram-256gb-frost-blue/p/316890"
+LOW_STOCK_URL = "https://www.croma.com/oneplus-13r-5g-12gb-ram-256gb-nebula-noir/p/305432"
+OUT_OF_STOCK_URL = "https://www.croma.com/vivo-y300-5g-8gb-ram-128gb-rom-emerald-green/p/311901"
+
+
+class BlockedHandler(ProductPageHandler):
+    """Answers every request with 429 and a captcha page, counting the requests"""
+    latency = 0.0
+    blocked = 429
+    requests = 0
+
+    def do_GET(self):
+        type(self).requests += 1
+        super().do_GET()
+
+
+class CromaApiClientTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server, cls.base_url = start_server(CromaApiHandler)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        self.client = CromaApiClient(self.base_url, timeout=5)
+
+    def test_check_availability_matches_browser_result(self):
+        result = self.client.check_availability(IN_STOCK_URL, "400049")
+        self.assertEqual(set(result), RESULT_KEYS)
+        self.assertEqual(result['product_name'], "Vivo X200 FE 5G 12GB RAM 256GB Frost Blue")
+        self.assertEqual(result['price'], "₹54,999")
+        self.assertEqual(result['url'], IN_STOCK_URL)
+        self.assertEqual(result['pincode'], "400049")
+        self.assertIs(result['is_available'], True)
+        self.assertIs(result['delivery_available'], True)
+
+        result = self.client.check_availability(OUT_OF_STOCK_URL, "400049")
+        self.assertEqual(set(result), RESULT_KEYS - {'delivery_available', 'delivery_message'})
+        self.assertIs(result['is_available'], False)
+        self.assertEqual(result['status_message'], "Out of Stock")
+
+    def test_batched_prices(self):
+        self.assertEqual(self.client.get_prices(["316890", "311901", "305432"]),
+                         {'316890': 54999.0, '311901': 21999.0, '305432': 42999.0})
+        self.assertEqual(self.client.get_prices([]), {})
+
+    def test_batched_serviceability(self):
+        self.assertEqual(self.client.get_serviceability(["316890", "316365", "305432"], "110001"),
+                         {'316890': True, '316365': False, '305432': True})
+        self.assertEqual(self.client.get_serviceability(["316890", "305432"], "999999"),
+                         {'316890': False, '305432': False})
+
+    def test_availability_batch_across_skus_and_pincodes(self):
+        urls = [IN_STOCK_URL, LOW_STOCK_URL, OUT_OF_STOCK_URL]
+        pincodes = ["400049", "560001"]
+        results = self.client.check_availability_batch(urls, pincodes)
+        self.assertEqual([(r['url'], r['pincode']) for r in results],
+                         [(url, pincode) for url in urls for pincode in pincodes])
+        delivery = {(r['url'], r['pincode']): r.get('delivery_available') for r in results}
+        self.assertEqual(delivery, {
+            (IN_STOCK_URL, "400049"): True, (IN_STOCK_URL, "560001"): True,
+            (LOW_STOCK_URL, "400049"): True, (LOW_STOCK_URL, "560001"): False,
+            (OUT_OF_STOCK_URL, "400049"): None, (OUT_OF_STOCK_URL, "560001"): None,
+        })
+        self.assertEqual([r['price'] for r in results[::2]], ["₹54,999", "₹42,999", "₹21,999"])
+
+    def test_unknown_sku_raises(self):
+        with self.assertRaises(CromaApiError) as caught:
+            self.client.get_product("999999")
+        self.assertIn("404", str(caught.exception))
+        self.assertNotIsInstance(caught.exception, CromaApiUnavailable)
+        # A 404 is the product's fault, not the host's
+        self.assertTrue(self.client.breaker.allow())
+
+    def test_open_circuit_raises_unavailable_without_requests(self):
+        server, base_url = start_server(BlockedHandler)
+        try:
+            client = CromaApiClient(base_url, timeout=5)
+            for _ in range(CIRCUIT_FAILURE_THRESHOLD):
+                with self.assertRaises(CromaApiError):
+                    client.get_product("316890")
+            sent = BlockedHandler.requests
+            with self.assertRaises(CromaApiUnavailable):
+                client.check_availability(IN_STOCK_URL, "400049")
+            self.assertEqual(BlockedHandler.requests, sent)
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
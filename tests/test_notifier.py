@@ -0,0 +1,70 @@
+"""NotificationDispatcher against the fake Telegram Bot API in stub_servers.py"""
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+from notifier import MESSAGE_SEPARATOR, NotificationDispatcher
+from stub_servers import FakeTelegramHandler, start_server
+
+
+class NotificationDispatcherTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server, cls.base_url = start_server(FakeTelegramHandler)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+
+    def setUp(self):
+        FakeTelegramHandler.sent = []
+        FakeTelegramHandler.rate_limit_next = 0
+        FakeTelegramHandler.retry_after = 1
+        for patcher in (mock.patch('telegram_bot.TELEGRAM_API_BASE', self.base_url),
+                        mock.patch('telegram_bot.TELEGRAM_BOT_TOKEN', 'test-token'),
+                        mock.patch('notifier.TELEGRAM_BOT_TOKEN', 'test-token')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def dispatch(self, messages, chat_id='1', **options):
+        """Queue messages for one chat, then wait for them to be sent; returns the dispatcher"""
+        async def run():
+            dispatcher = NotificationDispatcher(chat_ids=[chat_id], coalesce_window=0.2, **options)
+            dispatcher.start()
+            for message in messages:
+                dispatcher.notify(message)
+            await dispatcher.close(timeout=10)
+            return dispatcher
+        return asyncio.run(run())
+
+    def test_alerts_are_coalesced_into_one_message(self):
+        dispatcher = self.dispatch(["first", "second", "third"])
+        self.assertEqual(dispatcher.sent, 1)
+        self.assertEqual([m['text'] for m in FakeTelegramHandler.sent], [MESSAGE_SEPARATOR.join(["first", "second", "third"])])
+
+    def test_retry_after_is_honoured(self):
+        FakeTelegramHandler.rate_limit_next = 1
+        start = time.monotonic()
+        dispatcher = self.dispatch(["alert"])
+        self.assertGreaterEqual(time.monotonic() - start, FakeTelegramHandler.retry_after)
+        self.assertEqual((dispatcher.sent, dispatcher.failed), (1, 0))
+        self.assertEqual(len(FakeTelegramHandler.sent), 1)
+
+    def test_unparsable_markdown_is_resent_as_plain_text(self):
+        start = time.monotonic()
+        dispatcher = self.dispatch(["Samsung_TV is back", "second alert"])
+        self.assertLess(time.monotonic() - start, 1)  # No backoff before the plain text resend
+        self.assertEqual((dispatcher.sent, dispatcher.failed), (1, 0))
+        self.assertNotIn('parse_mode', FakeTelegramHandler.sent[0])
+        self.assertIn("Samsung_TV is back", FakeTelegramHandler.sent[0]['text'])
+
+    def test_client_errors_are_not_retried(self):
+        start = time.monotonic()
+        dispatcher = self.dispatch(["alert"], chat_id='nobody', max_retries=5)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual((dispatcher.sent, dispatcher.failed), (0, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+"""CromaProductChecker on top of a fake API client"""
+import logging
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from event_log import EventLog
+from product_checker import CromaProductChecker
+
+URL = "https://www.croma.com/vivo-x200-fe-5g-12gb-ram-256gb-frost-blue/p/316890"
+
+
+def api_result(pincode, price):
+    return {'timestamp': '2026-01-01 00:00:00', 'product_name': 'Vivo X200 FE', 'price': price, 'url': URL,
+            'pincode': pincode, 'is_available': True, 'status_message': 'In Stock',
+            'delivery_available': True, 'delivery_message': 'Delivery by tomorrow'}
+
+
+class CromaProductCheckerTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        event_log = EventLog(os.path.join(directory.name, 'events.jsonl'))
+        self.addCleanup(event_log.close)
+        self.api = mock.Mock()
+        # The checker's own logger writes availability.log to the working directory
+        patcher = mock.patch.object(CromaProductChecker, '_setup_logging',
+                                    return_value=logging.getLogger('CromaAvailabilityBot.test'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.checker = CromaProductChecker(pool=mock.Mock(), api_client=self.api, cache_ttl=60,
+                                           event_log=event_log)
+
+    def answer(self, price):
+        self.api.check_availability_batch.side_effect = \
+            lambda urls, pincodes: [api_result(pincode, price) for url in urls for pincode in pincodes]
+
+    def test_api_results_report_price_changes(self):
+        self.answer("₹54,999")
+        self.assertNotIn('price_changed', self.checker.check_availability(URL, "400049"))
+
+        self.answer("₹52,999")
+        result = self.checker.check_availability(URL, "560001")
+        self.assertIs(result['price_changed'], True)
+        self.assertEqual(result['previous_price'], "₹54,999")
+
+        # The flag belongs to the check that saw the change, not to later cache hits
+        self.assertNotIn('price_changed', self.checker.check_availability(URL, "560001"))
+        results = self.checker.check_availability_batch([URL], ["110001"])
+        self.assertNotIn('price_changed', results[0])
+        self.assertEqual(self.api.check_availability_batch.call_count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+"""ProductRegistry loading of products.json and shard directories"""
+import json
+import os
+import tempfile
+import unittest
+
+from product_registry import ProductRegistry
+from scheduler import PollScheduler
+from state_store import EVENT_IN_STOCK, StateStore
+
+
+class ProductRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.shards = os.path.join(self.directory.name, 'products')
+        os.mkdir(self.shards)
+        self.registry = ProductRegistry(self.shards, os.path.join(self.directory.name, 'watchlist.jsonl'))
+
+    def write_shard(self, name, products):
+        with open(os.path.join(self.shards, name), 'w', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(product) + '\n' for product in products))
+
+    def test_numeric_ids_become_strings(self):
+        self.write_shard('a.jsonl', [{'id': 316890, 'name': 'TV', 'url': 'https://www.croma.com/p/316890'}])
+        diff = self.registry.refresh()
+        self.assertEqual([product['id'] for product in diff.added], ['316890'])
+        self.assertIsNotNone(self.registry.get('316890'))
+
+        store = StateStore(os.path.join(self.directory.name, 'state.db'))
+        self.addCleanup(store.close)
+        self.assertEqual(store.record(diff.added[0]['id'], True, price=54999.0), EVENT_IN_STOCK)
+
+    def test_invalid_priority_falls_back_to_default(self):
+        self.write_shard('a.jsonl', [
+            {'id': 'p1', 'name': 'P1', 'url': 'https://www.croma.com/p/1', 'priority': 'high'},
+            {'id': 'p2', 'name': 'P2', 'url': 'https://www.croma.com/p/2', 'priority': None},
+            {'id': 'p3', 'name': 'P3', 'url': 'https://www.croma.com/p/3', 'priority': '2.5'},
+        ])
+        diff = self.registry.refresh()
+        self.assertEqual([product.get('priority') for product in diff.added], [None, None, '2.5'])
+
+        scheduler = PollScheduler()
+        for product in diff.added:
+            scheduler.add(product)
+        self.assertEqual(len(scheduler), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
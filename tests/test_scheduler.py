@@ -0,0 +1,35 @@
+"""PollScheduler backoff, driven by a fake clock"""
+import unittest
+
+from scheduler import PollScheduler
+
+
+class PollSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.scheduler = PollScheduler(base_interval=60, min_interval=10, max_interval=600,
+                                       jitter=0, clock=lambda: self.now)
+        self.scheduler.add({'id': 'p1', 'name': 'Product 1', 'url': 'https://www.croma.com/p/1'})
+
+    def check(self, **outcome):
+        self.now += 1000
+        self.assertEqual([product['id'] for product in self.scheduler.pop_due()], ['p1'])
+        self.scheduler.report('p1', **outcome)
+
+    def test_error_backoff_is_capped(self):
+        self.check(changed=False)  # leaves a float interval
+        self.check(error=True)
+        self.assertEqual(self.scheduler._entries['p1'].due, self.now + 150)
+        self.check(error=True)
+        self.assertEqual(self.scheduler._entries['p1'].due, self.now + 300)
+
+    def test_long_error_streak_keeps_product_scheduled(self):
+        self.check(changed=False)
+        for _ in range(1100):
+            self.check(error=True)
+        self.assertEqual(self.scheduler._entries['p1'].due, self.now + 600)
+        self.check(changed=False)
+
+
+if __name__ == "__main__":
+    unittest.main()